@@ -0,0 +1,254 @@
+# AdmissionController.py - בקרת קבלה ותזמון הוגן לעבודות העלאה כבדות (IFC + אופטימיזציה)
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+
+from Metrics import ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTED, ADMISSION_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# עבודות שרצות במקביל בכל השרת (ברירת מחדל - מספר הליבות)
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "0")) or (os.cpu_count() or 1)
+# עבודות שממתינות בתור בכל השרת, ועלות ממתינה כוללת
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_MAX_QUEUED_COST = float(os.environ.get("ADMISSION_MAX_QUEUED_COST", "2000"))
+# לכל משתמש: עבודות רצות במקביל ועבודות בתור
+ADMISSION_PER_USER_CONCURRENT = int(os.environ.get("ADMISSION_PER_USER_CONCURRENT", "1"))
+ADMISSION_PER_USER_QUEUE = int(os.environ.get("ADMISSION_PER_USER_QUEUE", "2"))
+# עבודה יחידה יקרה מזה נדחית (413)
+ADMISSION_MAX_JOB_COST = float(os.environ.get("ADMISSION_MAX_JOB_COST", "1000"))
+# קובץ גדול מזה נדחה (413) לפני שנקרא; ברירת מחדל - הגודל שבו הקריאה לבדה עוברת את ADMISSION_MAX_JOB_COST
+ADMISSION_MAX_UPLOAD_BYTES = int(os.environ.get("ADMISSION_MAX_UPLOAD_BYTES", "0")) or \
+    int((ADMISSION_MAX_JOB_COST - 1) * 1_000_000)
+# משקלי התזמון ההוגן לפי מזהה משתמש: "12:2,7:0.5" (משתמש שלא מופיע - משקל 1)
+ADMISSION_USER_WEIGHTS = os.environ.get("ADMISSION_USER_WEIGHTS", "")
+
+# האלמנטים ש-IFCProcessor.extract_all_elements מחלץ - הם הופכים לצמתים בגרף
+_ELEMENT_PATTERN = re.compile(
+    rb"=\s*IFC(?:WALL|WALLSTANDARDCASE|WINDOW|WINDOWSTANDARDCASE|DOOR|DOORSTANDARDCASE|SLAB"
+    rb"|FURNISHINGELEMENT|FLOWTERMINAL)\s*\(",
+    re.IGNORECASE)
+
+
+# אורך מקסימלי של התאמה שנחתכת בין שני מקטעים
+_MAX_MATCH_BYTES = 256
+
+
+def count_ifc_elements(stream, chunk_size: int = 1 << 20) -> int:
+    """ספירת אלמנטים בקובץ IFC (STEP) בלי לפענח אותו - קריאה במקטעים, בלי להחזיק את הקובץ בזיכרון"""
+    count = 0
+    carry = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        data = carry + chunk
+        last_end = 0
+        for match in _ELEMENT_PATTERN.finditer(data):
+            count += 1
+            last_end = match.end()
+        # רק הזנב שאחרי ההתאמה האחרונה יכול להיות תחילת התאמה במקטע הבא
+        carry = data[max(last_end, len(data) - _MAX_MATCH_BYTES):]
+    return count
+
+
+def parse_weights(value: str) -> dict:
+    """"12:2,7:0.5" -> {"12": 2.0, "7": 0.5}; רשומות לא תקינות מדולגות עם אזהרה"""
+    weights = {}
+    for item in (value or "").split(","):
+        if not item.strip():
+            continue
+        user, _, weight = item.partition(":")
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = 0
+        if not user.strip() or weight <= 0:
+            logger.warning("משקל לא תקין ב-ADMISSION_USER_WEIGHTS: %s", item)
+            continue
+        weights[user.strip()] = weight
+    return weights
+
+
+def estimate_cost(file_size: int, element_count: int) -> float:
+    """
+    עלות משוערת ביחידות של "העלאה קטנה": בסיס קבוע, קריאת הקובץ (לינארית בגודל)
+    והאופטימיזציה (ריבועית במספר הצמתים - בדיקות הצללה בין כל זוג).
+    """
+    return 1.0 + file_size / 1_000_000 + (element_count / 100) ** 2
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float, status_code: int = 429):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class _Job:
+    __slots__ = ("user", "cost", "tag", "future", "enqueued_at")
+
+    def __init__(self, user: str, cost: float, tag: float):
+        self.user = user
+        self.cost = cost
+        self.tag = tag
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    מגבלה גלובלית ומגבלות לכל משתמש; הממתינים יוצאים לפי weighted fair queuing -
+    לכל עבודה תג סיום וירטואלי max(הזמן הווירטואלי, תג המשתמש האחרון) + עלות/משקל,
+    כך שמשתמש ששולח הרבה קבצים כבדים לא מעכב משתמש עם קובץ קטן.
+    כשאין מקום - AdmissionRejected עם הערכת Retry-After לפי קצב העיבוד הנמדד.
+    עובד בתוך לולאת asyncio אחת (ללא נעילות).
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE,
+                 max_queued_cost: float = ADMISSION_MAX_QUEUED_COST,
+                 per_user_concurrent: int = ADMISSION_PER_USER_CONCURRENT,
+                 per_user_queue: int = ADMISSION_PER_USER_QUEUE, max_job_cost: float = ADMISSION_MAX_JOB_COST,
+                 weights: dict = None):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queued_cost = max_queued_cost
+        self.per_user_concurrent = per_user_concurrent
+        self.per_user_queue = per_user_queue
+        self.max_job_cost = max_job_cost
+        self.weights = parse_weights(ADMISSION_USER_WEIGHTS) if weights is None else weights
+
+        self._heap = []
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        self._last_tag = {}
+        self._running = {}
+        self._queued = {}
+        self._running_total = 0
+        self._queued_total = 0
+        self._queued_cost = 0.0
+        # שניות עיבוד ליחידת עלות (ממוצע נע) - להערכת Retry-After
+        self._seconds_per_cost = 1.0
+
+    @asynccontextmanager
+    async def slot(self, user, cost: float = 1.0):
+        """async with admission.slot(user_id, cost): ... - ממתין לתור, זורק AdmissionRejected אם אין מקום"""
+        user = str(user)
+        await self._acquire(user, cost)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(user, cost, time.perf_counter() - started)
+
+    def status(self) -> dict:
+        return {
+            "running": self._running_total,
+            "queued": self._queued_total,
+            "queued_cost": round(self._queued_cost, 2),
+            "max_concurrent": self.max_concurrent,
+            "seconds_per_cost": round(self._seconds_per_cost, 4),
+        }
+
+    async def _acquire(self, user: str, cost: float):
+        if cost > self.max_job_cost:
+            self._reject("too_large", 0, 413)
+
+        if not self._heap and self._running_total < self.max_concurrent \
+                and self._running.get(user, 0) < self.per_user_concurrent:
+            self._start(user)
+            ADMISSION_REQUESTS.inc(1, "admitted")
+            ADMISSION_QUEUE_SECONDS.observe(0.0)
+            return
+
+        if self._queued.get(user, 0) >= self.per_user_queue:
+            self._reject("user_queue_full", self._retry_after(self._user_backlog(user)))
+        if self._queued_total >= self.max_queue or self._queued_cost + cost > self.max_queued_cost:
+            self._reject("queue_full", self._retry_after(self._queued_cost + cost))
+
+        tag = max(self._virtual_time, self._last_tag.get(user, 0.0)) + cost / self.weights.get(user, 1.0)
+        self._last_tag[user] = tag
+        job = _Job(user, cost, tag)
+        heapq.heappush(self._heap, (tag, next(self._order), job))
+        self._queued[user] = self._queued.get(user, 0) + 1
+        self._queued_total += 1
+        self._queued_cost += cost
+        ADMISSION_REQUESTS.inc(1, "queued")
+        # ייתכן שיש מקום פנוי שהממתינים הקודמים לא יכלו לתפוס (מגבלת משתמש)
+        self._dispatch()
+
+        try:
+            await job.future
+        except asyncio.CancelledError:
+            # הלקוח התנתק בזמן ההמתנה
+            if job.future.done() and not job.future.cancelled():
+                # המקום כבר הוקצה - מחזירים אותו
+                self._release(user, 0.0, None)
+            else:
+                self._dequeue(job)
+                self._heap = [entry for entry in self._heap if entry[2] is not job]
+                heapq.heapify(self._heap)
+            raise
+        ADMISSION_QUEUE_SECONDS.observe(time.perf_counter() - job.enqueued_at)
+
+    def _release(self, user: str, cost: float, elapsed: float = None):
+        self._running[user] -= 1
+        if not self._running[user]:
+            del self._running[user]
+        self._running_total -= 1
+        if elapsed is not None and cost > 0:
+            self._seconds_per_cost = 0.8 * self._seconds_per_cost + 0.2 * (elapsed / cost)
+        if not self._running and not self._heap:
+            # המערכת ריקה - איפוס הזמן הווירטואלי
+            self._virtual_time = 0.0
+            self._last_tag.clear()
+        self._dispatch()
+
+    def _dispatch(self):
+        """העברת הממתינים עם התג הנמוך ביותר שהמשתמש שלהם מתחת למגבלה"""
+        skipped = []
+        while self._heap and self._running_total < self.max_concurrent:
+            entry = heapq.heappop(self._heap)
+            job = entry[2]
+            if self._running.get(job.user, 0) >= self.per_user_concurrent:
+                skipped.append(entry)
+                continue
+            self._dequeue(job)
+            self._virtual_time = max(self._virtual_time, job.tag - job.cost / self.weights.get(job.user, 1.0))
+            self._start(job.user)
+            job.future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+
+    def _start(self, user: str):
+        self._running[user] = self._running.get(user, 0) + 1
+        self._running_total += 1
+
+    def _dequeue(self, job: _Job):
+        self._queued[job.user] -= 1
+        if not self._queued[job.user]:
+            del self._queued[job.user]
+        self._queued_total -= 1
+        self._queued_cost -= job.cost
+
+    def _user_backlog(self, user: str) -> float:
+        return sum(entry[2].cost for entry in self._heap if entry[2].user == user)
+
+    def _retry_after(self, backlog_cost: float) -> float:
+        return max(1.0, backlog_cost * self._seconds_per_cost / max(1, self.max_concurrent))
+
+    def _reject(self, reason: str, retry_after: float, status_code: int = 429):
+        ADMISSION_REQUESTS.inc(1, "rejected")
+        ADMISSION_REJECTED.inc(1, reason)
+        logger.warning("בקשה נדחתה בבקרת הקבלה (%s), Retry-After=%.0fs", reason, retry_after)
+        raise AdmissionRejected(reason, math.ceil(retry_after), status_code)
+
+
+admission_controller = AdmissionController()
@@ -1,21 +1,32 @@
 import math
 import logging
+from collections import deque
 from typing import List, Tuple, Dict
-from models import Point3D, LightVertex, ObstanceVertex, Graph
-from MaterialReflection import MaterialReflection
+from models import Point3D, LightVertex, ObstanceVertex, Graph, GraphOverlay
+from OpticalProperties import (OpticalProperties, REFRACTIVE_INDICES, get_refractive_index,
+                               get_material_thickness, get_absorption_coefficient)
 from RoomType import RoomType
+from Metrics import RAY_TESTS, timed
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
 class ShadowOptimizer:
-    def __init__(self, graph: Graph, required_lux: float = 300):
+    # לומן לכל מנורה מרכזית לפי מספר המנורות בתצורה
+    CENTER_LUMENS_BY_COUNT = {1: 3000, 2: 1800, 3: 1200, 4: 900}
+
+    def __init__(self, graph, required_lux: float = 300, precompute: bool = True, material_optics: bool = False):
+        # graph הוא Graph או GraphOverlay (תצורת מנורות מעל בסיס משותף)
         self.graph = graph
         self.required_lux = required_lux
+        # האופטימיזציה מחשבת כל מכשול כחומר לא ידוע (כמו תמיד - לצמתים לא היה חומר);
+        # material_optics=True משתמש בחומר האמיתי מהרשומה שנבנתה ב-BuildGraph (מפת הלוקס)
+        self.material_optics = material_optics
+        self._default_optics = OpticalProperties.get_by_material_name('')
         self.center_lights = self.get_center_lights()
         self.furniture_lights = self.get_furniture_lights()
         self.obstacles = self.get_obstacles()
+        self.transparent_obstacles = [o for o in self.obstacles if self.get_optics(o).is_transparent]
         self.reflection_surfaces = self.get_reflection_surfaces()
 
         # פרמטרי פיזיקה מדויקים
@@ -23,36 +34,67 @@ class ShadowOptimizer:
         self.cos_angle_threshold = 0.1
         self.min_distance = 0.1  # מרחק מינימלי למניעת חלוקה באפס
         self.floor_height = 0.0  # גובה הרצפה
+        self.air_attenuation_coefficient = 0.05
 
         # מקדמי שבירה לחוק סנל
-        self.refractive_indices = {
-            'air': 1.0,
-            'glass': 1.52,
-            'water': 1.33,
-            'plastic': 1.4,
-            'default': 1.0
-        }
+        self.refractive_indices = dict(REFRACTIVE_INDICES)
+
+        # מונה בדיקות קרן מקומי - נשפך למדדים בסוף כל שלב
+        self.ray_tests = 0
+
+        # חישוב תאורה לכל הצמתים מראש (precompute=False למי שצריך רק את המודל הפיזיקלי)
+        if precompute:
+            with timed("shadow_precompute"):
+                self.calculate_accurate_illumination_for_all_vertices()
+            self.flush_ray_tests()
 
-        # חישוב תאורה לכל הצמתים מראש
-        self.calculate_accurate_illumination_for_all_vertices()
+    def flush_ray_tests(self):
+        """העברת מונה בדיקות הקרן המקומי למדד הגלובלי"""
+        if self.ray_tests:
+            RAY_TESTS.inc(self.ray_tests)
+            self.ray_tests = 0
 
     def calculate_accurate_illumination_for_all_vertices(self):
         """ חישוב מדויק של תאורה לכל צומת בגרף"""
         logger.debug(" מחשב תאורה מדויקת לכל צומת")
+        vertex_count = 0
+        total_lux = 0.0
 
         for vertex in self.graph.vertices:
             if isinstance(vertex, ObstanceVertex):
                 # חישוב עוצמת תאורה פיזיקלית בפועל
-                vertex.actual_lux = self.calculate_physics_based_lux_for_vertex(vertex)
+                actual_lux = self.calculate_physics_based_lux_for_vertex(vertex)
+                self.set_actual_lux(vertex, actual_lux)
 
                 # קביעת עוצמה נדרשת לפי סוג האלמנט
                 vertex.required_lux = self.get_required_lux_by_element_type(vertex)
 
-                # עדכון מקדם החזרה לפי ה-enum
-                self.update_material_reflection_factor(vertex)
-
-                logger.debug(f"צומת ({vertex.point.x:.1f},{vertex.point.y:.1f}): "
-                             f"בפועל={vertex.actual_lux:.1f}, נדרש={vertex.required_lux:.1f}")
+                # עדכון מקדם החזרה לפי ה-enum - לא בשכבה: צמתי הבסיס משותפים, והשכבה הבאה
+                # הייתה אוספת משטחי החזרה שגרף מלא חדש לא אוסף
+                if not isinstance(self.graph, GraphOverlay):
+                    self.update_material_reflection_factor(vertex)
+
+                vertex_count += 1
+                total_lux += actual_lux
+
+        # סיכום אחד לשלב במקום שורה לכל צומת
+        logger.debug("חושבה תאורה ל-%d צמתים, ממוצע %.1f לוקס", vertex_count, total_lux / max(vertex_count, 1))
+
+    def assign_required_lux(self):
+        """
+        עוצמה נדרשת לכל מכשול, בלי חישוב התאורה - לגרף בסיס שמשותף לכמה תצורות.
+        מקדם ההחזרה לא נקבע כאן: בגרף מלא משטחי ההחזרה נאספים לפני החישוב המוקדם (ולכן ריקים),
+        וקביעתו על הבסיס הייתה גורמת לשכבות לחשב החזרות שהאופטימיזציה הרגילה לא מחשבת.
+        """
+        for vertex in self.obstacles:
+            vertex.required_lux = self.get_required_lux_by_element_type(vertex)
+
+    def set_actual_lux(self, vertex: ObstanceVertex, actual_lux: float):
+        """בשכבה התוצאה נשמרת בשכבה עצמה - צמתי הבסיס משותפים לכל התצורות"""
+        if isinstance(self.graph, GraphOverlay):
+            self.graph.actual_lux[vertex] = actual_lux
+        else:
+            vertex.actual_lux = actual_lux
 
     def calculate_physics_based_lux_for_vertex(self, vertex: ObstanceVertex) -> float:
         """💡 חישוב עוצמת תאורה פיזיקלית מדויקת לצומת"""
@@ -85,14 +127,23 @@ class ShadowOptimizer:
         else:
             return self.required_lux  # ברירת מחדל
 
+    def get_optics(self, vertex: ObstanceVertex) -> OpticalProperties:
+        """🔎 הרשומה האופטית של המכשול - נבנית ב-BuildGraph, או פעם אחת כאן לגרפים ישנים"""
+        if not self.material_optics:
+            return self._default_optics
+        optics = getattr(vertex, 'optics', None)
+        if optics is None:
+            optics = OpticalProperties.get_by_material_name(getattr(vertex, 'material', ''),
+                                                            getattr(vertex, 'thickness', None))
+            vertex.optics = optics
+        return optics
+
     def update_material_reflection_factor(self, vertex: ObstanceVertex):
         """🧱 עדכון מקדם החזרה לפי החומר האמיתי מה-enum"""
-        material_name = getattr(vertex, 'material', 'unknown')
-        material_reflection = MaterialReflection.get_by_material_name(material_name)
-        vertex.reflection_factor = material_reflection.reflection_factor
-
-        logger.debug(f"חומר '{material_name}' -> מקדם החזרה: {vertex.reflection_factor}")
+        optics = self.get_optics(vertex)
+        vertex.reflection_factor = optics.reflectance
 
+    @timed("optimize_lighting_room")
     def optimize_lighting_room(self) -> List[LightVertex]:
         """ אופטימיזציה מדויקת לחדר לפי חוקי הפיזיקה - ללא שינוי!"""
         logger.debug(" מתחיל אופטימיזציה מבוססת פיזיקה לחדר")
@@ -124,32 +175,42 @@ class ShadowOptimizer:
 
         for name, config in configurations:
             lights = config['lights']
-
-            # חישוב ציון צללים וקטוריאלי חדש
-            shadow_score = self.calculate_vectorial_shadow_area_score(lights, furniture_obstacles)
-
-            # חישוב ציון תאורה פיזיקלי מדויק - כל הצמתים
-            illumination_score = self.calculate_physics_illumination_score_all_vertices(lights)
             aesthetic_score = config['aesthetic_score']
+            illumination_score, shadow_score, total_score = self.score_lights(lights, furniture_obstacles,
+                                                                              aesthetic_score)
 
-            # 60% תאורה פיזיקלית, 25% צללים, 15% אסתטיקה
-            total_score = illumination_score * 0.6 + shadow_score * 0.25 + aesthetic_score * 0.15
-
-            logger.debug(f"  {name}: תאורה={illumination_score:.2f}, צללים={shadow_score:.2f}, "
-                         f"אסתטיקה={aesthetic_score:.2f} סה\"כ={total_score:.2f}")
+            logger.debug("  %s: תאורה=%.2f, צללים=%.2f, אסתטיקה=%.2f סה\"כ=%.2f",
+                         name, illumination_score, shadow_score, aesthetic_score, total_score)
 
             if total_score < best_score:
                 best_score = total_score
                 best_lights = lights
                 best_name = name
 
-        logger.debug(f"🏆 נבחר: {best_name} עם ציון {best_score:.2f}")
+        logger.debug("🏆 נבחר: %s עם ציון %.2f", best_name, best_score)
 
         # הוספת מנורות ריהוט + מנורות מרכזיות המאופטמות
         furniture_lights = self.get_furniture_lights()
         result = best_lights + furniture_lights
+        self.flush_ray_tests()
         return result
 
+    def score_lights(self, lights: List[LightVertex], furniture_obstacles: List[ObstanceVertex] = None,
+                     aesthetic_score: float = 0.0) -> Tuple[float, float, float]:
+        """ציון תצורת מנורות: (תאורה, צללים, סה"כ) - נמוך יותר עדיף"""
+        if furniture_obstacles is None:
+            furniture_obstacles = self.get_furniture_obstacles()
+
+        # חישוב ציון צללים וקטוריאלי חדש
+        shadow_score = self.calculate_vectorial_shadow_area_score(lights, furniture_obstacles)
+
+        # חישוב ציון תאורה פיזיקלי מדויק - כל הצמתים
+        illumination_score = self.calculate_physics_illumination_score_all_vertices(lights)
+
+        # 60% תאורה פיזיקלית, 25% צללים, 15% אסתטיקה
+        total_score = illumination_score * 0.6 + shadow_score * 0.25 + aesthetic_score * 0.15
+        return illumination_score, shadow_score, total_score
+
     def is_position_above_furniture(self, light_position: Point3D, furniture: ObstanceVertex) -> bool:
         """🪑 בדיקה אם מיקום המנורה מעל הרהיט (לפי כל הצמתים)"""
         # חילוץ מידות הרהיט
@@ -173,7 +234,6 @@ class ShadowOptimizer:
         is_above_z = light_position.z > max_z  # המנורה מעל הרהיט
 
         if is_above_x and is_above_y and is_above_z:
-            logger.debug(f"מנורה ב-({light_position.x:.1f}, {light_position.y:.1f}) מעל רהיט!")
             return True
 
         return False
@@ -195,14 +255,12 @@ class ShadowOptimizer:
             furniture_shadow_area = self.calculate_furniture_shadow_area(furniture, lights)
             total_shadow_area += furniture_shadow_area
 
-            logger.debug(
-                f"רהיט ב-({furniture.point.x:.1f}, {furniture.point.y:.1f}): שטח צל={furniture_shadow_area:.2f}")
-
         # ציון צללים יחסי לגודל החדר
         room_area = self.extract_room_info_from_graph()[0]
         shadow_ratio = total_shadow_area / max(room_area, 1.0)
 
-        logger.debug(f"שטח צל כולל: {total_shadow_area:.2f}, יחס לחדר: {shadow_ratio:.3f}")
+        logger.debug("שטח צל כולל ל-%d רהיטים: %.2f, יחס לחדר: %.3f",
+                     len(furniture_obstacles), total_shadow_area, shadow_ratio)
         return min(shadow_ratio * 10, 10.0)  # נרמול וחסימה
 
     def calculate_furniture_shadow_area(self, furniture: ObstanceVertex, lights: List[LightVertex]) -> float:
@@ -301,15 +359,11 @@ class ShadowOptimizer:
     def calculate_transmission_to_floor(self, start: Point3D, end: Point3D) -> float:
         """🔬 חישוב העברת אור לרצפה דרך חומרים"""
         # בדיקה פשוטה - אם יש מכשולים בדרך
+        self.ray_tests += 1
         for obstacle in self.obstacles:
             if self.line_intersects_obstacle(start, end, obstacle):
-                material_name = getattr(obstacle, 'material', 'default').lower()
-
-                # אם זה חומר שקוף, חשב העברה
-                if any(mat in material_name for mat in ['glass', 'זכוכית', 'window']):
-                    return 0.7  # 70% העברה דרך זכוכית
-                else:
-                    return 0.1  # 10% העברה דרך חומרים אטומים
+                # 70% העברה דרך זכוכית, 10% דרך חומרים אטומים
+                return self.get_optics(obstacle).floor_transmission
 
         return 1.0  # אין מכשולים
 
@@ -363,8 +417,8 @@ class ShadowOptimizer:
                 # עוצמת תאורה בפועל (מחושבת מחדש עם המנורות החדשות)
                 actual_lux = self.calculate_total_illumination_at_point(vertex.point, lights)
 
-                # תאורה נדרשת
-                required_lux = getattr(vertex, 'required_lux', self.required_lux)
+                # תאורה נדרשת - 0 (מכשול שלא עבר חישוב מוקדם) נחשב כברירת המחדל
+                required_lux = getattr(vertex, 'required_lux', 0) or self.required_lux
 
                 # חישוב שגיאה
                 if actual_lux < required_lux:
@@ -382,9 +436,10 @@ class ShadowOptimizer:
     def extract_room_info_from_graph(self) -> Tuple[float, float]:
         """🏠 חילוץ מידע החדר מהגרף"""
         # חישוב שטח החדר לפי הצמתים
-        all_x = [v.point.x for v in self.graph.vertices]
-        all_y = [v.point.y for v in self.graph.vertices]
-        all_z = [v.point.z for v in self.graph.vertices]
+        vertices = self.graph.live_vertices()
+        all_x = [v.point.x for v in vertices]
+        all_y = [v.point.y for v in vertices]
+        all_z = [v.point.z for v in vertices]
 
         if all_x and all_y:
             room_width = max(all_x) - min(all_x)
@@ -399,7 +454,7 @@ class ShadowOptimizer:
         else:
             ceiling_height = 2.5
 
-        logger.debug(f"מידע חדר: שטח={room_area:.1f}מ\"ר, גובה={ceiling_height:.1f}מ")
+        logger.debug("מידע חדר: שטח=%.1fמ\"ר, גובה=%.1fמ", room_area, ceiling_height)
         return room_area, ceiling_height
 
     def calculate_total_illumination_at_point(self, point: Point3D, lights: List[LightVertex]) -> float:
@@ -467,10 +522,8 @@ class ShadowOptimizer:
             cos_reflection = self.calculate_cos_incident_angle(surface.point, point)
 
             if cos_incident > 0 and cos_reflection > 0:
-                # מקדם החזרה מ-MaterialReflection enum
-                material_name = getattr(surface, 'material', 'unknown')
-                material_reflection = MaterialReflection.get_by_material_name(material_name)
-                reflection_factor = material_reflection.reflection_factor
+                # מקדם החזרה מ-MaterialReflection enum (מהרשומה האופטית)
+                reflection_factor = self.get_optics(surface).reflectance
 
                 # נוסחת למברט המלאה
                 reflected_intensity = (incident_intensity * cos_incident * cos_reflection *
@@ -483,15 +536,16 @@ class ShadowOptimizer:
     def calculate_transmission_through_materials(self, light_pos: Point3D, target_pos: Point3D) -> float:
         """🔬 חישוב העברת אור דרך חומרים שקופים (חוק סנל)"""
         total_transmission = 1.0
+        self.ray_tests += 1
 
-        # בדיקה של כל מכשול בדרך
-        for obstacle in self.obstacles:
-            if self.line_intersects_transparent_obstacle(light_pos, target_pos, obstacle):
-                material_name = getattr(obstacle, 'material', 'default').lower()
+        # בדיקה של כל מכשול שקוף בדרך
+        for obstacle in self.transparent_obstacles:
+            if self.line_intersects_obstacle(light_pos, target_pos, obstacle):
+                optics = self.get_optics(obstacle)
 
                 # קבלת מקדם שבירה
                 n1 = self.refractive_indices['air']
-                n2 = self.get_refractive_index(material_name)
+                n2 = optics.refractive_index
 
                 # חישוב זווית פגיעה וזווית שבירה (חוק סנל)
                 incident_angle = self.calculate_incident_angle_to_surface(light_pos, target_pos, obstacle.point)
@@ -504,10 +558,7 @@ class ShadowOptimizer:
                 transmission_coefficient = self.calculate_fresnel_transmission(incident_angle, refracted_angle, n1, n2)
 
                 # דעיכה בחומר (Beer-Lambert)
-                material_thickness = self.calculate_material_thickness(obstacle)
-                material_absorption = self.calculate_material_absorption(material_name, material_thickness)
-
-                total_transmission *= transmission_coefficient * material_absorption
+                total_transmission *= transmission_coefficient * optics.internal_transmittance
 
                 # אם השרידות נמוכה מדי, האור לא עובר
                 if total_transmission < 0.01:
@@ -521,7 +572,7 @@ class ShadowOptimizer:
         # מציאת מיקום בטוח הרחק מריהוט
         safe_position = self.find_safe_position(center, furniture_obstacles)
 
-        lumens = 3000
+        lumens = self.CENTER_LUMENS_BY_COUNT[1]
         light = LightVertex(
             Point3D(safe_position.x, safe_position.y, ceiling_height - 0.3),
             lux=0, lumens=lumens, target_id=None, light_type="center"
@@ -558,7 +609,7 @@ class ShadowOptimizer:
                          furniture_obstacles: List[ObstanceVertex]):
         """תצורה של 2 מנורות - מיקומים בטוחים"""
         spacing = min(2.0, math.sqrt(room_area) * 0.4)
-        lumens_per_light = 1800
+        lumens_per_light = self.CENTER_LUMENS_BY_COUNT[2]
 
         # מיקומים ראשוניים
         pos1 = Point3D(center.x - spacing / 2, center.y, ceiling_height - 0.3)
@@ -574,7 +625,7 @@ class ShadowOptimizer:
                              furniture_obstacles: List[ObstanceVertex]):
         """תצורה של 3 מנורות במשולש - מיקומים בטוחים"""
         radius = min(1.5, math.sqrt(room_area) * 0.3)
-        lumens_per_light = 1200
+        lumens_per_light = self.CENTER_LUMENS_BY_COUNT[3]
         angles = [0, 2 * math.pi / 3, 4 * math.pi / 3]
 
         lights = []
@@ -591,7 +642,7 @@ class ShadowOptimizer:
                            furniture_obstacles: List[ObstanceVertex]):
         """תצורה של 4 מנורות בריבוע - מיקומים בטוחים"""
         offset = min(1.2, math.sqrt(room_area) * 0.25)
-        lumens_per_light = 900
+        lumens_per_light = self.CENTER_LUMENS_BY_COUNT[4]
         positions = [(-offset, -offset), (offset, -offset), (offset, offset), (-offset, offset)]
 
         lights = []
@@ -646,57 +697,29 @@ class ShadowOptimizer:
 
     def line_intersects_transparent_obstacle(self, start: Point3D, end: Point3D, obstacle: ObstanceVertex) -> bool:
         """בדיקה אם קו עובר דרך חומר שקוף"""
-        material_name = getattr(obstacle, 'material', '').lower()
-        transparent_materials = ['glass', 'זכוכית', 'window', 'חלון']
-        if not any(material in material_name for material in transparent_materials):
+        if not self.get_optics(obstacle).is_transparent:
             return False
         return self.line_intersects_obstacle(start, end, obstacle)
 
     def get_refractive_index(self, material_name: str) -> float:
         """קבלת מקדם שבירה לפי שם החומר"""
-        material_name = material_name.lower()
-        if 'glass' in material_name or 'זכוכית' in material_name:
-            return self.refractive_indices['glass']
-        elif 'water' in material_name or 'מים' in material_name:
-            return self.refractive_indices['water']
-        elif 'plastic' in material_name or 'פלסטיק' in material_name:
-            return self.refractive_indices['plastic']
-        else:
-            return self.refractive_indices['default']
+        return get_refractive_index(material_name)
 
     def calculate_material_thickness(self, obstacle: ObstanceVertex) -> float:
         """חישוב עובי החומר"""
-        thickness = getattr(obstacle, 'thickness', None)
-        if thickness:
-            return float(thickness)
-        material_name = getattr(obstacle, 'material', '').lower()
-        if 'window' in material_name or 'זכוכית' in material_name:
-            return 0.01
-        elif 'glass' in material_name:
-            return 0.005
-        else:
-            return 0.02
+        return get_material_thickness(getattr(obstacle, 'material', ''), getattr(obstacle, 'thickness', None))
 
     def calculate_material_absorption(self, material_name: str, thickness: float) -> float:
         """חישוב בליעה בחומר (Beer-Lambert)"""
-        absorption_coefficients = {
-            'glass': 0.1, 'water': 0.05, 'plastic': 0.2, 'default': 0.1
-        }
-        material_name = material_name.lower()
-        absorption_coeff = absorption_coefficients.get('default', 0.1)
-        for material, coeff in absorption_coefficients.items():
-            if material in material_name:
-                absorption_coeff = coeff
-                break
-        return math.exp(-absorption_coeff * thickness)
+        return math.exp(-get_absorption_coefficient(material_name) * thickness)
 
     def calculate_air_attenuation(self, distance: float) -> float:
         """דעיכת אור באוויר"""
-        attenuation_coefficient = 0.05
-        return math.exp(-attenuation_coefficient * distance)
+        return math.exp(-self.air_attenuation_coefficient * distance)
 
     def is_light_blocked(self, light_pos: Point3D, target_pos: Point3D) -> bool:
         """בדיקה אם אור חסום"""
+        self.ray_tests += 1
         for obstacle in self.obstacles:
             if self.line_intersects_obstacle(light_pos, target_pos, obstacle):
                 return True
@@ -753,7 +776,7 @@ class ShadowOptimizer:
         # שיטה 2: אם לא מצאנו, חפש לפי קבוצות צמתים (רהיטים = קבוצות של 8 צמתים)
         if len(furniture_obstacles) == 0:
             furniture_obstacles = self.detect_furniture_from_graph_structure()
-            logger.debug(f"זיהוי ריהוט לפי מבנה גרף: {len(furniture_obstacles)} פריטים")
+            logger.debug("זיהוי ריהוט לפי מבנה גרף: %d פריטים", len(furniture_obstacles))
 
         # שיטה 3: אם עדיין לא מצאנו, קח צמתים עם required_lux > 0
         if len(furniture_obstacles) == 0:
@@ -762,9 +785,9 @@ class ShadowOptimizer:
                     required_lux = getattr(vertex, 'required_lux', 0)
                     if required_lux > 0:
                         furniture_obstacles.append(vertex)
-            logger.debug(f"זיהוי ריהוט לפי required_lux: {len(furniture_obstacles)} פריטים")
+            logger.debug("זיהוי ריהוט לפי required_lux: %d פריטים", len(furniture_obstacles))
 
-        logger.debug(f"נמצאו {len(furniture_obstacles)} פריטי ריהוט")
+        logger.debug("נמצאו %d פריטי ריהוט", len(furniture_obstacles))
         return furniture_obstacles
 
     def detect_furniture_from_graph_structure(self) -> List[ObstanceVertex]:
@@ -787,26 +810,23 @@ class ShadowOptimizer:
 
     def find_connected_furniture_vertices(self, start_vertex: ObstanceVertex, used_vertices: set) -> List[
         ObstanceVertex]:
-        """🔗 מצא צמתים מחוברים שיוצרים רהיט אחד"""
+        """🔗 מצא צמתים מחוברים שיוצרים רהיט אחד (BFS על אינדקס הסמיכות של הגרף)"""
+        vertices = self.graph.vertices
+        vertex_count = len(vertices)
         group = [start_vertex]
-        to_check = [start_vertex]
+        to_check = deque([start_vertex])
         checked = {start_vertex}
 
         while to_check and len(group) < 12:  # הגבלה למניעת אינסוף
-            current = to_check.pop(0)
-            current_idx = self.graph.vertices.index(current)
-
-            # חפש קשתות לצמתים קרובים
-            for edge in self.graph.edges:
-                connected_vertex = None
+            current = to_check.popleft()
 
-                if edge.start == current_idx and edge.end < len(self.graph.vertices):
-                    connected_vertex = self.graph.vertices[edge.end]
-                elif edge.end == current_idx and edge.start < len(self.graph.vertices):
-                    connected_vertex = self.graph.vertices[edge.start]
+            # קשתות הצומת בלבד, לפי סדר ההוספה לגרף
+            for neighbor_idx, edge in self.graph.incident_edges(self.graph.index_of(current)):
+                if neighbor_idx >= vertex_count:
+                    continue
+                connected_vertex = vertices[neighbor_idx]
 
-                if (connected_vertex and
-                        isinstance(connected_vertex, ObstanceVertex) and
+                if (isinstance(connected_vertex, ObstanceVertex) and
                         connected_vertex not in checked and
                         connected_vertex not in used_vertices and
                         edge.length < 2.0):  # קשתות קצרות = אותו רהיט
@@ -1,5 +1,6 @@
 # algorithm.py - תיקון לקריאה לאופטימיזציה לפי חדרים
-from models import Graph, LightVertex
+from concurrent.futures import ThreadPoolExecutor
+from models import Graph, GraphOverlay, LightVertex
 import Algorithm.ShadowOptimizer
 from Algorithm.ShadowOptimizer import ShadowOptimizer
 import logging
@@ -28,21 +29,34 @@ def algorithm(room_graph: Graph):
         return []
 
 
+def score_layouts(base: Graph, layouts: list, max_workers: int = None) -> list:
+    """
+    ציון כמה תצורות מנורות על אותו גרף בסיס - כל תצורה היא שכבה, הבסיס לא מועתק ולא משתנה.
+    מחזיר לכל תצורה (תאורה, צללים, סה"כ) באותו סדר.
+    """
+    def score(lights):
+        optimizer = ShadowOptimizer(GraphOverlay(base, lights), precompute=False)
+        scores = optimizer.score_lights(list(lights))
+        optimizer.flush_ray_tests()
+        return scores
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(score, layouts))
+
+
 def replace_center_lights_only(graph: Graph, new_lights: list):
     """
     מחליף רק את המנורות המרכזיות בלי לפגוע במבנה הגרף
     """
-    # מסמן את המנורות המרכזיות הישנות למחיקה
-    for i, vertex in enumerate(graph.vertices):
-        if isinstance(vertex, LightVertex) and getattr(vertex, 'light_type', 'center') == 'center':
-            # מחליף את המנורה הישנה במנורה חדשה מהרשימה
-            if new_lights:
-                graph.vertices[i] = new_lights.pop(0)
+    # מנורות שכבר בגרף (מנורות הריהוט שהאופטימיזציה מחזירה) לא מתווספות שוב
+    new_lights = [light for light in new_lights if graph.index_of(light) is None]
 
-    # מוסיף מנורות נוספות שנותרו (אם יש)
-    for remaining_light in new_lights:
-        graph.add_vertex(remaining_light)
+    center_ids = [vertex_id for vertex_id, vertex in graph.iter_vertices()
+                  if isinstance(vertex, LightVertex) and getattr(vertex, 'light_type', 'center') == 'center']
 
-    # מנקה קשתות שבורות (אם יש)
-    graph.edges = [edge for edge in graph.edges
-                   if edge.start < len(graph.vertices) and edge.end < len(graph.vertices)]
\ No newline at end of file
+    # החלפה במקום - המזהים והקשתות של שאר הגרף לא משתנים
+    for vertex_id, light in zip(center_ids, new_lights):
+        graph.replace_vertex(vertex_id, light)
+
+    # מוסיף מנורות נוספות שנותרו (אם יש)
+    graph.add_vertices(new_lights[len(center_ids):])
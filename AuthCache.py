@@ -0,0 +1,68 @@
+# AuthCache.py - מטמון קצר של טוקנים מאומתים ושורות משתמש לבקשות מאומתות
+import hashlib
+import os
+import time
+
+from LRUCache import LRUCache
+from Metrics import AUTH_CACHE_LOOKUPS
+
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "1024"))
+# שניות; 0 מבטל את המטמון
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", "60"))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "30"))
+
+
+def token_key(token: str) -> str:
+    """הטוקן עצמו לא נשמר בזיכרון - רק ה-hash שלו"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class AuthCache:
+    """
+    טוקנים: claims מפוענחים לפי hash של הטוקן, עד TTL ולא אחרי תפוגת הטוקן (exp).
+    משתמשים: השורה מהמסד לפי user_id; נמחקת בעדכון/מחיקה של המשתמש (invalidate_user).
+    """
+
+    def __init__(self, max_size: int = AUTH_CACHE_SIZE, token_ttl: float = TOKEN_CACHE_TTL,
+                 user_ttl: float = USER_CACHE_TTL):
+        self.token_ttl = token_ttl
+        self.user_ttl = user_ttl
+        self.tokens = LRUCache(max_size=max_size, ttl=token_ttl)
+        self.users = LRUCache(max_size=max_size, ttl=user_ttl)
+
+    def get_claims(self, token: str):
+        if not self.token_ttl:
+            return None
+        claims = self.tokens.get(token_key(token))
+        AUTH_CACHE_LOOKUPS.inc(1, "token", "hit" if claims is not None else "miss")
+        return claims
+
+    def set_claims(self, token: str, claims: dict):
+        if not self.token_ttl:
+            return
+        ttl = self.token_ttl
+        if "exp" in claims:
+            ttl = min(ttl, claims["exp"] - time.time())
+        if ttl > 0:
+            self.tokens.set(token_key(token), claims, ttl)
+
+    def get_user(self, user_id: int):
+        if not self.user_ttl:
+            return None
+        user = self.users.get(user_id)
+        AUTH_CACHE_LOOKUPS.inc(1, "user", "hit" if user is not None else "miss")
+        return user
+
+    def set_user(self, user_id: int, user):
+        if self.user_ttl and user is not None:
+            self.users.set(user_id, user)
+
+    def invalidate_user(self, user_id: int):
+        self.users.pop(user_id)
+
+    def clear(self):
+        self.tokens.clear()
+        self.users.clear()
+
+
+auth_cache = AuthCache()
@@ -2,11 +2,12 @@
 import json
 import os
 import logging
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
 from models import Graph, Point3D, LightVertex, ObstanceVertex, Edge, Vertex
+from OpticalProperties import OpticalProperties
 import math
+import time
 from Algorithm import algorithm
+from Metrics import STAGE_SECONDS, VERTICES, EDGES, timed
 
 import sys
 
@@ -17,7 +18,6 @@ if algorithm_dir not in sys.path:
 
 from Algorithm.ShadowOptimizer import ShadowOptimizer
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +43,10 @@ class BuildGraph:
             logger.error("Error reading/parsing JSON file: %s", str(e))
             return Graph()
 
+        return self.build_graph_from_data(json_array)
+
+    def build_graph_from_data(self, json_array: list, optimize: bool = True) -> Graph:
+        """בניית הגרף ממערך ה-JSON (כפי ש-IFCProcessor מייצר); optimize=False מחזיר את הגרף לפני האופטימיזציה"""
         if not json_array or len(json_array) < 4:
             logger.error("JSON data is not valid or too short: %d elements", len(json_array) if json_array else 0)
             return Graph()
@@ -53,7 +57,7 @@ class BuildGraph:
             ceiling_height = float(json_array[2].get("RoomHeight", 2.5))
             room_area = float(json_array[3].get("RoomArea", 20.0))
 
-            logger.debug(f" חדר: {room_type}, {recommended_lux} לוקס, גובה {ceiling_height}מ, שטח {room_area}מר")
+            logger.debug(" חדר: %s, %s לוקס, גובה %sמ, שטח %sמר", room_type, recommended_lux, ceiling_height, room_area)
 
         except Exception as e:
             logger.error("Error extracting room properties: %s", str(e))
@@ -66,6 +70,7 @@ class BuildGraph:
         elements = json_array[4:] if len(json_array) > 4 else []
         logger.debug("Extracted %d elements", len(elements))
 
+        build_started = time.perf_counter()
         graph = Graph()
 
         try:
@@ -104,52 +109,94 @@ class BuildGraph:
         try:
             for i, element in enumerate(elements):
                 try:
-                    logger.debug("Processing element %d: %s", i, element)
                     self.add_element(graph, element)
 
                     if self.is_require_light_fixed(element):
-                        logger.debug("Element %d requires light", i)
-
                         furniture_light = self.add_light_above_element(graph, element, room_type,
                                                                        actual_ceiling_height, recommended_lux)
                         if furniture_light:
                             furniture_elements.append(element)
-                            logger.debug("🪑 הוספתי מנורת ריהוט")
 
                 except Exception as e:
                     logger.error("Error processing element %d: %s", i, str(e))
         except Exception as e:
             logger.error("Error iterating through elements: %s", str(e))
 
-        logger.debug("Graph building completed with %d vertices and %d edges",
-                     len(graph.vertices), len(graph.edges))
+        STAGE_SECONDS.observe(time.perf_counter() - build_started, "build_graph")
+        VERTICES.inc(graph.vertex_count)
+        EDGES.inc(graph.edge_count)
+        logger.debug("Graph building completed: %d elements, %d furniture lights, %d vertices, %d edges",
+                     len(elements), len(furniture_elements), graph.vertex_count, graph.edge_count)
 
-        # הצגת הגרף לפני האופטימיזציה
-        try:
-            self.visualize_graph(graph, f"תכנית תאורה לפני אופטימיזציה - {room_type}")
-        except Exception as e:
-            logger.warning("Could not display graph visualization: %s", str(e))
+        if not optimize:
+            return graph
 
         # אופטימיזציה - תוקן
         try:
             logger.debug("🔧 מתחיל אופטימיזציה...")
 
-            optimized_lights = algorithm.algorithm(graph)
+            with timed("optimize"):
+                optimized_lights = algorithm.algorithm(graph)
 
-            logger.debug(f"✅ האופטימיזציה החזירה: {len(optimized_lights)} מנורות")
-
-            # הצגת תוצאות האופטימיזציה
-            try:
-                self.visualize_graph(graph, f"תכנית תאורה אחרי אופטימיזציה - {room_type}")
-            except Exception as e:
-                logger.warning("Could not display optimized graph: %s", str(e))
+            logger.debug("✅ האופטימיזציה החזירה: %d מנורות", len(optimized_lights))
 
         except Exception as e:
-            logger.error(f"❌ שגיאה באופטימיזציה: {str(e)}")
+            logger.error("❌ שגיאה באופטימיזציה: %s", e)
+
+        logger.debug("מחזיר גרף עם %d צמתים ו-%d קשתות", graph.vertex_count, graph.edge_count)
+        return graph
+
+    def build_layers(self, json_array: list):
+        """גרף בסיס ללא מנורות (לשיתוף בין תצורות) ורשימת המנורות שנוצרו - GraphOverlay(base, lights) משחזר את הגרף"""
+        base = self.build_graph_from_data(json_array, optimize=False)
+        # העוצמות הנדרשות נקבעות פעם אחת על הבסיס, לפני שהתצורות משתפות אותו בין threads
+        ShadowOptimizer(base, precompute=False).assign_required_lux()
+        light_ids = [vertex_id for vertex_id, vertex in base.iter_vertices() if isinstance(vertex, LightVertex)]
+        lights = [base.vertices[vertex_id] for vertex_id in light_ids]
+        base.remove_vertices(light_ids)
+        base.compact()
+        return base, lights
+
+    def build_graph_with_stored_lights(self, json_array: list, light_rows) -> Graph:
+        """גאומטריית החדר מה-JSON השמור + המנורות השמורות במסד (Light)"""
+        graph = self.build_graph_from_data(json_array, optimize=False)
+
+        # מנורות הגרף המקורי מחושבות באופן דטרמיניסטי מהאלמנטים - מזהים אותן לפי מיקום
+        generated_lights = {}
+        generated_ids = []
+        room_lumens = 0
+        for vertex_id, vertex in graph.iter_vertices():
+            if isinstance(vertex, LightVertex):
+                generated_lights[self.position_key(vertex.point)] = vertex
+                generated_ids.append(vertex_id)
+                if vertex.light_type == "center":
+                    room_lumens = vertex.lumens
+
+        # הגאומטריה נשארת, המנורות השמורות מחליפות את המנורות שנוצרו
+        graph.remove_vertices(generated_ids)
+
+        # מנורות מרכזיות מהאופטימיזציה נשמרות עם power=0 - הלומן נגזר ממספרן בתצורה
+        stored = [(row, Point3D(row[2] or 0, row[3] or 0, row[4] or 0)) for row in light_rows]
+        optimized_count = sum(1 for _, point in stored if self.position_key(point) not in generated_lights)
+        optimized_lumens = ShadowOptimizer.CENTER_LUMENS_BY_COUNT.get(
+            optimized_count, room_lumens / max(optimized_count, 1))
+
+        for row, point in stored:
+            generated = generated_lights.get(self.position_key(point))
+            if generated is not None:
+                light = LightVertex(point, row[5] or 0, generated.lumens,
+                                    target_id=generated.target_id, light_type=generated.light_type)
+            else:
+                light = LightVertex(point, row[5] or 0, optimized_lumens, target_id=None, light_type="center")
+            graph.add_vertex(light)
 
-        logger.debug(f"מחזיר גרף עם {len(graph.vertices)} צמתים ו-{len(graph.edges)} קשתות")
+        graph.compact()
         return graph
 
+    @staticmethod
+    def position_key(point: Point3D) -> tuple:
+        return (round(point.x, 3), round(point.y, 3), round(point.z, 3))
+
     def calculate_room_center(self, elements: list) -> tuple:
         """חישוב מרכז החדר לפי האלמנטים - פונקציה חדשה"""
         if not elements:
@@ -237,9 +284,16 @@ class BuildGraph:
                 Point3D(x + width, y + length, z + height),
             ]
 
+            # תכונות אופטיות - נפתרות פעם אחת לאלמנט ומשותפות לכל 8 הצמתים
+            material = e.get("Material") or ""
+            optics = OpticalProperties.get_by_material_name(material, e.get("Thickness"))
+
             vertex_ids = []
             for pt in points:
-                vertex_id = g.add_vertex(ObstanceVertex(dummy_id, pt, 0, 0))
+                vertex = ObstanceVertex(dummy_id, pt, 0, 0)
+                vertex.material = material
+                vertex.optics = optics
+                vertex_id = g.add_vertex(vertex)
                 vertex_ids.append(vertex_id)
 
             edges = [
@@ -326,111 +380,3 @@ class BuildGraph:
         except Exception as e:
             logger.error("Error calculating lumens: %s", str(e))
             return 0
-
-    def visualize_graph(self, graph: Graph, title="תכנית קומה"):
-        """הצגת הגרף - מבט עליון ותלת-ממדי"""
-        if not graph.vertices:
-            logger.warning("Graph is empty, nothing to visualize")
-            return
-
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 8))
-
-        self.plot_2d_view(graph, ax1, f"{title} - מבט עליון")
-
-        ax2.remove()
-        ax2 = fig.add_subplot(122, projection='3d')
-        self.plot_3d_view(graph, ax2, f"{title} - תלת-ממד")
-
-        plt.tight_layout()
-        plt.show()
-
-    def plot_2d_view(self, graph: Graph, ax, title):
-        """הצגה דו-ממדית (מבט עליון)"""
-        walls_x, walls_y = [], []
-        center_lights_x, center_lights_y = [], []
-        furniture_lights_x, furniture_lights_y = [], []
-        furniture_x, furniture_y = [], []
-        other_x, other_y = [], []
-
-        for vertex in graph.vertices:
-            x, y = vertex.point.x, vertex.point.y
-
-            if isinstance(vertex, LightVertex):
-                if getattr(vertex, 'light_type', 'center') == "center":
-                    center_lights_x.append(x)
-                    center_lights_y.append(y)
-                else:
-                    furniture_lights_x.append(x)
-                    furniture_lights_y.append(y)
-            elif hasattr(vertex, 'required_lux') and vertex.required_lux > 0:
-                furniture_x.append(x)
-                furniture_y.append(y)
-            elif hasattr(vertex, 'reflection_factor') and vertex.reflection_factor > 0.05:
-                walls_x.append(x)
-                walls_y.append(y)
-            else:
-                other_x.append(x)
-                other_y.append(y)
-
-        if walls_x:
-            ax.scatter(walls_x, walls_y, c='blue', s=100, marker='s', label='קירות', alpha=0.7)
-        if center_lights_x:
-            ax.scatter(center_lights_x, center_lights_y, c='red', s=200, marker='*', label='תאורה מרכזית', alpha=0.9)
-        if furniture_lights_x:
-            ax.scatter(furniture_lights_x, furniture_lights_y, c='orange', s=120, marker='*', label='תאורת ריהוט',
-                       alpha=0.8)
-        if furniture_x:
-            ax.scatter(furniture_x, furniture_y, c='green', s=120, marker='o', label='ריהוט', alpha=0.7)
-        if other_x:
-            ax.scatter(other_x, other_y, c='gray', s=80, marker='.', label='אחר', alpha=0.5)
-
-        # הצגת קשתות
-        for edge in graph.edges:
-            if edge.start < len(graph.vertices) and edge.end < len(graph.vertices):
-                start_vertex = graph.vertices[edge.start]
-                end_vertex = graph.vertices[edge.end]
-
-                if not isinstance(start_vertex, LightVertex) and not isinstance(end_vertex, LightVertex):
-                    ax.plot([start_vertex.point.x, end_vertex.point.x],
-                            [start_vertex.point.y, end_vertex.point.y],
-                            'b-', alpha=0.6, linewidth=1)
-
-        ax.set_xlabel('X (מטר)')
-        ax.set_ylabel('Y (מטר)')
-        ax.set_title(title)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-        ax.set_aspect('equal')
-
-    def plot_3d_view(self, graph: Graph, ax, title):
-        """הצגה תלת-ממדית"""
-        for vertex in graph.vertices:
-            x, y, z = vertex.point.x, vertex.point.y, vertex.point.z
-
-            if isinstance(vertex, LightVertex):
-                if getattr(vertex, 'light_type', 'center') == "center":
-                    ax.scatter(x, y, z, c='red', s=200, marker='*', alpha=0.9)
-                else:
-                    ax.scatter(x, y, z, c='orange', s=120, marker='*', alpha=0.8)
-            elif hasattr(vertex, 'required_lux') and vertex.required_lux > 0:
-                ax.scatter(x, y, z, c='green', s=120, marker='o', alpha=0.7)
-            elif hasattr(vertex, 'reflection_factor') and vertex.reflection_factor > 0.05:
-                ax.scatter(x, y, z, c='blue', s=100, marker='s', alpha=0.7)
-            else:
-                ax.scatter(x, y, z, c='gray', s=80, marker='.', alpha=0.5)
-
-        # הצגת קשתות
-        for edge in graph.edges:
-            if edge.start < len(graph.vertices) and edge.end < len(graph.vertices):
-                start_vertex = graph.vertices[edge.start]
-                end_vertex = graph.vertices[edge.end]
-
-                ax.plot([start_vertex.point.x, end_vertex.point.x],
-                        [start_vertex.point.y, end_vertex.point.y],
-                        [start_vertex.point.z, end_vertex.point.z],
-                        'b-', alpha=0.4, linewidth=1)
-
-        ax.set_xlabel('X (מטר)')
-        ax.set_ylabel('Y (מטר)')
-        ax.set_zlabel('Z (מטר)')
-        ax.set_title(title)
\ No newline at end of file
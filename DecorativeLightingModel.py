@@ -1,11 +1,22 @@
 import os
+import numpy as np
 from ultralytics import YOLO
 
+from ImageDecoding import YOLO_IMAGE_SIZE, to_bgr
+
 class DecorativeLightingModel:
-    def __init__(self, model_path="yolov8n.pt"):
+    def __init__(self, model_path="yolov8n.pt", imgsz=YOLO_IMAGE_SIZE, conf=0.25, filter_classes=True):
+        """
+        imgsz: רזולוציית ההסקה (כפולה של 32); conf: סף ביטחון מינימלי;
+        filter_classes: הרצת YOLO רק על המחלקות הרלוונטיות לסוג החדר
+        """
         print("טוען מודל YOLO...")
         self.model = YOLO(model_path)
         print("מודל נטען.")
+        self.imgsz = imgsz
+        self.conf = conf
+        self.filter_classes = filter_classes
+        self._class_ids = {name.lower(): cls_id for cls_id, name in self.model.names.items()}
 
         # מיפוי אלמנטים למספר המלצות תאורה לפי סוג חדר
         self.room_recommendations = {
@@ -116,27 +127,67 @@ class DecorativeLightingModel:
             }
         }
 
-    def analyze_image(self, image_path, room_type):
-        print(f"מבצע ניתוח על התמונה: {image_path} בסוג חדר: {room_type}")
-        results = self.model(image_path)
+    def analyze_image(self, image, room_type):
+        """image: נתיב לקובץ או פריים RGB מפוענח (ImageDecoding.decode_image)"""
+        detected_objects = self.detect_objects([image], room_type)[0]
+        suggestions = self.make_room_based_suggestions(detected_objects, room_type)
+        return detected_objects, suggestions
+
+    def analyze_images(self, images, room_type):
+        """
+        כמה תמונות של אותו חדר: מעבר YOLO אחד על כל ה-batch, ואיחוד הזיהויים -
+        לכל מחלקה נשמר הזיהוי עם הביטחון הגבוה ביותר (עם אינדקס התמונה שבה נמצא).
+        """
+        merged_objects = self.merge_detections(self.detect_objects(images, room_type))
+        suggestions = self.make_room_based_suggestions(merged_objects, room_type)
+        return merged_objects, suggestions
+
+    def room_class_ids(self, room_type):
+        """מזהי המחלקות של המודל שמופיעים ב-allowed_elements של החדר; None - בלי סינון"""
+        room = self.room_recommendations.get((room_type or "").lower())
+        if not self.filter_classes or room is None:
+            return None
+        return sorted(self._class_ids[name] for name in room["allowed_elements"] if name in self._class_ids)
+
+    def detect_objects(self, images, room_type=None):
+        """זיהוי אובייקטים בכל התמונות בקריאה אחת למודל; מחזיר רשימת זיהויים לכל תמונה"""
+        classes = self.room_class_ids(room_type)
+        if classes is not None and not classes:
+            # אף אלמנט של החדר אינו מחלקה של המודל - אין מה לזהות
+            return [[] for _ in images]
 
-        detected_objects = []
+        # YOLO מצפה למערכי numpy בסדר BGR
+        sources = [to_bgr(image) if isinstance(image, np.ndarray) else image for image in images]
+        results = self.model(sources, imgsz=self.imgsz, conf=self.conf, classes=classes, verbose=False)
+
+        detections = []
         for result in results:
-            for box in result.boxes:
-                cls_id = int(box.cls[0])
-                conf = float(box.conf[0])
-                class_name = self.model.names[cls_id].lower()
-                xyxy = box.xyxy[0].cpu().numpy()
-                bbox = [float(coord) for coord in xyxy]
-
-                detected_objects.append({
-                    "class_name": class_name,
+            # העתקה אחת של כל הטנזור: x1, y1, x2, y2, conf, cls
+            data = result.boxes.data.cpu().numpy()
+            bboxes = data[:, :4].tolist()
+            confidences = data[:, -2].tolist()
+            class_ids = data[:, -1].astype(int).tolist()
+
+            detections.append([
+                {
+                    "class_name": self.model.names[cls_id].lower(),
                     "confidence": conf,
                     "bbox": bbox
-                })
+                }
+                for bbox, conf, cls_id in zip(bboxes, confidences, class_ids)
+            ])
+        return detections
 
-        suggestions = self.make_room_based_suggestions(detected_objects, room_type)
-        return detected_objects, suggestions
+    @staticmethod
+    def merge_detections(detections):
+        """זיהוי אחד לכל מחלקה - בעל הביטחון הגבוה ביותר מכל התמונות, ממוין לפי ביטחון"""
+        best = {}
+        for image_index, detected_objects in enumerate(detections):
+            for obj in detected_objects:
+                current = best.get(obj["class_name"])
+                if current is None or obj["confidence"] > current["confidence"]:
+                    best[obj["class_name"]] = dict(obj, image_index=image_index)
+        return sorted(best.values(), key=lambda obj: obj["confidence"], reverse=True)
 
     def make_room_based_suggestions(self, detected_objects, room_type):
         room_type_lower = room_type.lower()
@@ -10,8 +10,8 @@ import numpy as np
 
 from RoomType import RoomType
 from MaterialReflection import MaterialReflection
+from Metrics import ELEMENTS, timed
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 # הגדרות גיאומטריה גלובליות
@@ -19,6 +19,7 @@ GEOMETRY_SETTINGS = ifcopenshell.geom.settings()
 GEOMETRY_SETTINGS.set(GEOMETRY_SETTINGS.USE_WORLD_COORDS, True)
 
 
+@timed("process_ifc_file")
 def process_ifc_file(file_path: str, room_type: str) -> str:
     """
     מעבד קובץ IFC ומייצר קובץ JSON עם כל המידע הרלוונטי
@@ -37,6 +38,7 @@ def process_ifc_file(file_path: str, room_type: str) -> str:
 
     # חילוץ אלמנטים
     elements_data = extract_all_elements(model)
+    ELEMENTS.inc(len(elements_data))
 
     # בניית המבנה הסופי
     results = [
@@ -104,7 +106,7 @@ def extract_room_info(model, room_type) -> dict:
     room_type_enum = RoomType.get_by_name(room_info["RoomType"])
     room_info["RecommendedLux"] = room_type_enum.recommended_lux
 
-    logger.debug("מידע חדר סופי", room_info)
+    logger.debug("מידע חדר סופי: %s", room_info)
     return room_info
 
 
@@ -155,12 +157,14 @@ def extract_all_elements(model) -> list:
     }
 
     elements_data = []
+    failed_count = 0
+    last_error = None
 
     for category, ifc_types in elements_by_type.items():
         for ifc_type in ifc_types:
             try:
                 elements = model.by_type(ifc_type)
-                logger.debug(f"מעבד {len(elements)} אלמנטים מסוג {ifc_type}")
+                logger.debug("מעבד %d אלמנטים מסוג %s", len(elements), ifc_type)
 
                 for element in elements:
                     try:
@@ -168,12 +172,16 @@ def extract_all_elements(model) -> list:
                         if element_data:
                             elements_data.append(element_data)
                     except Exception as e:
-                        logger.warning(f"שגיאה בחילוץ אלמנט: {str(e)}")
+                        failed_count += 1
+                        last_error = e
 
             except Exception as e:
-                logger.warning(f"שגיאה בטעינת אלמנטים מסוג {ifc_type}: {str(e)}")
+                logger.warning("שגיאה בטעינת אלמנטים מסוג %s: %s", ifc_type, e)
 
-    logger.debug(f"חולצו בסך הכל {len(elements_data)} אלמנטים")
+    # סיכום אחד במקום שורה לכל אלמנט שנכשל
+    if failed_count:
+        logger.warning("שגיאה בחילוץ %d אלמנטים (אחרונה: %s)", failed_count, last_error)
+    logger.debug("חולצו בסך הכל %d אלמנטים", len(elements_data))
     return elements_data
 
 
@@ -0,0 +1,264 @@
+# IlluminanceGrid.py - מפת עוצמת תאורה על מישור העבודה
+import base64
+import io
+import json
+import logging
+import math
+import zlib
+
+import numpy as np
+
+from models import Graph, LightVertex
+from BuildGraph import BuildGraph
+from Algorithm.ShadowOptimizer import ShadowOptimizer
+from LRUCache import LRUCache
+from MODEL.Usage import Usage
+from MODEL.Light import Light
+
+logger = logging.getLogger(__name__)
+
+
+class IlluminanceGrid:
+    """
+    חישוב לוקס על רשת נקודות במישור העבודה לפי המודל של ShadowOptimizer (ישיר + מוחזר),
+    בצורה וקטורית על מקטעים של נקודות כדי להגביל את הזיכרון
+    """
+
+    def __init__(self, graph: Graph, work_plane_height: float = 0.75, max_chunk_cells: int = 2_000_000):
+        self.optimizer = ShadowOptimizer(graph, precompute=False, material_optics=True)
+        self.lights = self.optimizer.center_lights + self.optimizer.furniture_lights
+        self.work_plane_height = work_plane_height
+        # מספר התאים המקסימלי (נקודות × מכשולים) במערך ביניים אחד
+        self.max_chunk_cells = max_chunk_cells
+
+        self.obstacle_points = self._points_array(self.optimizer.obstacles)
+        self.transparent_points = self._points_array(self.optimizer.transparent_obstacles)
+        transparent_optics = [self.optimizer.get_optics(o) for o in self.optimizer.transparent_obstacles]
+        self.transparent_n2 = np.array([o.refractive_index for o in transparent_optics])
+        self.transparent_internal = np.array([o.internal_transmittance for o in transparent_optics])
+        # לפי הרשומה האופטית - בלי חישוב מוקדם אף אחד לא מעדכן reflection_factor, ו-opt.reflection_surfaces ריק
+        self.reflection_surfaces = [o for o in self.optimizer.obstacles
+                                    if self.optimizer.get_optics(o).reflectance > 0.05]
+
+    def grid_axes(self, resolution: float):
+        """צירי הרשת - מרכזי תאים בתוך תחום המכשולים של החדר"""
+        points = self.obstacle_points if len(self.obstacle_points) else self._points_array(
+            self.optimizer.graph.live_vertices())
+        if not len(points):
+            return np.array([]), np.array([])
+        min_x, min_y = points[:, 0].min(), points[:, 1].min()
+        max_x, max_y = points[:, 0].max(), points[:, 1].max()
+        xs = np.arange(min_x + resolution / 2, max(max_x, min_x + resolution), resolution)
+        ys = np.arange(min_y + resolution / 2, max(max_y, min_y + resolution), resolution)
+        return xs, ys
+
+    def compute(self, resolution: float) -> dict:
+        """מחזיר את מערך הלוקס (ny × nx) ואת נתוני הרשת"""
+        xs, ys = self.grid_axes(resolution)
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        points = np.column_stack([grid_x.ravel(), grid_y.ravel(),
+                                  np.full(grid_x.size, self.work_plane_height)])
+
+        lux = np.empty(len(points))
+        chunk = max(1, self.max_chunk_cells // max(len(self.obstacle_points), 1))
+        for start in range(0, len(points), chunk):
+            lux[start:start + chunk] = self.illuminance_at(points[start:start + chunk])
+
+        return {
+            "lux": lux.reshape(grid_x.shape).astype(np.float32),
+            "origin": [float(xs[0]) if len(xs) else 0.0, float(ys[0]) if len(ys) else 0.0],
+            "resolution": resolution,
+            "work_plane_height": self.work_plane_height,
+        }
+
+    def illuminance_at(self, points: np.ndarray) -> np.ndarray:
+        """תאורה כוללת בנקודות (ישיר + מוחזר) - המקבילה של calculate_total_illumination_at_point"""
+        total = np.zeros(len(points))
+        for light in self.lights:
+            light_pos = np.array([light.point.x, light.point.y, light.point.z])
+            total += self.direct_illumination(light, light_pos, points)
+            total += self.reflected_illumination(light, light_pos, points)
+        return total
+
+    def direct_illumination(self, light: LightVertex, light_pos: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """⚡ חוק הריבוע ההפוך + סנל/פרנל דרך מכשולים שקופים + למברט + דעיכה באוויר"""
+        opt = self.optimizer
+        delta = points - light_pos
+        raw_distance = np.linalg.norm(delta, axis=1)
+        distance = np.maximum(raw_distance, opt.min_distance)
+
+        transmission = self.transmission_through_materials(light_pos, points)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cos_angle = np.where(raw_distance == 0, 0.0, np.abs(delta[:, 2]) / raw_distance)
+
+        luminous_intensity = light.lumens / (4 * math.pi)
+        air_attenuation = np.exp(-opt.air_attenuation_coefficient * distance)
+        direct = luminous_intensity * cos_angle * transmission * air_attenuation / distance ** 2
+        direct[(cos_angle < opt.cos_angle_threshold) | (transmission == 0)] = 0.0
+        return np.maximum(direct, 0.0)
+
+    def transmission_through_materials(self, light_pos: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """🔬 העברת אור דרך המכשולים השקופים בדרך, לכל נקודה"""
+        transmission = np.ones(len(points))
+        if not len(self.transparent_points):
+            return transmission
+
+        opt = self.optimizer
+        n1 = opt.refractive_indices['air']
+        intersects = self.segments_intersect(light_pos, points, self.transparent_points)
+
+        # זווית הפגיעה תלויה רק בכיוון הקרן (כמו calculate_incident_angle_to_surface)
+        delta = points - light_pos
+        length = np.linalg.norm(delta, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cos_incident = np.where(length == 0, 1.0, np.clip(np.abs(delta[:, 2]) / length, 0, 1))
+        incident_angle = np.arccos(cos_incident)
+
+        for k in range(len(self.transparent_points)):
+            hit = intersects[:, k] & (transmission > 0)
+            if not hit.any():
+                continue
+            n2 = self.transparent_n2[k]
+            sin_ratio = (n1 / n2) * np.sin(incident_angle[hit])
+            total_reflection = sin_ratio > 1.0
+            refracted = np.arcsin(np.minimum(sin_ratio, 1.0))
+
+            cos_i, cos_r = np.cos(incident_angle[hit]), np.cos(refracted)
+            rs = ((n1 * cos_i - n2 * cos_r) / (n1 * cos_i + n2 * cos_r)) ** 2
+            rp = ((n1 * cos_r - n2 * cos_i) / (n1 * cos_r + n2 * cos_i)) ** 2
+            fresnel = np.maximum(0.0, 1 - (rs + rp) / 2)
+
+            updated = transmission[hit] * fresnel * self.transparent_internal[k]
+            updated[total_reflection | (updated < 0.01)] = 0.0
+            transmission[hit] = updated
+        return transmission
+
+    def reflected_illumination(self, light: LightVertex, light_pos: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """🪞 אור מוחזר ממשטחים (למברט) - המקבילה של calculate_reflected_illumination"""
+        opt = self.optimizer
+        total = np.zeros(len(points))
+
+        for surface in self.reflection_surfaces:
+            if opt.is_light_blocked(light.point, surface.point):
+                continue
+            cos_incident = opt.calculate_cos_incident_angle(light.point, surface.point)
+            if cos_incident <= 0:
+                continue
+
+            surface_pos = np.array([surface.point.x, surface.point.y, surface.point.z])
+            light_to_surface = max(opt.calculate_distance(light.point, surface.point), opt.min_distance)
+            incident_intensity = light.lumens / (4 * math.pi * light_to_surface ** 2)
+
+            delta = points - surface_pos
+            raw_distance = np.linalg.norm(delta, axis=1)
+            surface_to_point = np.maximum(raw_distance, opt.min_distance)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cos_reflection = np.where(raw_distance == 0, 0.0, np.abs(delta[:, 2]) / raw_distance)
+
+            visible = (cos_reflection > 0) & ~self.segments_intersect(surface_pos, points,
+                                                                     self.obstacle_points).any(axis=1)
+            reflected = (incident_intensity * cos_incident * cos_reflection * opt.get_optics(surface).reflectance /
+                         (math.pi * surface_to_point ** 2))
+            total += np.where(visible, reflected, 0.0)
+        return total
+
+    @staticmethod
+    def segments_intersect(start: np.ndarray, ends: np.ndarray, obstacles: np.ndarray) -> np.ndarray:
+        """מטריצת (נקודות × מכשולים) - המקבילה הווקטורית של line_intersects_obstacle"""
+        if not len(obstacles):
+            return np.zeros((len(ends), 0), dtype=bool)
+
+        ox, oy, oz = obstacles[:, 0][None, :], obstacles[:, 1][None, :], obstacles[:, 2][None, :]
+        x1, y1, z1 = start
+        x2, y2, z2 = ends[:, 0][:, None], ends[:, 1][:, None], ends[:, 2][:, None]
+
+        between = (np.minimum(z1, z2) < oz) & (oz < np.maximum(z1, z2))
+
+        numerator = np.abs((y2 - y1) * ox - (x2 - x1) * oy + x2 * y1 - y2 * x1)
+        denominator = np.sqrt((y2 - y1) ** 2 + (x2 - x1) ** 2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            distance = np.where(denominator == 0,
+                                np.sqrt((ox - x1) ** 2 + (oy - y1) ** 2),
+                                numerator / denominator)
+        return between & (distance < 0.3)
+
+    @staticmethod
+    def _points_array(vertices) -> np.ndarray:
+        return np.array([[v.point.x, v.point.y, v.point.z] for v in vertices], dtype=float).reshape(-1, 3)
+
+
+def summarize(lux: np.ndarray) -> dict:
+    """סיכום הרשת: מינימום/ממוצע/מקסימום ויחסי אחידות"""
+    if not lux.size:
+        return {"min": 0.0, "avg": 0.0, "max": 0.0, "uniformity": 0.0, "diversity": 0.0}
+    lux_min, lux_avg, lux_max = float(lux.min()), float(lux.mean()), float(lux.max())
+    return {
+        "min": lux_min,
+        "avg": lux_avg,
+        "max": lux_max,
+        # U0 = Emin / Eavg, Ud = Emin / Emax
+        "uniformity": lux_min / lux_avg if lux_avg > 0 else 0.0,
+        "diversity": lux_min / lux_max if lux_max > 0 else 0.0,
+    }
+
+
+class IlluminanceService:
+    """מפות תאורה לשימושים שמורים, עם מטמון לפי מזהה שימוש ורזולוציה"""
+    MIN_RESOLUTION = 0.05
+    MAX_POINTS = 250_000
+
+    def __init__(self, cache_size: int = 32):
+        self.cache = LRUCache(max_size=cache_size)
+
+    def get_grid(self, usage_id: int, db, resolution: float = 0.1, work_plane_height: float = 0.75):
+        """מחזיר dict עם הרשת והסיכום, או None אם השימוש לא נמצא"""
+        key = (usage_id, resolution, work_plane_height)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        json_text = Usage(db).get_json_text(usage_id)
+        if not json_text:
+            return None
+
+        graph = BuildGraph().build_graph_with_stored_lights(json.loads(json_text),
+                                                           Light(db).get_by_usage_id(usage_id))
+        grid = IlluminanceGrid(graph, work_plane_height)
+
+        xs, ys = grid.grid_axes(resolution)
+        if len(xs) * len(ys) > self.MAX_POINTS:
+            raise ValueError(f"הרשת גדולה מדי ({len(xs) * len(ys)} נקודות) - יש להגדיל את הרזולוציה")
+
+        result = grid.compute(resolution)
+        result["summary"] = summarize(result["lux"])
+        self.cache.set(key, result)
+        return result
+
+    def invalidate(self, usage_id: int):
+        self.cache.pop_matching(lambda key: key[0] == usage_id)
+
+    @staticmethod
+    def encode_json(result: dict) -> dict:
+        """הרשת כ-float32 דחוס (zlib) בקידוד base64, עם הסיכום"""
+        lux = result["lux"]
+        return {
+            "origin": result["origin"],
+            "resolution": result["resolution"],
+            "work_plane_height": result["work_plane_height"],
+            "shape": list(lux.shape),
+            "dtype": "float32",
+            "encoding": "zlib+base64",
+            "data": base64.b64encode(zlib.compress(lux.tobytes(), 6)).decode('ascii'),
+            "summary": result["summary"],
+        }
+
+    @staticmethod
+    def encode_npz(result: dict) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, lux=result["lux"], origin=np.array(result["origin"]),
+                            resolution=result["resolution"], work_plane_height=result["work_plane_height"])
+        return buffer.getvalue()
+
+
+illuminance_service = IlluminanceService()
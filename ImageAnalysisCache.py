@@ -0,0 +1,155 @@
+# ImageAnalysisCache.py - מטמון תוצאות ניתוח תמונה (סיווג חדר + YOLO) לפי תוכן התמונה
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from LRUCache import LRUCache
+from Metrics import IMAGE_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_SIZE = int(os.environ.get("IMAGE_CACHE_SIZE", "256"))
+IMAGE_CACHE_TTL = float(os.environ.get("IMAGE_CACHE_TTL", str(24 * 3600)))
+# תיקייה לשמירה בדיסק (ריק - זיכרון בלבד)
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR") or None
+# התאמה גם לתמונות כמעט זהות (הקטנה / דחיסה מחדש) לפי dHash
+IMAGE_CACHE_NEAR_DUPLICATE = os.environ.get("IMAGE_CACHE_NEAR_DUPLICATE", "0").lower() in ("1", "true", "yes")
+IMAGE_CACHE_MAX_DISTANCE = int(os.environ.get("IMAGE_CACHE_MAX_DISTANCE", "4"))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """hash תפיסתי (difference hash) של 64 ביט - עמיד להקטנה ולדחיסה מחדש"""
+    img = Image.fromarray(frame).convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(img, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ImageAnalysisCache:
+    """
+    מפתח: sha256 של הבייטים של התמונה + גרסת המודלים, כך שהחלפת מודל לא מחזירה תוצאות ישנות.
+    זיכרון: LRU עם TTL; דיסק (אופציונלי): קובץ JSON לכל רשומה, עם אותו TTL ומגבלת כמות.
+    """
+
+    def __init__(self, max_size: int = IMAGE_CACHE_SIZE, ttl: float = IMAGE_CACHE_TTL,
+                 persist_dir: str = IMAGE_CACHE_DIR, near_duplicate: bool = IMAGE_CACHE_NEAR_DUPLICATE,
+                 max_distance: int = IMAGE_CACHE_MAX_DISTANCE, max_disk_entries: int = None):
+        self.ttl = ttl
+        self.memory = LRUCache(max_size=max_size, ttl=ttl)
+        self.persist_dir = persist_dir
+        self.near_duplicate = near_duplicate
+        self.max_distance = max_distance
+        self.max_disk_entries = max_disk_entries or max_size * 10
+        # מפתח -> dHash, לחיפוש תמונות כמעט זהות
+        self._perceptual = {}
+        self._lock = threading.Lock()
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    def get(self, data: bytes, model_version: str):
+        """התאמה מדויקת לפי תוכן - לפני פענוח התמונה"""
+        key = self._key(content_hash(data), model_version)
+        result = self.memory.get(key)
+        if result is None and self.persist_dir:
+            result = self._read_disk(key)
+        IMAGE_CACHE_LOOKUPS.inc(1, "hit" if result is not None else "miss")
+        return result
+
+    def get_similar(self, frame: np.ndarray, model_version: str):
+        """התאמה לתמונה כמעט זהה (אחרי פענוח); None אם האפשרות כבויה או שאין התאמה"""
+        if not self.near_duplicate:
+            return None
+        target = dhash(frame)
+        with self._lock:
+            candidates = [(hamming_distance(target, value), key) for key, value in self._perceptual.items()
+                          if key[1] == model_version]
+        for distance, key in sorted(candidates):
+            if distance > self.max_distance:
+                break
+            result = self.memory.get(key)
+            if result is not None:
+                IMAGE_CACHE_LOOKUPS.inc(1, "near_hit")
+                return result
+        return None
+
+    def set(self, data: bytes, model_version: str, result: dict, frame: np.ndarray = None):
+        key = self._key(content_hash(data), model_version)
+        self.memory.set(key, result)
+        if self.near_duplicate and frame is not None:
+            with self._lock:
+                self._perceptual[key] = dhash(frame)
+                if len(self._perceptual) > 2 * self.memory.max_size:
+                    # ניקוי רשומות שכבר נפלטו מהזיכרון
+                    self._perceptual = {k: v for k, v in self._perceptual.items() if self.memory.get(k) is not None}
+        if self.persist_dir:
+            self._write_disk(key, result)
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            self._perceptual.clear()
+
+    @staticmethod
+    def _key(digest: str, model_version: str) -> tuple:
+        return digest, model_version
+
+    def _disk_path(self, key: tuple) -> str:
+        version = hashlib.sha1(key[1].encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.persist_dir, f"{key[0]}-{version}.json")
+
+    def _read_disk(self, key: tuple):
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl and record.get("stored_at", 0) + self.ttl <= time.time():
+            self._remove(path)
+            return None
+        self.memory.set(key, record["result"])
+        return record["result"]
+
+    def _write_disk(self, key: tuple, result: dict):
+        path = self._disk_path(key)
+        try:
+            # כתיבה אטומית - קובץ זמני והחלפה
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": time.time(), "result": result}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except OSError as e:
+            logger.warning("שמירת ניתוח תמונה לדיסק נכשלה: %s", e)
+
+    def _prune_disk(self):
+        entries = [entry for entry in os.scandir(self.persist_dir) if entry.name.endswith(".json")]
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+image_analysis_cache = ImageAnalysisCache()
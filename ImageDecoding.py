@@ -0,0 +1,35 @@
+# ImageDecoding.py - פענוח תמונה שהועלתה פעם אחת, מהזיכרון, לשימוש משותף של כל המודלים
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+# גודל הקלט של YOLO (imgsz) - הצד הארוך של הפריים לא צריך להיות גדול ממנו
+YOLO_IMAGE_SIZE = int(os.environ.get("YOLO_IMAGE_SIZE", "640"))
+
+
+def decode_image(data: bytes, max_side: int = YOLO_IMAGE_SIZE) -> np.ndarray:
+    """
+    פענוח בייטים של JPG/PNG למערך RGB (uint8, HxWx3).
+    ב-JPEG נעשה שימוש ב-draft mode: ה-DCT מפוענח ישירות בקנה מידה מוקטן (1/2, 1/4, 1/8)
+    שעדיין גדול או שווה ל-max_side, כך שתמונת טלפון של 12MP לא מפוענחת בגודל מלא.
+    זורק ValueError אם הבייטים אינם תמונה.
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        if img.format == "JPEG":
+            img.draft("RGB", (max_side, max_side))
+        img = img.convert("RGB")
+    except Exception as e:
+        raise ValueError(f"Invalid image: {e}") from e
+
+    # תמונות שאינן JPEG (או ש-draft לא הקטין מספיק) - הקטנה לגודל של YOLO
+    if max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.BILINEAR)
+    return np.asarray(img)
+
+
+def to_bgr(frame: np.ndarray) -> np.ndarray:
+    """הפריים בסדר הערוצים של OpenCV, כפי ש-YOLO מצפה למערכי numpy"""
+    return np.ascontiguousarray(frame[..., ::-1])
@@ -0,0 +1,78 @@
+# InferenceBatcher.py - איגוד בקשות חיזוי מקבילות למעבר אחד במודל
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from Metrics import INFERENCE_BATCH_SIZE, INFERENCE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceBatcher:
+    """
+    בקשות מקבילות מכניסות דגימה (כבר מעובדת) לתור; עובד אחד אוסף עד max_batch_size דגימות
+    או עד שעבר max_wait_ms מהדגימה הראשונה, מריץ predict_batch פעם אחת ב-thread ומחזיר לכל קורא את השורה שלו.
+    """
+
+    def __init__(self, name: str, predict_batch, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.name = name
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = None
+        self._worker = None
+        self._loop = None
+
+    async def predict(self, sample: np.ndarray) -> np.ndarray:
+        """חיזוי לדגימה אחת (בלי ממד ה-batch) - מחכה לתוצאה של ה-batch שהיא נכנסה אליו"""
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        await self._queue.put((sample, future))
+        return await future
+
+    def _ensure_worker(self, loop):
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._process(loop, batch)
+
+    async def _process(self, loop, batch: list):
+        INFERENCE_BATCH_SIZE.observe(len(batch), self.name)
+        started = time.perf_counter()
+        try:
+            # דגימה בצורה שונה מהשאר מכשילה את ה-batch כולו, וגם אז כל ה-futures מקבלים את השגיאה
+            samples = np.stack([sample for sample, _ in batch])
+            # החיזוי עצמו חוסם - מחוץ ל-event loop
+            outputs = await loop.run_in_executor(None, self.predict_batch, samples)
+        except Exception as e:
+            logger.error("שגיאה בחיזוי batch של %s (%d דגימות): %s", self.name, len(batch), e)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            INFERENCE_SECONDS.observe(time.perf_counter() - started, self.name)
+
+        for index, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(outputs[index])
@@ -0,0 +1,78 @@
+# JsonCompression.py - דחיסת ה-JSON של שימוש לשמירה במסד (zstd אם מותקן, אחרת gzip)
+import gzip
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IDENTITY = "identity"
+# הקידוד לשמירת JSON חדש: zstd / gzip / identity (בלי דחיסה); ברירת מחדל - zstd אם מותקן
+USAGE_JSON_ENCODING = os.environ.get("USAGE_JSON_ENCODING") or ("zstd" if zstandard else "gzip")
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def compress_json(text: str, encoding: str = USAGE_JSON_ENCODING):
+    """מחזיר (בייטים, קידוד, אורך מקורי בבייטים); הקידוד הוא שם Content-Encoding של HTTP"""
+    raw = text.encode("utf-8")
+    if encoding == "zstd" and zstandard is None:
+        encoding = "gzip"
+    if encoding == "zstd":
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    elif encoding == "gzip":
+        # mtime קבוע - אותו JSON נותן אותם בייטים
+        data = gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    else:
+        data, encoding = raw, IDENTITY
+    return data, encoding, len(raw)
+
+
+def decompress_json(data, encoding: str) -> str:
+    return b"".join(iter_decompress(data, encoding)).decode("utf-8")
+
+
+def iter_decompress(data, encoding: str, chunk_size: int = STREAM_CHUNK_SIZE):
+    """פריסה בחלקים - לשליחה בהזרמה בלי להחזיק את כל ה-JSON הפרוס בזיכרון"""
+    data = bytes(data)
+    if encoding == "gzip":
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        for start in range(0, len(data), chunk_size):
+            chunk = decompressor.decompress(data[start:start + chunk_size])
+            if chunk:
+                yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+    elif encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("JSON stored with zstd but the zstandard package is not installed")
+        yield from zstandard.ZstdDecompressor().read_to_iter(data, read_size=chunk_size, write_size=chunk_size)
+    else:
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """האם כותרת Accept-Encoding של הלקוח מתירה את הקידוד (כולל *, ו-q=0 כדחייה)"""
+    if not accept_encoding:
+        return False
+    wildcard = False
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        name = name.strip().lower()
+        if name == encoding:
+            return q > 0
+        if name == "*":
+            wildcard = q > 0
+    return wildcard
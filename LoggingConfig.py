@@ -0,0 +1,47 @@
+# LoggingConfig.py - הגדרת לוגים מרכזית, מופעלת פעם אחת מ-main.py
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+
+DEFAULT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+_configured = False
+
+
+def configure_logging():
+    """
+    הגדרת הלוגים לפי משתני סביבה:
+    LOG_LEVEL (ברירת מחדל INFO), LOG_FORMAT,
+    LOG_ASYNC=1 - כתיבת הלוגים מ-thread נפרד דרך תור, כך שה-I/O לא יושב על thread הבקשה
+    """
+    global _listener, _configured
+    if _configured:
+        return
+    _configured = True
+
+    level = os.environ.get("LOG_LEVEL", "INFO").upper()
+    formatter = logging.Formatter(os.environ.get("LOG_FORMAT", DEFAULT_FORMAT))
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+
+    if os.environ.get("LOG_ASYNC", "0").lower() in ("1", "true", "yes"):
+        log_queue = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        root.addHandler(handler)
+
+    # ספריות חיצוניות רועשות ב-DEBUG
+    for noisy in ("matplotlib", "PIL", "multipart", "urllib3"):
+        logging.getLogger(noisy).setLevel(max(root.level, logging.INFO))
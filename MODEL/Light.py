@@ -44,6 +44,13 @@ class Light:
         query = "DELETE FROM Light WHERE light_id = %s"
         return bool(self.db.execute_query(query, (light_id,)))
 
+    def delete_by_usage_id(self, usage_id):
+        """מחיקת כל המנורות של שימוש בפקודה אחת; מחזיר כמה נמחקו"""
+        # rowcount נקרא לפני סגירת ה-cursor (execute_query מחזיר cursor סגור)
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM Light WHERE usage_id = %s", (usage_id,))
+            return cursor.rowcount
+
     def get_by_id(self, light_id):
         query = """
         SELECT light_id, usage_id, x, y, z, power
@@ -66,4 +73,53 @@ class Light:
         SELECT light_id, usage_id, x, y, z, power
         FROM Light
         """
-        return self.db.fetch_query(query)
\ No newline at end of file
+        return self.db.fetch_query(query)
+
+    def stream(self, usage_id=None, user_id=None, date_from=None, date_to=None, after_id=None, limit=None,
+               chunk_size=1000):
+        """המנורות לפי מסננים, בסדר light_id, בחלקים (Database.stream_query)"""
+        query, params = self._filtered_query(usage_id, user_id, date_from, date_to, after_id, limit)
+        return self.db.stream_query(query, params, chunk_size)
+
+    def get_page(self, usage_id=None, user_id=None, date_from=None, date_to=None, after_id=None, limit=1000):
+        """
+        עמוד לפי keyset: המנורות עם light_id גדול מ-after_id, עד limit.
+        הלקוח מעביר את ה-light_id האחרון כ-after_id לעמוד הבא - בלי OFFSET שסורק את כל העמודים הקודמים.
+        """
+        query, params = self._filtered_query(usage_id, user_id, date_from, date_to, after_id, limit)
+        return self.db.fetch_query(query, params)
+
+    @staticmethod
+    def _filtered_query(usage_id=None, user_id=None, date_from=None, date_to=None, after_id=None, limit=None):
+        conditions = []
+        params = []
+        join = ""
+
+        if usage_id is not None:
+            conditions.append("l.usage_id = %s")
+            params.append(usage_id)
+        if user_id is not None or date_from is not None or date_to is not None:
+            join = "JOIN `usage` u ON u.usage_id = l.usage_id"
+            if user_id is not None:
+                conditions.append("u.user_id = %s")
+                params.append(user_id)
+            if date_from is not None:
+                conditions.append("u.usage_date >= %s")
+                params.append(date_from)
+            if date_to is not None:
+                conditions.append("u.usage_date < %s")
+                params.append(date_to)
+        if after_id is not None:
+            conditions.append("l.light_id > %s")
+            params.append(after_id)
+
+        query = f"""
+        SELECT l.light_id, l.usage_id, l.x, l.y, l.z, l.power
+        FROM Light l {join}
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY l.light_id
+        """
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        return query, tuple(params)
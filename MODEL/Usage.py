@@ -1,14 +1,21 @@
+from JsonCompression import IDENTITY, compress_json, decompress_json
+
+# שורת שימוש בלי ה-JSON - הוא נקרא רק דרך get_json / get_json_text, בלי פריסה לכל שורה ברשימות
+USAGE_COLUMNS = "usage_id, user_id, usage_date, floor_plan"
+
+
 class Usage:
     def __init__(self, db):
         self.db = db
 
     def create(self, user_id, usage_date=None, floor_plan=None, json_file=None):
         query = """
-        INSERT INTO `usage` (user_id, usage_date, floor_plan, json_file)
-        VALUES (%s, %s, %s, %s)
+        INSERT INTO `usage` (user_id, usage_date, floor_plan, json_file, json_encoding, json_length)
+        VALUES (%s, %s, %s, %s, %s, %s)
         """
+        json_data, encoding, length = compress_json(json_file) if json_file is not None else (None, IDENTITY, None)
         # אם usage_date לא סופק, מסד הנתונים ישתמש ב-CURRENT_TIMESTAMP כברירת מחדל
-        cursor = self.db.execute_query(query, (user_id, usage_date, floor_plan, json_file))
+        cursor = self.db.execute_query(query, (user_id, usage_date, floor_plan, json_data, encoding, length))
         if cursor:
             # החזרת מילון במקום טאפל
             return {"usage_id": cursor.lastrowid}
@@ -28,8 +35,9 @@ class Usage:
             updates.append("floor_plan = %s")
             params.append(floor_plan)
         if json_file is not None:
-            updates.append("json_file = %s")
-            params.append(json_file)
+            json_data, encoding, length = compress_json(json_file)
+            updates.append("json_file = %s, json_encoding = %s, json_length = %s")
+            params.extend((json_data, encoding, length))
 
         if not updates:
             return False
@@ -43,26 +51,60 @@ class Usage:
         query = "DELETE FROM `usage` WHERE usage_id = %s"
         return bool(self.db.execute_query(query, (usage_id,)))
 
+    def delete_cascade(self, usage_id):
+        """
+        מחיקת שימוש וכל המנורות שלו בטרנזקציה אחת.
+        מחזיר (האם השימוש נמחק, כמה מנורות נמחקו); זורק שגיאת מסד אם הטרנזקציה נכשלה.
+        """
+        with self.db.transaction() as cursor:
+            cursor.execute("DELETE FROM Light WHERE usage_id = %s", (usage_id,))
+            lights_deleted = cursor.rowcount
+            cursor.execute("DELETE FROM `usage` WHERE usage_id = %s", (usage_id,))
+            return cursor.rowcount > 0, lights_deleted
+
     def get_by_id(self, usage_id):
-        query = """
-        SELECT usage_id, user_id, usage_date, floor_plan, json_file
+        query = f"""
+        SELECT {USAGE_COLUMNS}
         FROM `usage`
         WHERE usage_id = %s
         """
         result = self.db.fetch_query(query, (usage_id,))
         return result[0] if result else None
 
+    def get_json(self, usage_id):
+        """
+        ה-JSON כפי שהוא שמור: (בייטים, קידוד, אורך מקורי) או None.
+        לשליחה ישירה עם Content-Encoding בלי לפרוס בשרת; json_length חסר בשורות ישנות (identity).
+        """
+        query = "SELECT json_file, json_encoding, json_length FROM `usage` WHERE usage_id = %s"
+        result = self.db.fetch_query(query, (usage_id,))
+        if not result or result[0][0] is None:
+            return None
+        data, encoding, length = result[0]
+        data = bytes(data) if not isinstance(data, str) else data.encode("utf-8")
+        return data, encoding or IDENTITY, length if length is not None else len(data)
+
+    def get_json_text(self, usage_id):
+        """ה-JSON פרוס כמחרוזת, בלי לטעון את תמונת התכנית"""
+        stored = self.get_json(usage_id)
+        return decompress_json(stored[0], stored[1]) if stored else None
+
     def get_by_user_id(self, user_id):
-        query = """
-        SELECT usage_id, user_id, usage_date, floor_plan, json_file
+        query = f"""
+        SELECT {USAGE_COLUMNS}
         FROM `usage`
         WHERE user_id = %s
         """
         return self.db.fetch_query(query, (user_id,))
 
+    def get_ids_by_user_id(self, user_id):
+        """מזהי השימושים בלבד - בלי לטעון את הקבצים"""
+        query = "SELECT usage_id FROM `usage` WHERE user_id = %s"
+        return [row[0] for row in self.db.fetch_query(query, (user_id,))]
+
     def get_all(self):
-        query = """
-        SELECT usage_id, user_id, usage_date, floor_plan, json_file
+        query = f"""
+        SELECT {USAGE_COLUMNS}
         FROM `usage`
         """
         return self.db.fetch_query(query)
\ No newline at end of file
@@ -1,6 +1,11 @@
+import time
+from contextlib import contextmanager
+
 import mysql.connector
 from mysql.connector import Error
 
+from Metrics import DB_QUERY_SECONDS
+
 
 class Database:
     def __init__(self, host="localhost", user="root", password="MySql123!", database="lightprojectdb"):
@@ -36,6 +41,7 @@ class Database:
             return None
 
         cursor = self.connection.cursor()
+        start = time.perf_counter()
         try:
             cursor.execute(query, params or ())
             self.connection.commit()
@@ -45,9 +51,11 @@ class Database:
             return None
         finally:
             cursor.close()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, "execute")
 
     def fetch_query(self, query, params=None):
         cursor = self.connection.cursor()
+        start = time.perf_counter()
         try:
             cursor.execute(query, params or ())
             result = cursor.fetchall()
@@ -56,4 +64,46 @@ class Database:
             print(f"Error: {e}")
             return []
         finally:
-            cursor.close()
\ No newline at end of file
+            cursor.close()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, "fetch")
+
+    def stream_query(self, query, params=None, chunk_size=1000):
+        """
+        מחזיר את התוצאות בחלקים של chunk_size שורות, דרך cursor לא מאוחסן (השורות נשארות בשרת
+        עד שנקראות), כך שהזיכרון קבוע בלי קשר לגודל הטבלה. החיבור תפוס עד שהגנרטור מסתיים.
+        """
+        cursor = self.connection.cursor(buffered=False)
+        start = time.perf_counter()
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            # עצירה באמצע (הלקוח התנתק) - שאר התוצאות נקראות ונזרקות כדי לשחרר את החיבור
+            self.connection.consume_results()
+            cursor.close()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, "stream")
+
+    @contextmanager
+    def transaction(self):
+        """
+        with db.transaction() as cursor: ... - כל הפקודות ב-commit אחד, rollback אם נזרקה שגיאה.
+        בניגוד ל-execute_query, שגיאות מסד נזרקות החוצה.
+        """
+        if not self.connection or not self.connection.is_connected():
+            raise Error("No database connection")
+
+        cursor = self.connection.cursor()
+        start = time.perf_counter()
+        try:
+            yield cursor
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, "transaction")
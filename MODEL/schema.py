@@ -0,0 +1,208 @@
+# schema.py - ניהול סכמת המסד: טבלאות, אינדקסים ומפתחות זרים במיגרציות ממוספרות
+#
+# רץ פעם אחת בעליית השרת (main.py); ידנית: python -m MODEL.schema
+# כל מיגרציה רצה פעם אחת ונרשמת בטבלת schema_version. המיגרציות בודקות מה כבר קיים,
+# כך שהן בטוחות גם על מסד שנוצר ידנית לפני שהיה ניהול סכמה.
+import logging
+import sys
+
+from MODEL.database import Database
+
+logger = logging.getLogger(__name__)
+
+# נעילה בשם ב-MySQL - כמה workers שעולים יחד לא מריצים מיגרציות במקביל
+SCHEMA_LOCK_NAME = "lightplan_schema_migration"
+SCHEMA_LOCK_TIMEOUT = 60
+
+
+def _create_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user (
+            user_id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) NOT NULL,
+            password VARCHAR(255) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS `usage` (
+            usage_id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            usage_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            floor_plan LONGBLOB,
+            json_file LONGTEXT
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Light (
+            light_id INT AUTO_INCREMENT PRIMARY KEY,
+            usage_id INT NOT NULL,
+            x DOUBLE,
+            y DOUBLE,
+            z DOUBLE,
+            power DOUBLE
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def _add_lookup_indexes(cursor):
+    """האינדקסים מאחורי get_by_email, get_by_user_id ו-get_by_usage_id"""
+    if not _index_exists(cursor, "user", "email"):
+        cursor.execute("SELECT COUNT(*) - COUNT(DISTINCT email) FROM user")
+        duplicates = cursor.fetchone()[0]
+        if duplicates:
+            # אינדקס רגיל כדי לא להיכשל; הכפילויות מחכות לטיפול ידני
+            logger.warning("נמצאו %d כתובות אימייל כפולות - נוצר אינדקס לא ייחודי על user.email", duplicates)
+            cursor.execute("CREATE INDEX idx_user_email ON user (email)")
+        else:
+            cursor.execute("CREATE UNIQUE INDEX idx_user_email ON user (email)")
+    if not _index_exists(cursor, "usage", "user_id"):
+        cursor.execute("CREATE INDEX idx_usage_user_id ON `usage` (user_id)")
+    if not _index_exists(cursor, "Light", "usage_id"):
+        cursor.execute("CREATE INDEX idx_light_usage_id ON Light (usage_id)")
+
+
+def _add_foreign_keys(cursor):
+    """
+    מחיקת שימוש מוחקת את המנורות שלו (CASCADE); משתמש עם שימושים לא נמחק (RESTRICT).
+    שורות יתומות לא נמחקות - הן מועברות לטבלאות *_orphaned לבדיקה ידנית לפני הוספת האילוץ.
+    """
+    if not _foreign_key_exists(cursor, "usage", "user_id"):
+        _move_orphans(cursor, "usage", "LEFT JOIN user p ON p.user_id = t.user_id WHERE p.user_id IS NULL")
+        cursor.execute("""
+            ALTER TABLE `usage` ADD CONSTRAINT fk_usage_user
+            FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE RESTRICT
+        """)
+    if not _foreign_key_exists(cursor, "Light", "usage_id"):
+        _move_orphans(cursor, "Light", "LEFT JOIN `usage` p ON p.usage_id = t.usage_id WHERE p.usage_id IS NULL")
+        cursor.execute("""
+            ALTER TABLE Light ADD CONSTRAINT fk_light_usage
+            FOREIGN KEY (usage_id) REFERENCES `usage` (usage_id) ON DELETE CASCADE
+        """)
+
+
+def _move_orphans(cursor, table: str, orphan_join: str):
+    """העברת השורות היתומות של table (t) ל-{table}_orphaned; orphan_join מגדיר את ההורה החסר (p)"""
+    cursor.execute(f"SELECT COUNT(*) FROM `{table}` t {orphan_join}")
+    orphans = cursor.fetchone()[0]
+    if not orphans:
+        return
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS `{table}_orphaned` LIKE `{table}`")
+    cursor.execute(f"INSERT INTO `{table}_orphaned` SELECT t.* FROM `{table}` t {orphan_join}")
+    cursor.execute(f"DELETE t FROM `{table}` t {orphan_join}")
+    logger.warning("%d שורות ב-%s מפנות לרשומה שאינה קיימת - הועברו ל-%s_orphaned", orphans, table, table)
+
+
+def _restrict_user_delete(cursor):
+    """מסדים שהריצו את גרסה 3 הקודמת קיבלו CASCADE מ-user ל-usage - מחיקת משתמש לא מוחקת יותר את השימושים"""
+    cursor.execute("""
+        SELECT delete_rule FROM information_schema.referential_constraints
+        WHERE constraint_schema = DATABASE() AND constraint_name = 'fk_usage_user'
+    """)
+    row = cursor.fetchone()
+    if row and row[0] == "CASCADE":
+        cursor.execute("ALTER TABLE `usage` DROP FOREIGN KEY fk_usage_user")
+        cursor.execute("""
+            ALTER TABLE `usage` ADD CONSTRAINT fk_usage_user
+            FOREIGN KEY (user_id) REFERENCES user (user_id) ON DELETE RESTRICT
+        """)
+
+
+def _compress_usage_json(cursor):
+    """json_file נשמר דחוס (JsonCompression); שורות קיימות נשארות identity ונקראות כמו קודם"""
+    if not _column_exists(cursor, "usage", "json_encoding"):
+        cursor.execute("""
+            ALTER TABLE `usage`
+                MODIFY json_file LONGBLOB,
+                ADD COLUMN json_encoding VARCHAR(16) NOT NULL DEFAULT 'identity',
+                ADD COLUMN json_length BIGINT NULL
+        """)
+
+
+# (גרסה, תיאור, פונקציה) - מוסיפים בסוף בלבד, לא משנים מיגרציה שכבר שוחררה
+MIGRATIONS = [
+    (1, "create tables", _create_tables),
+    (2, "lookup indexes on user.email, usage.user_id, Light.usage_id", _add_lookup_indexes),
+    (3, "foreign keys: Light cascades with its usage, usage restricts user delete", _add_foreign_keys),
+    (4, "compressed usage.json_file with encoding and original length", _compress_usage_json),
+    (5, "usage.user_id foreign key without ON DELETE CASCADE", _restrict_user_delete),
+]
+
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def _index_exists(cursor, table: str, column: str) -> bool:
+    """יש אינדקס שהעמודה היא הראשונה בו (גם אינדקס שנוצר אוטומטית למפתח זר)"""
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s AND seq_in_index = 1
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def _foreign_key_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute("""
+        SELECT 1 FROM information_schema.key_column_usage
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+          AND referenced_table_name IS NOT NULL
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def current_version(cursor) -> int:
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def migrate(db: Database = None) -> int:
+    """מריץ את המיגרציות החסרות ומחזיר את גרסת הסכמה; 0 אם אין חיבור למסד"""
+    db = db or Database()
+    if not db.connection or not db.connection.is_connected():
+        logger.error("אין חיבור למסד - המיגרציות לא הורצו")
+        return 0
+
+    cursor = db.connection.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (SCHEMA_LOCK_NAME, SCHEMA_LOCK_TIMEOUT))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("לא התקבלה נעילת מיגרציה")
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB
+            """)
+            version = current_version(cursor)
+            for migration_version, description, apply in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                logger.info("מריץ מיגרציה %d: %s", migration_version, description)
+                # פקודות DDL ב-MySQL מבצעות commit מרומז - כל מיגרציה חייבת להיות בטוחה להרצה חוזרת
+                apply(cursor)
+                cursor.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                               (migration_version, description))
+                db.connection.commit()
+                version = migration_version
+            return version
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (SCHEMA_LOCK_NAME,))
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    from LoggingConfig import configure_logging
+    configure_logging()
+    version = migrate()
+    print(f"גרסת סכמה: {version}")
+    sys.exit(0 if version else 1)
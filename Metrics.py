@@ -0,0 +1,183 @@
+# Metrics.py - מדידת זמנים ומונים לשלבי התהליך, בפורמט Prometheus
+import bisect
+import functools
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(label_names, label_values, extra=None) -> str:
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, *label_values):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label_values -> [מונים לכל דלי..., +Inf, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _format_labels(self.label_names, label_values, ("le", le))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, label_names=()) -> Counter:
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """כל המדדים בפורמט הטקסט של Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram("lightplan_stage_duration_seconds", "Pipeline stage duration", ("stage",))
+DB_QUERY_SECONDS = registry.histogram("lightplan_db_query_duration_seconds", "Database query duration",
+                                      ("operation",), buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                                                               0.25, 0.5, 1.0, 2.5))
+ELEMENTS = registry.counter("lightplan_elements_total", "IFC elements extracted")
+VERTICES = registry.counter("lightplan_graph_vertices_total", "Graph vertices built")
+EDGES = registry.counter("lightplan_graph_edges_total", "Graph edges built")
+RAY_TESTS = registry.counter("lightplan_ray_tests_total", "Light ray obstruction tests")
+LIGHTS = registry.counter("lightplan_lights_total", "Lights saved to the database")
+IMAGE_CACHE_LOOKUPS = registry.counter("lightplan_image_cache_lookups_total", "Image analysis cache lookups",
+                                       ("result",))
+INFERENCE_BATCH_SIZE = registry.histogram("lightplan_inference_batch_size", "Samples per batched forward pass",
+                                          ("model",), buckets=(1, 2, 4, 8, 16, 32, 64))
+INFERENCE_SECONDS = registry.histogram("lightplan_inference_duration_seconds", "Batched forward pass duration",
+                                       ("model",))
+PASSWORD_HASH_SECONDS = registry.histogram("lightplan_password_hash_duration_seconds",
+                                           "bcrypt hash/verify duration (excluding queueing)", ("operation",))
+AUTH_CACHE_LOOKUPS = registry.counter("lightplan_auth_cache_lookups_total", "Verified-token / user-row cache lookups",
+                                      ("cache", "result"))
+ADMISSION_REQUESTS = registry.counter("lightplan_admission_requests_total", "Upload admission decisions", ("result",))
+ADMISSION_REJECTED = registry.counter("lightplan_admission_rejected_total", "Uploads rejected by admission control",
+                                      ("reason",))
+ADMISSION_QUEUE_SECONDS = registry.histogram("lightplan_admission_queue_wait_seconds",
+                                             "Time an upload waited for an admission slot")
+READ_CACHE_LOOKUPS = registry.counter("lightplan_read_cache_lookups_total", "Read-through cache lookups",
+                                      ("cache", "result"))
+
+
+class _StageTimer:
+    """מודד זמן של שלב - גם כ-with וגם כ-decorator"""
+    __slots__ = ("stage", "_start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STAGE_SECONDS.observe(time.perf_counter() - self._start, self.stage)
+        return False
+
+    def __call__(self, func):
+        stage = self.stage
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - start, stage)
+
+        return wrapper
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __call__(self, func):
+        return func
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timed(stage: str):
+    """⏱ with timed("build_graph"): ... או @timed("build_graph") - ללא עלות כשהמדדים כבויים"""
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(stage)
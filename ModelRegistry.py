@@ -0,0 +1,144 @@
+# ModelRegistry.py - טעינה עצלה של מודלי ה-ML, חימום ברקע ובדיקת מוכנות
+import logging
+import os
+import threading
+
+from ImageDecoding import YOLO_IMAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+ML_FEATURES = ("decorative", "room_classifier")
+
+# ENABLED_ML_FEATURES="decorative,room_classifier" (ברירת מחדל) / "room_classifier" / "none"
+ENABLED_ML_FEATURES = os.environ.get("ENABLED_ML_FEATURES", ",".join(ML_FEATURES))
+# מנוע הרצת מסווג החדרים: keras / tflite / onnx (ראו RoomClassifier.py)
+ROOM_CLASSIFIER_BACKEND = os.environ.get("ROOM_CLASSIFIER_BACKEND", "keras").lower()
+# ברירת מחדל: room_classifier.h5/.tflite/.onnx בתיקיית machineLarning/room_classification
+ROOM_CLASSIFIER_PATH = os.environ.get("ROOM_CLASSIFIER_PATH") or None
+ROOM_CLASSIFIER_THREADS = int(os.environ.get("ROOM_CLASSIFIER_THREADS", "0")) or None
+YOLO_MODEL_PATH = os.environ.get("YOLO_MODEL_PATH", "yolov8n.pt")
+YOLO_CONFIDENCE = float(os.environ.get("YOLO_CONFIDENCE", "0.25"))
+# הרצת YOLO רק על מחלקות שרלוונטיות לסוג החדר
+YOLO_FILTER_CLASSES = os.environ.get("YOLO_FILTER_CLASSES", "1").lower() not in ("0", "false", "no")
+ML_WARMUP = os.environ.get("ML_WARMUP", "1").lower() not in ("0", "false", "no")
+# איגוד חיזויי סיווג החדר: גודל batch מקסימלי וזמן המתנה מקסימלי לדגימה הראשונה
+ROOM_CLASSIFIER_MAX_BATCH = int(os.environ.get("ROOM_CLASSIFIER_MAX_BATCH", "16"))
+ROOM_CLASSIFIER_MAX_WAIT_MS = float(os.environ.get("ROOM_CLASSIFIER_MAX_WAIT_MS", "5"))
+
+
+def parse_features(value: str) -> set:
+    names = {name.strip().lower() for name in (value or "").split(",") if name.strip()}
+    if names & {"none", "off"}:
+        return set()
+    unknown = names - set(ML_FEATURES)
+    if unknown:
+        logger.warning("מודלים לא מוכרים ב-ENABLED_ML_FEATURES: %s", ", ".join(sorted(unknown)))
+    return names & set(ML_FEATURES)
+
+
+class ModelRegistry:
+    """
+    מחזיק את מודלי ה-ML של השרת. הייבוא הכבד (tensorflow, onnxruntime, ultralytics) נעשה רק בטעינת מודל,
+    כך ששרת בלי מודלים פעילים עולה בלי לשלם עליו.
+    """
+
+    def __init__(self, enabled_features=None):
+        self.enabled = parse_features(ENABLED_ML_FEATURES) if enabled_features is None else set(enabled_features)
+        self._loaders = {
+            "decorative": self._load_decorative,
+            "room_classifier": self._load_room_classifier,
+        }
+        self._models = {}
+        self._errors = {}
+        self._locks = {name: threading.Lock() for name in ML_FEATURES}
+        self._warmup_thread = None
+
+    def is_enabled(self, name: str) -> bool:
+        return name in self.enabled
+
+    def get(self, name: str):
+        """המודל הטעון, טעינה בקריאה הראשונה; None אם המודל כבוי או שהטעינה נכשלה"""
+        if name not in self.enabled:
+            return None
+        if name in self._models or name in self._errors:
+            return self._models.get(name)
+
+        with self._locks[name]:
+            # ייתכן שה-thread של החימום סיים בזמן שחיכינו
+            if name not in self._models and name not in self._errors:
+                self._load(name)
+        return self._models.get(name)
+
+    def _load(self, name: str):
+        try:
+            self._models[name] = self._loaders[name]()
+            logger.info(" מודל %s נטען", name)
+        except Exception as e:
+            self._errors[name] = str(e)
+            logger.error(" שגיאה בטעינת מודל %s: %s", name, e)
+
+    def warm_up_async(self):
+        """טעינת כל המודלים הפעילים ב-thread רקע - השרת מקבל בקשות בינתיים"""
+        if self._warmup_thread is not None or not self.enabled:
+            return
+        self._warmup_thread = threading.Thread(target=self._warm_up, name="model-warmup", daemon=True)
+        self._warmup_thread.start()
+
+    def _warm_up(self):
+        for name in ML_FEATURES:
+            self.get(name)
+
+    def is_ready(self) -> bool:
+        """כל המודלים הפעילים נטענו; מודל שהטעינה שלו נכשלה משאיר את השרת לא מוכן"""
+        return all(name in self._models for name in self.enabled)
+
+    def failed(self) -> dict:
+        """המודלים הפעילים שהטעינה שלהם נכשלה והשגיאה - לא נטענים שוב עד הפעלה מחדש"""
+        return {name: error for name, error in self._errors.items() if name in self.enabled}
+
+    def model_version(self) -> str:
+        """מזהה גרסה של המודלים הטעונים כרגע (מנוע, קובץ, גודל וזמן שינוי) - למפתחות מטמון"""
+        parts = []
+        for name in ML_FEATURES:
+            if name not in self._models:
+                parts.append(f"{name}=none")
+                continue
+            path = YOLO_MODEL_PATH if name == "decorative" else ROOM_CLASSIFIER_PATH
+            if name == "decorative":
+                name = f"{name}:{YOLO_IMAGE_SIZE}:{YOLO_CONFIDENCE}:{int(YOLO_FILTER_CLASSES)}"
+            if name == "room_classifier":
+                from RoomClassifier import default_model_path
+                path = path or default_model_path(ROOM_CLASSIFIER_BACKEND)
+                name = f"{name}:{ROOM_CLASSIFIER_BACKEND}"
+            try:
+                stat = os.stat(path)
+                parts.append(f"{name}={os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}")
+            except OSError:
+                parts.append(f"{name}={path}")
+        return ";".join(parts)
+
+    def status(self) -> dict:
+        result = {}
+        for name in ML_FEATURES:
+            if name not in self.enabled:
+                result[name] = "disabled"
+            elif name in self._models:
+                result[name] = "loaded"
+            elif name in self._errors:
+                result[name] = f"failed: {self._errors[name]}"
+            else:
+                result[name] = "loading"
+        return result
+
+    @staticmethod
+    def _load_decorative():
+        from DecorativeLightingModel import DecorativeLightingModel
+        return DecorativeLightingModel(YOLO_MODEL_PATH, YOLO_IMAGE_SIZE, YOLO_CONFIDENCE, YOLO_FILTER_CLASSES)
+
+    @staticmethod
+    def _load_room_classifier():
+        from RoomClassifier import load_room_classifier
+        return load_room_classifier(ROOM_CLASSIFIER_BACKEND, ROOM_CLASSIFIER_PATH, ROOM_CLASSIFIER_THREADS)
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,100 @@
+# OpticalProperties.py
+import math
+from functools import lru_cache
+
+from MaterialReflection import MaterialReflection
+
+# מקדמי שבירה לחוק סנל
+REFRACTIVE_INDICES = {
+    'air': 1.0,
+    'glass': 1.52,
+    'water': 1.33,
+    'plastic': 1.4,
+    'default': 1.0
+}
+
+# מקדמי בליעה (Beer-Lambert)
+ABSORPTION_COEFFICIENTS = {
+    'glass': 0.1, 'water': 0.05, 'plastic': 0.2, 'default': 0.1
+}
+
+TRANSPARENT_MATERIALS = ['glass', 'זכוכית', 'window', 'חלון']
+FLOOR_TRANSPARENT_MATERIALS = ['glass', 'זכוכית', 'window']
+
+
+def get_refractive_index(material_name: str) -> float:
+    """קבלת מקדם שבירה לפי שם החומר"""
+    material_name = (material_name or '').lower()
+    if 'glass' in material_name or 'זכוכית' in material_name:
+        return REFRACTIVE_INDICES['glass']
+    elif 'water' in material_name or 'מים' in material_name:
+        return REFRACTIVE_INDICES['water']
+    elif 'plastic' in material_name or 'פלסטיק' in material_name:
+        return REFRACTIVE_INDICES['plastic']
+    else:
+        return REFRACTIVE_INDICES['default']
+
+
+def get_material_thickness(material_name: str, thickness=None) -> float:
+    """עובי החומר - עובי מפורש אם קיים, אחרת לפי שם החומר"""
+    if thickness:
+        return float(thickness)
+    material_name = (material_name or '').lower()
+    if 'window' in material_name or 'זכוכית' in material_name:
+        return 0.01
+    elif 'glass' in material_name:
+        return 0.005
+    else:
+        return 0.02
+
+
+def get_absorption_coefficient(material_name: str) -> float:
+    """מקדם בליעה לפי שם החומר"""
+    material_name = (material_name or '').lower()
+    for material, coeff in ABSORPTION_COEFFICIENTS.items():
+        if material in material_name:
+            return coeff
+    return ABSORPTION_COEFFICIENTS['default']
+
+
+class OpticalProperties:
+    """תכונות אופטיות של מכשול - מחושבות פעם אחת בבניית הגרף"""
+    __slots__ = ('material_name', 'reflectance', 'refractive_index', 'absorption_coefficient',
+                 'thickness', 'is_transparent', 'internal_transmittance', 'floor_transmission')
+
+    def __init__(self, material_name: str, reflectance: float, refractive_index: float,
+                 absorption_coefficient: float, thickness: float, is_transparent: bool,
+                 floor_transmission: float):
+        self.material_name = material_name
+        self.reflectance = reflectance
+        self.refractive_index = refractive_index
+        self.absorption_coefficient = absorption_coefficient
+        self.thickness = thickness
+        self.is_transparent = is_transparent
+        # דעיכה בתוך החומר (Beer-Lambert) - קבועה לכל קרן שחוצה את המכשול
+        self.internal_transmittance = math.exp(-absorption_coefficient * thickness)
+        # העברת אור לרצפה דרך המכשול (חישוב הצללים)
+        self.floor_transmission = floor_transmission
+
+    @classmethod
+    def get_by_material_name(cls, material_name, thickness=None) -> "OpticalProperties":
+        """מחזיר רשומה אופטית לפי שם החומר (משותפת לכל המכשולים מאותו חומר)"""
+        return _resolve(material_name or '', float(thickness) if thickness else None)
+
+    def __repr__(self):
+        return (f"OpticalProperties({self.material_name!r}, reflectance={self.reflectance}, "
+                f"n={self.refractive_index}, transparent={self.is_transparent})")
+
+
+@lru_cache(maxsize=256)
+def _resolve(material_name: str, thickness) -> OpticalProperties:
+    material_lower = material_name.lower()
+    return OpticalProperties(
+        material_name=material_name,
+        reflectance=MaterialReflection.get_by_material_name(material_name).reflection_factor,
+        refractive_index=get_refractive_index(material_lower),
+        absorption_coefficient=get_absorption_coefficient(material_lower),
+        thickness=get_material_thickness(material_lower, thickness),
+        is_transparent=any(mat in material_lower for mat in TRANSPARENT_MATERIALS),
+        floor_transmission=0.7 if any(mat in material_lower for mat in FLOOR_TRANSPARENT_MATERIALS) else 0.1
+    )
@@ -0,0 +1,72 @@
+# PasswordHasher.py - גיבוב ואימות סיסמאות (bcrypt) ב-thread pool ייעודי, מחוץ ללולאת האירועים
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from Metrics import PASSWORD_HASH_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# עלות bcrypt (log2 של מספר הסבבים) - כל +1 מכפיל את זמן הגיבוב
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# מספר גיבובים במקביל; bcrypt משחרר את ה-GIL, כך שכל worker תופס ליבה
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+
+class PasswordHasher:
+    """
+    ה-pool חסום, כך שגל של התחברויות ממתין בתור ולא תופס את כל ה-threads של השרת.
+    """
+
+    def __init__(self, rounds: int = BCRYPT_ROUNDS, max_workers: int = PASSWORD_HASH_WORKERS):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    def hash_sync(self, password: str) -> str:
+        start = time.perf_counter()
+        hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(self.rounds)).decode("utf-8")
+        PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, "hash")
+        return hashed
+
+    def verify_sync(self, password: str, hashed_password: str) -> bool:
+        if not hashed_password.startswith("$2"):
+            # סיסמה ישנה שלא גובבה (לתקופת מעבר בלבד) - מגובבת מחדש בהתחברות הבאה
+            logger.warning("סיסמה לא מוצפנת במסד הנתונים")
+            return password == hashed_password
+
+        start = time.perf_counter()
+        try:
+            return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+        except ValueError as e:
+            logger.error("גיבוב סיסמה לא תקין במסד הנתונים: %s", e)
+            return False
+        finally:
+            PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, "verify")
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """האם הגיבוב השמור נוצר בעלות אחרת מהמוגדרת (או שאינו bcrypt כלל)"""
+        # פורמט: $2b$12$<salt+hash>
+        parts = hashed_password.split("$")
+        if len(parts) < 4 or not parts[1].startswith("2"):
+            return True
+        try:
+            return int(parts[2]) != self.rounds
+        except ValueError:
+            return True
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.hash_sync, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.verify_sync, password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
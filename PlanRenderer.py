@@ -0,0 +1,130 @@
+# PlanRenderer.py - רינדור תכניות תאורה לפי דרישה (מחוץ לנתיב ההעלאה)
+import io
+import json
+import logging
+
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+from models import Graph, LightVertex
+from BuildGraph import BuildGraph
+from LRUCache import LRUCache
+from MODEL.Usage import Usage
+from MODEL.Light import Light
+
+logger = logging.getLogger(__name__)
+
+# סגנון לכל קטגוריית צמתים: (צבע, גודל, סמן, שקיפות, תווית)
+VERTEX_STYLES = {
+    "walls": ('blue', 100, 's', 0.7, 'קירות'),
+    "center_lights": ('red', 200, '*', 0.9, 'תאורה מרכזית'),
+    "furniture_lights": ('orange', 120, '*', 0.8, 'תאורת ריהוט'),
+    "furniture": ('green', 120, 'o', 0.7, 'ריהוט'),
+    "other": ('gray', 80, '.', 0.5, 'אחר'),
+}
+
+
+class PlanRenderer:
+    """מייצר תמונות PNG/SVG של תכנית תאורה שמורה, עם מטמון לפי מזהה שימוש"""
+    MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+    def __init__(self, cache_size: int = 64):
+        self.cache = LRUCache(max_size=cache_size)
+
+    def render_usage(self, usage_id: int, db, fmt: str = "png"):
+        """מחזיר את תמונת התכנית של השימוש, או None אם השימוש או ה-JSON שלו לא נמצאו"""
+        key = (usage_id, fmt)
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+
+        json_text = Usage(db).get_json_text(usage_id)
+        if not json_text:
+            return None
+
+        graph = BuildGraph().build_graph_with_stored_lights(json.loads(json_text),
+                                                           Light(db).get_by_usage_id(usage_id))
+        image = self.render_graph(graph, f"תכנית תאורה - שימוש {usage_id}", fmt)
+        self.cache.set(key, image)
+        return image
+
+    def invalidate(self, usage_id: int):
+        """ניקוי התמונות השמורות של שימוש אחרי שינוי במנורות או בשימוש"""
+        self.cache.pop_matching(lambda key: key[0] == usage_id)
+
+    def render_graph(self, graph: Graph, title: str, fmt: str = "png") -> bytes:
+        """מבט עליון ותלת-ממדי, צבירת הצמתים והקשתות לאוספים במקום קריאה לכל צומת"""
+        fig = Figure(figsize=(16, 8))
+        ax_2d = fig.add_subplot(121)
+        ax_3d = fig.add_subplot(122, projection='3d')
+
+        groups = self.group_vertices(graph)
+        for name, points in groups.items():
+            if not points:
+                continue
+            color, size, marker, alpha, label = VERTEX_STYLES[name]
+            xs, ys, zs = zip(*points)
+            ax_2d.scatter(xs, ys, c=color, s=size, marker=marker, alpha=alpha, label=label)
+            ax_3d.scatter(xs, ys, zs, c=color, s=size, marker=marker, alpha=alpha)
+
+        segments_2d, segments_3d = self.edge_segments(graph)
+        if segments_2d:
+            ax_2d.add_collection(LineCollection(segments_2d, colors='b', alpha=0.6, linewidths=1))
+        if segments_3d:
+            ax_3d.add_collection3d(Line3DCollection(segments_3d, colors='b', alpha=0.4, linewidths=1))
+
+        ax_2d.set_xlabel('X (מטר)')
+        ax_2d.set_ylabel('Y (מטר)')
+        ax_2d.set_title(f"{title} - מבט עליון")
+        if any(groups.values()):
+            ax_2d.legend()
+        ax_2d.grid(True, alpha=0.3)
+        ax_2d.set_aspect('equal')
+
+        ax_3d.set_xlabel('X (מטר)')
+        ax_3d.set_ylabel('Y (מטר)')
+        ax_3d.set_zlabel('Z (מטר)')
+        ax_3d.set_title(f"{title} - תלת-ממד")
+
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt)
+        return buffer.getvalue()
+
+    def group_vertices(self, graph: Graph) -> dict:
+        """חלוקת הצמתים לקטגוריות התצוגה"""
+        groups = {name: [] for name in VERTEX_STYLES}
+        for vertex in graph.live_vertices():
+            point = (vertex.point.x, vertex.point.y, vertex.point.z)
+            if isinstance(vertex, LightVertex):
+                if getattr(vertex, 'light_type', 'center') == "center":
+                    groups["center_lights"].append(point)
+                else:
+                    groups["furniture_lights"].append(point)
+            elif getattr(vertex, 'required_lux', 0) > 0:
+                groups["furniture"].append(point)
+            elif getattr(vertex, 'reflection_factor', 0) > 0.05:
+                groups["walls"].append(point)
+            else:
+                groups["other"].append(point)
+        return groups
+
+    def edge_segments(self, graph: Graph):
+        """קטעי הקשתות לתצוגה - במבט העליון ללא קשתות של מנורות"""
+        segments_2d, segments_3d = [], []
+        vertex_count = len(graph.vertices)
+        for edge in graph.iter_edges():
+            if edge.start >= vertex_count or edge.end >= vertex_count:
+                continue
+            start, end = graph.vertices[edge.start], graph.vertices[edge.end]
+            if start is None or end is None:
+                continue
+            segments_3d.append([(start.point.x, start.point.y, start.point.z),
+                                (end.point.x, end.point.y, end.point.z)])
+            if not isinstance(start, LightVertex) and not isinstance(end, LightVertex):
+                segments_2d.append([(start.point.x, start.point.y), (end.point.x, end.point.y)])
+        return segments_2d, segments_3d
+
+
+plan_renderer = PlanRenderer()
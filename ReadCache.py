@@ -0,0 +1,143 @@
+# ReadCache.py - מטמון read-through לקריאות החמות של מנורות ושימושים, עם ETag וביטול מרכזי בכתיבה
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from LRUCache import LRUCache
+from Metrics import READ_CACHE_LOOKUPS
+from PlanRenderer import plan_renderer
+from IlluminanceGrid import illuminance_service
+
+logger = logging.getLogger(__name__)
+
+# memory (ברירת מחדל) / diskcache (משותף לכל ה-workers על אותה מכונה) / none
+READ_CACHE_BACKEND = os.environ.get("READ_CACHE_BACKEND", "memory").lower()
+READ_CACHE_SIZE = int(os.environ.get("READ_CACHE_SIZE", "1024"))
+# רשת ביטחון לשינויים שלא עברו דרך השרת הזה (worker אחר עם backend בזיכרון, עדכון ידני במסד)
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", "30"))
+READ_CACHE_DIR = os.environ.get("READ_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "lightplan"))
+
+
+class DiskCacheBackend:
+    """backend מקומי על diskcache (SQLite) - אותו API כמו LRUCache עבור המטמון"""
+
+    def __init__(self, directory: str, ttl: float = None, size_limit: int = 2 ** 28):
+        import diskcache
+
+        self.ttl = ttl
+        self._cache = diskcache.Cache(directory, size_limit=size_limit)
+
+    def get(self, key, default=None):
+        return self._cache.get(key, default)
+
+    def set(self, key, value, ttl: float = None):
+        self._cache.set(key, value, expire=ttl or self.ttl)
+
+    def pop(self, key, default=None):
+        return self._cache.pop(key, default)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def create_backend(name: str = READ_CACHE_BACKEND):
+    if name == "none":
+        return None
+    if name == "diskcache":
+        try:
+            return DiskCacheBackend(READ_CACHE_DIR, READ_CACHE_TTL)
+        except ImportError:
+            logger.warning("diskcache לא מותקן - מטמון הקריאה בזיכרון בלבד")
+    return LRUCache(max_size=READ_CACHE_SIZE, ttl=READ_CACHE_TTL)
+
+
+def compute_etag(value) -> str:
+    payload = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8")
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+
+class ReadCache:
+    """
+    get_or_load(key, loader) מחזיר (ערך, ETag); במטמון נשמר הזוג כדי שה-ETag לא יחושב בכל קריאה.
+    loader שמחזיר None (לא נמצא) לא נשמר.
+    מונה דורות לכל מפתח מונע שמירה של ערך שנקרא מהמסד לפני כתיבה שביטלה אותו באמצע הטעינה.
+    המונה קיים רק כל עוד יש טעינה פעילה של המפתח, כך שהוא לא גדל עם מספר המפתחות שבוטלו אי פעם.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._generations = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get_or_load(self, key: str, loader):
+        if self.backend is not None:
+            cached = self.backend.get(key)
+            if cached is not None:
+                READ_CACHE_LOOKUPS.inc(1, key.split(":", 1)[0], "hit")
+                return cached
+            READ_CACHE_LOOKUPS.inc(1, key.split(":", 1)[0], "miss")
+
+        with self._lock:
+            generation = self._generations.get(key, 0)
+            self._loading[key] = self._loading.get(key, 0) + 1
+        entry = None
+        try:
+            value = loader()
+            if value is None:
+                return None, None
+            entry = (value, compute_etag(value))
+            return entry
+        finally:
+            with self._lock:
+                if entry is not None and self.backend is not None and self._generations.get(key, 0) == generation:
+                    self.backend.set(key, entry)
+                self._loading[key] -= 1
+                if not self._loading[key]:
+                    del self._loading[key]
+                    self._generations.pop(key, None)
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                # בלי טעינה פעילה אין ערך ישן שעלול להישמר - לא צריך מונה
+                if key in self._loading:
+                    self._generations[key] = self._generations.get(key, 0) + 1
+                if self.backend is not None:
+                    self.backend.pop(key)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """השוואת If-None-Match (רשימה, *, או תגים חלשים W/) ל-ETag הנוכחי"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def usage_key(usage_id: int) -> str:
+    return f"usage:{usage_id}"
+
+
+def usage_lights_key(usage_id: int) -> str:
+    return f"lights:usage:{usage_id}"
+
+
+read_cache = ReadCache(create_backend())
+
+
+def invalidate_usage(usage_id: int):
+    """
+    נקודת ביטול אחת לכל מה שנגזר משימוש: הקריאות השמורות, תמונות התכנית ומפת התאורה.
+    נקראת מכל מסלול שיוצר, מעדכן או מוחק שימוש או מנורות.
+    """
+    read_cache.invalidate(usage_key(usage_id), usage_lights_key(usage_id))
+    plan_renderer.invalidate(usage_id)
+    illuminance_service.invalidate(usage_id)
@@ -0,0 +1,106 @@
+# RoomClassifier.py - מנועי הרצה למסווג החדרים (Keras / TFLite / ONNX) על CPU
+import os
+import threading
+
+import numpy as np
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "machineLarning", "room_classification")
+
+# סדר המחלקות כפי שנלמד ב-flow_from_directory (אלפביתי)
+ROOM_TYPES = ["bathroom", "bedroom", "dining", "gaming", "kitchen", "laundry", "living", "office", "terrace", "yard"]
+INPUT_SIZE = (64, 64)
+
+BACKEND_EXTENSIONS = {"keras": ".h5", "tflite": ".tflite", "onnx": ".onnx"}
+
+
+def preprocess(frame: np.ndarray) -> np.ndarray:
+    """פריים RGB (uint8) לקלט המסווג: 64x64 בהקטנת nearest (כמו keras load_img באימון), מנורמל ל-0..1"""
+    from PIL import Image
+
+    img = Image.fromarray(frame).resize(INPUT_SIZE, Image.NEAREST)
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def default_model_path(backend: str) -> str:
+    return os.path.join(MODEL_DIR, "room_classifier" + BACKEND_EXTENSIONS[backend])
+
+
+class KerasRoomClassifier:
+    """המודל המקורי - דורש tensorflow מלא"""
+    backend = "keras"
+
+    def __init__(self, model_path: str):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFLiteRoomClassifier:
+    """
+    מפרש TFLite - tflite_runtime אם מותקן (ללא tensorflow), אחרת tf.lite.
+    קובץ המודל ממופה לזיכרון, כך שכמה workers על אותה מכונה חולקים את דפי המשקולות.
+    """
+    backend = "tflite"
+
+    def __init__(self, model_path: str, num_threads: int = None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch_size = int(self.interpreter.get_input_details()[0]["shape"][0])
+        # המפרש אינו בטוח לשימוש מכמה threads
+        self._lock = threading.Lock()
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self.input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self.output_index).copy()
+
+
+class OnnxRoomClassifier:
+    """onnxruntime על CPU"""
+    backend = "onnx"
+
+    def __init__(self, model_path: str, num_threads: int = None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_on_batch(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: np.asarray(batch, dtype=np.float32)})[0]
+
+
+BACKENDS = {
+    "keras": KerasRoomClassifier,
+    "tflite": TFLiteRoomClassifier,
+    "onnx": OnnxRoomClassifier,
+}
+
+
+def load_room_classifier(backend: str = "keras", model_path: str = None, num_threads: int = None):
+    """טעינת המסווג במנוע המבוקש; model_path ברירת מחדל לפי סיומת המנוע בתיקיית המודל"""
+    backend = (backend or "keras").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown room classifier backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    model_path = model_path or default_model_path(backend)
+    if backend == "keras":
+        return KerasRoomClassifier(model_path)
+    return BACKENDS[backend](model_path, num_threads=num_threads)
@@ -0,0 +1,50 @@
+# bench_bulk_delete.py - מחיקת מנורות של שימוש: שורה-שורה (N+1) מול פקודה אחת, לפי מספר המנורות
+#
+# דורש MySQL. כל סבב מכניס מחדש את המנורות (ב-setup, מחוץ למדידה).
+import uuid
+from datetime import datetime
+
+import pytest
+
+from MODEL.Light import Light
+from MODEL.Usage import Usage
+from MODEL.User import User
+from MODEL.schema import migrate
+
+LIGHT_COUNTS = [10, 100, 1000]
+
+
+@pytest.fixture(scope="module")
+def usage_id(database):
+    migrate(database)
+    user_id = User(database).create(f"bench-{uuid.uuid4().hex}@example.com", "x")[0]
+    usage_id = Usage(database).create(user_id=user_id, usage_date=datetime.now())["usage_id"]
+    yield usage_id
+    # מחיקת השימוש מוחקת את המנורות (ON DELETE CASCADE); המשתמש נמחק רק כשאין לו שימושים
+    Usage(database).delete_cascade(usage_id)
+    User(database).delete(user_id)
+
+
+def insert_lights(database, usage_id: int, count: int):
+    with database.transaction() as cursor:
+        cursor.executemany("INSERT INTO Light (usage_id, x, y, z, power) VALUES (%s, %s, %s, %s, %s)",
+                           [(usage_id, float(i), float(i), 2.5, 300.0) for i in range(count)])
+
+
+def delete_per_row(database, usage_id: int):
+    """ההתנהגות הקודמת של DELETE /lights/usage/{usage_id}"""
+    light_dal = Light(database)
+    for light in light_dal.get_by_usage_id(usage_id):
+        light_dal.delete(light[0])
+
+
+@pytest.mark.parametrize("mode", ["per_row", "set_based"])
+@pytest.mark.parametrize("count", LIGHT_COUNTS, ids=lambda count: f"{count}lights")
+@pytest.mark.benchmark(group="bulk_delete")
+def bench_delete_lights_by_usage(benchmark, database, usage_id, count, mode):
+    delete = delete_per_row if mode == "per_row" else (lambda db, uid: Light(db).delete_by_usage_id(uid))
+
+    benchmark.pedantic(delete, args=(database, usage_id), setup=lambda: insert_lights(database, usage_id, count),
+                       rounds=1 if mode == "per_row" and count >= 1000 else 5)
+    benchmark.extra_info["lights"] = count
+    assert not Light(database).get_by_usage_id(usage_id)
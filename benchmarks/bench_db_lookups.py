@@ -0,0 +1,53 @@
+# bench_db_lookups.py - השאילתות החמות (get_by_email / get_by_user_id / get_by_usage_id) ובדיקת EXPLAIN
+#
+# דורש MySQL. מריץ את המיגרציות, ומוודא שכל שאילתה משתמשת באינדקס ולא בסריקה מלאה (type=ALL).
+import pytest
+
+from MODEL.Light import Light
+from MODEL.Usage import Usage
+from MODEL.User import User
+from MODEL.schema import MIGRATIONS, migrate
+
+HOT_QUERIES = {
+    "user_by_email": ("SELECT user_id, email, password FROM user WHERE email = %s", ("bench@example.com",)),
+    "usage_by_user_id": ("SELECT usage_id, user_id, usage_date, floor_plan FROM `usage` "
+                         "WHERE user_id = %s", (1,)),
+    "light_by_usage_id": ("SELECT light_id, usage_id, x, y, z, power FROM Light WHERE usage_id = %s", (1,)),
+}
+
+
+@pytest.fixture(scope="module")
+def migrated(database):
+    assert migrate(database) == MIGRATIONS[-1][0]
+    return database
+
+
+def explain(db, query: str, params: tuple) -> dict:
+    cursor = db.connection.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + query, params)
+        return cursor.fetchall()[0]
+    finally:
+        cursor.close()
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def bench_hot_query_uses_index(name, migrated):
+    plan = explain(migrated, *HOT_QUERIES[name])
+    if "no matching row in const table" in (plan.get("Extra") or ""):
+        # ערך שאינו קיים נשלל דרך אינדקס ייחודי בלי לקרוא את הטבלה
+        return
+    assert plan["type"] != "ALL", f"{name}: full table scan {plan}"
+    assert plan["key"], f"{name}: no index used {plan}"
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+@pytest.mark.benchmark(group="db_lookups")
+def bench_hot_query(benchmark, name, migrated):
+    lookups = {
+        "user_by_email": lambda: User(migrated).get_by_email("bench@example.com"),
+        "usage_by_user_id": lambda: Usage(migrated).get_by_user_id(1),
+        "light_by_usage_id": lambda: Light(migrated).get_by_usage_id(1),
+    }
+    benchmark.extra_info["index"] = explain(migrated, *HOT_QUERIES[name])["key"]
+    benchmark(lookups[name])
@@ -0,0 +1,18 @@
+# bench_illuminance.py - זמן חישוב מפת הלוקס של /usages/{id}/illuminance לפי גודל
+#
+# לא דורש מסד. הגרף נבנה כמו ב-IlluminanceService.get_grid (build_graph_with_stored_lights, בלי אופטימיזציה).
+# בדיקות הנכונות (הרכיב המוחזר) ב-test_illuminance.py.
+import pytest
+
+from BuildGraph import BuildGraph
+from IlluminanceGrid import IlluminanceGrid
+from benchmarks.conftest import MAX_OPTIMIZE_ELEMENTS, require_size, rounds_for
+from benchmarks.synthetic import CEILING_LIGHT
+
+
+@pytest.mark.benchmark(group="illuminance_grid")
+def bench_illuminance_grid(benchmark, size, elements):
+    require_size(size, MAX_OPTIMIZE_ELEMENTS)
+    graph = BuildGraph().build_graph_with_stored_lights(elements, [CEILING_LIGHT])
+
+    benchmark.pedantic(lambda: IlluminanceGrid(graph).compute(0.25), rounds=rounds_for(size), iterations=1)
@@ -0,0 +1,73 @@
+# bench_login.py - תפוקת התחברויות מקבילות ועיכוב לולאת האירועים בזמן אימות bcrypt
+#
+# "inline" - checkpw על הלולאה (ההתנהגות הקודמת); "pool" - PasswordHasher עם pool חסום.
+# loop_lag_ms הוא העיכוב המקסימלי של טיימר של 1ms שרץ במקביל - כמה זמן בקשות אחרות חיכו.
+import asyncio
+import os
+import time
+
+import bcrypt
+import pytest
+
+from PasswordHasher import PasswordHasher
+
+CONCURRENT_LOGINS = int(os.environ.get("BENCH_CONCURRENT_LOGINS", 16))
+ROUNDS = int(os.environ.get("BENCH_BCRYPT_ROUNDS", 10))
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture(scope="module")
+def hasher():
+    hasher = PasswordHasher(rounds=ROUNDS)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.fixture(scope="module")
+def stored_hash(hasher):
+    return hasher.hash_sync(PASSWORD)
+
+
+async def _inline_verify(hasher, stored_hash):
+    return bcrypt.checkpw(PASSWORD.encode("utf-8"), stored_hash.encode("utf-8"))
+
+
+async def _run_logins(verify, hasher, stored_hash) -> float:
+    """מריץ התחברויות במקביל ומחזיר את עיכוב הלולאה המקסימלי (שניות)"""
+    max_lag = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_lag
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.001)
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    results = await asyncio.gather(*(verify(hasher, stored_hash) for _ in range(CONCURRENT_LOGINS)))
+    done = True
+    await tick_task
+    assert all(results)
+    return max_lag
+
+
+@pytest.mark.parametrize("mode", ["inline", "pool"])
+@pytest.mark.benchmark(group="login")
+def bench_concurrent_logins(benchmark, hasher, stored_hash, mode):
+    verify = _inline_verify if mode == "inline" else (lambda hasher, stored: hasher.verify(PASSWORD, stored))
+    lags = []
+    durations = []
+
+    def run():
+        # זמן משלנו - benchmark.stats הוא None תחת --benchmark-disable
+        start = time.perf_counter()
+        lags.append(asyncio.run(_run_logins(verify, hasher, stored_hash)))
+        durations.append(time.perf_counter() - start)
+
+    benchmark.pedantic(run, rounds=3, iterations=1)
+    benchmark.extra_info["logins"] = CONCURRENT_LOGINS
+    benchmark.extra_info["bcrypt_rounds"] = ROUNDS
+    benchmark.extra_info["logins_per_second"] = round(CONCURRENT_LOGINS * len(durations) / sum(durations), 1)
+    benchmark.extra_info["loop_lag_ms"] = round(max(lags) * 1000, 1)
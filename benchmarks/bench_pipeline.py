@@ -0,0 +1,90 @@
+# bench_pipeline.py - זמני השלבים של תהליך ההעלאה לפי מספר אלמנטים
+import os
+from datetime import datetime
+
+import pytest
+
+import IFCProcessor
+from BuildGraph import BuildGraph
+from Algorithm.ShadowOptimizer import ShadowOptimizer
+from MODEL.Usage import Usage
+from MODEL.Light import Light
+from models import LightVertex
+from benchmarks.conftest import MAX_ELEMENTS, MAX_OPTIMIZE_ELEMENTS, require_size, rounds_for
+
+
+@pytest.mark.benchmark(group="process_ifc_file")
+def bench_process_ifc_file(benchmark, size, ifc_files):
+    require_size(size, MAX_ELEMENTS)
+    ifc_path = ifc_files(size)
+
+    def run():
+        json_path = IFCProcessor.process_ifc_file(ifc_path, "living")
+        os.remove(json_path)
+
+    benchmark.pedantic(run, rounds=rounds_for(size), iterations=1)
+
+
+@pytest.mark.benchmark(group="build_graph_geometry")
+def bench_build_graph_geometry(benchmark, size, elements):
+    """בניית הגרף בלבד, ללא אופטימיזציה"""
+    require_size(size, MAX_ELEMENTS)
+    graph = benchmark.pedantic(BuildGraph().build_graph_from_data, args=(elements,), kwargs={"optimize": False},
+                               rounds=rounds_for(size), iterations=1)
+    assert graph.vertices
+
+
+@pytest.mark.benchmark(group="build_graph_from_json")
+def bench_build_graph_from_json(benchmark, size, elements_json_path):
+    """הנתיב המלא של ההעלאה: קריאת JSON, בניית גרף ואופטימיזציה"""
+    require_size(size, MAX_OPTIMIZE_ELEMENTS)
+    graph = benchmark.pedantic(BuildGraph().build_graph_from_json, args=(elements_json_path,),
+                               rounds=rounds_for(size), iterations=1)
+    assert graph.vertices
+
+
+@pytest.mark.benchmark(group="shadow_optimizer_init")
+def bench_shadow_optimizer_construction(benchmark, size, elements):
+    require_size(size, MAX_OPTIMIZE_ELEMENTS)
+
+    def setup():
+        return (BuildGraph().build_graph_from_data(elements, optimize=False),), {}
+
+    benchmark.pedantic(ShadowOptimizer, setup=setup, rounds=rounds_for(size), iterations=1)
+
+
+@pytest.mark.benchmark(group="optimize_lighting_room")
+def bench_optimize_lighting_room(benchmark, size, elements):
+    require_size(size, MAX_OPTIMIZE_ELEMENTS)
+
+    def setup():
+        optimizer = ShadowOptimizer(BuildGraph().build_graph_from_data(elements, optimize=False))
+        return (optimizer,), {}
+
+    lights = benchmark.pedantic(ShadowOptimizer.optimize_lighting_room, setup=setup, rounds=rounds_for(size),
+                                iterations=1)
+    assert lights
+
+
+@pytest.mark.benchmark(group="db_persistence")
+def bench_db_persistence(benchmark, size, elements, database):
+    """שמירת שימוש ומנורות כמו ב-fileProcessor.process_and_save_file"""
+    require_size(size, MAX_ELEMENTS)
+    graph = BuildGraph().build_graph_from_data(elements, optimize=False)
+    lights = [v for v in graph.vertices if isinstance(v, LightVertex)]
+    usage_dal, light_dal = Usage(database), Light(database)
+    created = []
+
+    def run():
+        usage_id = usage_dal.create(user_id=1, usage_date=datetime.now(), json_file="[]")["usage_id"]
+        created.append(usage_id)
+        for light in lights:
+            light_dal.create(usage_id=usage_id, x=light.point.x, y=light.point.y, z=light.point.z, power=light.lux)
+
+    try:
+        benchmark.pedantic(run, rounds=rounds_for(size), iterations=1)
+    finally:
+        for usage_id in created:
+            for light in light_dal.get_by_usage_id(usage_id):
+                light_dal.delete(light[0])
+            usage_dal.delete(usage_id)
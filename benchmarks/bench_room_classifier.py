@@ -0,0 +1,52 @@
+# bench_room_classifier.py - זמן חיזוי וזיכרון של מסווג החדרים לפי מנוע הרצה
+#
+# דורש קבצי מודל: room_classifier.h5 (אימון) ו-.tflite/.onnx (export.py).
+# מנוע שהקובץ או החבילה שלו חסרים - מדולג.
+# load_rss_mb הוא תוספת הזיכרון בטעינה; למספר נקי לכל מנוע הריצו כל אחד בנפרד (-k tflite).
+import os
+
+import numpy as np
+import pytest
+
+from RoomClassifier import BACKENDS, INPUT_SIZE, default_model_path, load_room_classifier
+
+BATCH_SIZES = [1, 16]
+
+
+def current_rss_mb() -> float:
+    """זיכרון תושב נוכחי של התהליך (לינוקס), אחרת השיא מ-getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@pytest.fixture(scope="module", params=list(BACKENDS))
+def classifier(request):
+    backend = request.param
+    model_path = os.environ.get(f"ROOM_CLASSIFIER_{backend.upper()}_PATH", default_model_path(backend))
+    if not os.path.exists(model_path):
+        pytest.skip(f"אין קובץ מודל ל-{backend}: {model_path}")
+
+    rss_before = current_rss_mb()
+    try:
+        model = load_room_classifier(backend, model_path)
+    except ImportError as e:
+        pytest.skip(f"{backend} לא זמין: {e}")
+    return model, current_rss_mb() - rss_before
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES, ids=lambda batch_size: f"batch{batch_size}")
+@pytest.mark.benchmark(group="room_classifier")
+def bench_room_classifier_predict(benchmark, classifier, batch_size):
+    model, load_rss_mb = classifier
+    batch = np.random.default_rng(0).random((batch_size, *INPUT_SIZE, 3), dtype=np.float32)
+    model.predict_on_batch(batch)  # חימום (הקצאת טנזורים / גרף)
+
+    benchmark.extra_info["backend"] = model.backend
+    benchmark.extra_info["load_rss_mb"] = round(load_rss_mb, 1)
+    result = benchmark(model.predict_on_batch, batch)
+    benchmark.extra_info["rss_mb"] = round(current_rss_mb(), 1)
+    assert result.shape[0] == batch_size
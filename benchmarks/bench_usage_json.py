@@ -0,0 +1,39 @@
+# bench_usage_json.py - גודל ה-JSON של שימוש בכל קידוד, וזמן הדחיסה והפריסה שלו
+#
+# לא דורש מסד. JSON סינתטי בצורת הפלט של IFCProcessor (רשימת אלמנטים עם קואורדינטות).
+import json
+
+import pytest
+
+from JsonCompression import compress_json, decompress_json, zstandard
+
+ELEMENT_COUNTS = [100, 1000, 10000]
+ENCODINGS = ["identity", "gzip"] + (["zstd"] if zstandard else [])
+
+
+def make_json(count: int) -> str:
+    return json.dumps([
+        {"id": i, "type": "IfcWall" if i % 3 else "IfcDoor", "name": f"Element {i}",
+         "x": i * 0.25, "y": (i % 50) * 0.5, "z": 0.0, "width": 0.2, "height": 2.7}
+        for i in range(count)
+    ])
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("size", ELEMENT_COUNTS, ids=lambda count: f"{count}elements")
+@pytest.mark.benchmark(group="usage_json_compress")
+def bench_compress(benchmark, size, encoding):
+    text = make_json(size)
+    data, stored_encoding, length = benchmark(compress_json, text, encoding)
+    assert stored_encoding == encoding
+    benchmark.extra_info["ratio"] = round(len(data) / length, 4)
+    benchmark.extra_info["stored_bytes"] = len(data)
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+@pytest.mark.parametrize("size", ELEMENT_COUNTS, ids=lambda count: f"{count}elements")
+@pytest.mark.benchmark(group="usage_json_decompress")
+def bench_decompress(benchmark, size, encoding):
+    text = make_json(size)
+    data, stored_encoding, _ = compress_json(text, encoding)
+    assert benchmark(decompress_json, data, stored_encoding) == text
@@ -0,0 +1,64 @@
+# bench_yolo_inference.py - זמן הסקה מול recall של YOLO לפי רזולוציה וסינון מחלקות
+#
+# דורש ultralytics ותיקיית תמונות חדר: YOLO_BENCH_IMAGES=path/to/photos
+# (סוג החדר: YOLO_BENCH_ROOM_TYPE, ברירת מחדל living).
+# recall נמדד מול ההתנהגות הקודמת - 640 בלי סינון מחלקות - על זוגות (תמונה, מחלקה)
+# מתוך allowed_elements של החדר, כלומר רק זיהויים שמשפיעים על ההמלצות.
+import os
+
+import pytest
+
+from ImageDecoding import decode_image
+
+IMAGE_SIZES = [320, 480, 640]
+REFERENCE_IMAGE_SIZE = 640
+ROOM_TYPE = os.environ.get("YOLO_BENCH_ROOM_TYPE", "living")
+
+
+@pytest.fixture(scope="module")
+def frames():
+    image_dir = os.environ.get("YOLO_BENCH_IMAGES")
+    if not image_dir or not os.path.isdir(image_dir):
+        pytest.skip("הגדירו YOLO_BENCH_IMAGES לתיקיית תמונות")
+    frames = []
+    for name in sorted(os.listdir(image_dir)):
+        if os.path.splitext(name)[1].lower() in (".jpg", ".jpeg", ".png"):
+            with open(os.path.join(image_dir, name), "rb") as f:
+                frames.append(decode_image(f.read(), max(IMAGE_SIZES)))
+    if not frames:
+        pytest.skip(f"אין תמונות ב-{image_dir}")
+    return frames
+
+
+@pytest.fixture(scope="module")
+def model():
+    pytest.importorskip("ultralytics")
+    from DecorativeLightingModel import DecorativeLightingModel
+    return DecorativeLightingModel(os.environ.get("YOLO_MODEL_PATH", "yolov8n.pt"))
+
+
+def relevant_pairs(model, detections) -> set:
+    allowed = set(model.room_recommendations[ROOM_TYPE]["allowed_elements"])
+    return {(index, obj["class_name"]) for index, objects in enumerate(detections)
+            for obj in objects if obj["class_name"] in allowed}
+
+
+@pytest.fixture(scope="module")
+def reference(model, frames):
+    model.imgsz, model.filter_classes = REFERENCE_IMAGE_SIZE, False
+    return relevant_pairs(model, [model.detect_objects([frame])[0] for frame in frames])
+
+
+@pytest.mark.parametrize("filter_classes", [False, True], ids=["all_classes", "room_classes"])
+@pytest.mark.parametrize("imgsz", IMAGE_SIZES, ids=lambda imgsz: f"imgsz{imgsz}")
+@pytest.mark.benchmark(group="yolo_inference")
+def bench_yolo_inference(benchmark, model, frames, reference, imgsz, filter_classes):
+    model.imgsz, model.filter_classes = imgsz, filter_classes
+    model.detect_objects(frames[:1], ROOM_TYPE)  # חימום
+
+    detections = benchmark(lambda: [model.detect_objects([frame], ROOM_TYPE)[0] for frame in frames])
+
+    found = relevant_pairs(model, detections)
+    benchmark.extra_info["images"] = len(frames)
+    benchmark.extra_info["reference_pairs"] = len(reference)
+    benchmark.extra_info["recall"] = round(len(found & reference) / len(reference), 3) if reference else None
@@ -0,0 +1,87 @@
+# conftest.py - fixtures משותפים לבדיקות הביצועים
+import json
+import logging
+import os
+
+import pytest
+
+from benchmarks.synthetic import generate_elements, write_synthetic_ifc
+
+logging.disable(logging.CRITICAL)
+
+SIZES = [10, 100, 1000, 10000]
+
+# שלבים זולים (קריאת IFC, בניית גרף, שמירה במסד) ושלבי האופטימיזציה (ריבועיים במספר הצמתים)
+MAX_ELEMENTS = int(os.environ.get("BENCH_MAX_ELEMENTS", 1000))
+MAX_OPTIMIZE_ELEMENTS = int(os.environ.get("BENCH_MAX_OPTIMIZE_ELEMENTS", 100))
+
+ROOM_PARAMS = {"furniture_density": 0.4, "reflective_ratio": 0.3, "seed": 42}
+
+
+def rooms_for(size: int) -> int:
+    """כ-25 אלמנטים לחדר"""
+    return max(1, size // 25)
+
+
+def require_size(size: int, limit: int):
+    if size > limit:
+        pytest.skip(f"{size} אלמנטים מעל המגבלה ({limit}) - הגדל את משתני הסביבה BENCH_MAX_*")
+
+
+def rounds_for(size: int) -> int:
+    return 5 if size <= 100 else 1
+
+
+@pytest.fixture(params=SIZES, ids=lambda size: f"{size}")
+def size(request):
+    return request.param
+
+
+@pytest.fixture
+def elements(size):
+    return generate_elements(rooms_for(size), size, **ROOM_PARAMS)
+
+
+@pytest.fixture
+def elements_json_path(elements, tmp_path):
+    path = tmp_path / "elements.json"
+    path.write_text(json.dumps(elements, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def ifc_files(tmp_path_factory):
+    """קבצי IFC סינתטיים לפי גודל - נוצרים פעם אחת לכל הריצה"""
+    directory = tmp_path_factory.mktemp("ifc")
+    cache = {}
+
+    def get(size: int) -> str:
+        if size not in cache:
+            cache[size] = write_synthetic_ifc(str(directory / f"room_{size}.ifc"), rooms_for(size), size,
+                                              **ROOM_PARAMS)
+        return cache[size]
+
+    return get
+
+
+@pytest.fixture(scope="session")
+def database():
+    from MODEL.database import Database
+
+    db = Database()
+    if not db.connection or not db.connection.is_connected():
+        pytest.skip("אין חיבור ל-MySQL")
+    return db
+
+
+def pytest_benchmark_group_stats(config, benchmarks, group_by):
+    """קיבוץ לפי קבוצה ולפי size רק כשהפרמטר קיים - לבדיקות ביצועים שאינן תלויות בגודל"""
+    from collections import defaultdict
+
+    groups = defaultdict(list)
+    for bench in benchmarks:
+        key = (bench["group"],)
+        if "size" in (bench["params"] or {}):
+            key += (f"size={bench['params']['size']}",)
+        groups[" ".join(str(part) for part in key if part)].append(bench)
+    return sorted(groups.items(), key=lambda pair: pair[0] or "")
@@ -0,0 +1,148 @@
+# synthetic.py - מחולל חדרים סינתטיים דטרמיניסטי לבדיקות ביצועים
+import random
+
+import ifcopenshell
+import ifcopenshell.guid
+
+from RoomType import RoomType
+from MaterialReflection import MaterialReflection
+
+ROOM_WIDTH = 4.0
+ROOM_LENGTH = 5.0
+ROOM_HEIGHT = 2.7
+# מנורה שמורה במרכז התקרה: (light_id, usage_id, x, y, z, power) - כמו שורה מטבלת Light
+CEILING_LIGHT = (1, 1, ROOM_WIDTH / 2, ROOM_LENGTH / 2, ROOM_HEIGHT, 60.0)
+
+# (סוג אלמנט, שם IFC, מחלקת IFC, (רוחב, אורך, גובה))
+FURNITURE_TYPES = [
+    ("table", "Table", "IfcFurnishingElement", (1.2, 0.8, 0.75)),
+    ("desk", "Desk", "IfcFurnishingElement", (1.4, 0.7, 0.75)),
+    ("chair", "Chair", "IfcFurnishingElement", (0.5, 0.5, 0.9)),
+    ("sofa", "Sofa", "IfcFurnishingElement", (2.0, 0.9, 0.8)),
+    ("bed", "Bed", "IfcFurnishingElement", (1.6, 2.0, 0.5)),
+    ("cabinet", "Cabinet", "IfcFurnishingElement", (1.0, 0.6, 2.0)),
+    ("counter", "Counter", "IfcFurnishingElement", (2.0, 0.6, 0.9)),
+]
+STRUCTURE_TYPES = [
+    ("קיר", "Wall", "IfcWall", (ROOM_WIDTH, 0.15, ROOM_HEIGHT)),
+    ("חלון", "Window", "IfcWindow", (1.2, 0.05, 1.0)),
+    ("דלת", "Door", "IfcDoor", (0.9, 0.1, 2.1)),
+]
+REFLECTIVE_MATERIALS = ["Glass", "Mirror", "Metal", "Ceramic tile", "White paint", "Wood"]
+MATTE_MATERIAL = "לא ידוע"
+
+
+def _element_specs(room_count: int, element_count: int, furniture_density: float,
+                   reflective_ratio: float, seed: int):
+    """רשימת אלמנטים משותפת ל-JSON ול-IFC - אותו seed מייצר אותו חדר"""
+    rng = random.Random(seed)
+    specs = []
+    for i in range(element_count):
+        room = i % max(room_count, 1)
+        is_furniture = rng.random() < furniture_density
+        subtype, name, ifc_class, (width, length, height) = rng.choice(
+            FURNITURE_TYPES if is_furniture else STRUCTURE_TYPES)
+
+        origin_x = room * (ROOM_WIDTH + 0.5)
+        x = origin_x + rng.uniform(0, max(ROOM_WIDTH - width, 0.1))
+        y = rng.uniform(0, max(ROOM_LENGTH - length, 0.1))
+        z = 0.9 if subtype == "חלון" else 0.0
+        material = rng.choice(REFLECTIVE_MATERIALS) if rng.random() < reflective_ratio else MATTE_MATERIAL
+
+        specs.append({
+            "subtype": subtype, "name": f"{name} {i}", "ifc_class": ifc_class, "room": room,
+            "x": round(x, 3), "y": round(y, 3), "z": z,
+            "width": width, "length": length, "height": height, "material": material,
+        })
+    return specs
+
+
+def generate_elements(room_count: int = 1, element_count: int = 10, furniture_density: float = 0.5,
+                      reflective_ratio: float = 0.3, room_type: str = "living", seed: int = 0) -> list:
+    """מערך JSON באותה סכמה ש-IFCProcessor.process_ifc_file מייצר"""
+    results = [
+        {"RecommendedLux": RoomType.get_by_name(room_type).recommended_lux},
+        {"RoomType": room_type},
+        {"RoomHeight": ROOM_HEIGHT},
+        {"RoomArea": ROOM_WIDTH * ROOM_LENGTH * max(room_count, 1)},
+    ]
+
+    for spec in _element_specs(room_count, element_count, furniture_density, reflective_ratio, seed):
+        required_lux = 0
+        if spec["subtype"] in ["table", "desk", "counter"]:
+            required_lux = 500 if spec["subtype"] == "desk" else 300
+
+        element = {
+            "ElementType": spec["subtype"],
+            "X": spec["x"], "Y": spec["y"], "Z": spec["z"],
+            "Width": spec["width"], "Length": spec["length"], "Height": spec["height"],
+            "Material": spec["material"],
+            "RequiredLuks": required_lux,
+        }
+        reflection_factor = MaterialReflection.get_by_material_name(spec["material"]).reflection_factor
+        if reflection_factor > 0:
+            element["ReflectionFactor"] = reflection_factor
+        results.append(element)
+
+    return results
+
+
+def write_synthetic_ifc(path: str, room_count: int = 1, element_count: int = 10, furniture_density: float = 0.5,
+                        reflective_ratio: float = 0.3, room_type: str = "living", seed: int = 0) -> str:
+    """קובץ IFC4 קטן עם מרחבים, קירות/חלונות/דלתות וריהוט כקופסאות מוחצנות"""
+    model = ifcopenshell.file(schema="IFC4")
+
+    def create(ifc_class, **attributes):
+        return model.create_entity(ifc_class, GlobalId=ifcopenshell.guid.new(), **attributes)
+
+    def point(x, y, z=0.0):
+        return model.createIfcCartesianPoint((float(x), float(y), float(z)))
+
+    def placement(x, y, z):
+        return model.createIfcLocalPlacement(None, model.createIfcAxis2Placement3D(point(x, y, z), None, None))
+
+    def box(context, width, length, height):
+        position = model.createIfcAxis2Placement2D(model.createIfcCartesianPoint((width / 2, length / 2)), None)
+        profile = model.createIfcRectangleProfileDef("AREA", None, position, width, length)
+        solid = model.createIfcExtrudedAreaSolid(profile, model.createIfcAxis2Placement3D(point(0, 0, 0), None, None),
+                                                 model.createIfcDirection((0.0, 0.0, 1.0)), height)
+        body = model.createIfcShapeRepresentation(context, "Body", "SweptSolid", [solid])
+        return model.createIfcProductDefinitionShape(None, None, [body])
+
+    units = model.createIfcUnitAssignment([model.createIfcSIUnit(None, "LENGTHUNIT", None, "METRE")])
+    context = model.createIfcGeometricRepresentationContext(
+        None, "Model", 3, 1.0e-5, model.createIfcAxis2Placement3D(point(0, 0, 0), None, None), None)
+    project = create("IfcProject", Name="Synthetic", UnitsInContext=units,
+                     RepresentationContexts=[context])
+    storey = create("IfcBuildingStorey", Name="Storey", ObjectPlacement=placement(0, 0, 0))
+    create("IfcRelAggregates", RelatingObject=project, RelatedObjects=[storey])
+
+    spaces = []
+    for room in range(max(room_count, 1)):
+        space = create("IfcSpace", Name=f"{room_type} {room}", LongName=room_type,
+                       ObjectPlacement=placement(room * (ROOM_WIDTH + 0.5), 0, 0),
+                       Representation=box(context, ROOM_WIDTH, ROOM_LENGTH, ROOM_HEIGHT))
+        spaces.append(space)
+    create("IfcRelAggregates", RelatingObject=storey, RelatedObjects=spaces)
+
+    materials = {}
+    products_by_space = {}
+    for spec in _element_specs(room_count, element_count, furniture_density, reflective_ratio, seed):
+        product = create(spec["ifc_class"], Name=spec["name"],
+                         ObjectPlacement=placement(spec["x"], spec["y"], spec["z"]),
+                         Representation=box(context, spec["width"], spec["length"], spec["height"]))
+        products_by_space.setdefault(spec["room"], []).append(product)
+
+        if spec["material"] != MATTE_MATERIAL:
+            if spec["material"] not in materials:
+                materials[spec["material"]] = (model.createIfcMaterial(spec["material"], None, None), [])
+            materials[spec["material"]][1].append(product)
+
+    for room, products in products_by_space.items():
+        create("IfcRelContainedInSpatialStructure", RelatedElements=products,
+               RelatingStructure=spaces[room])
+    for material, products in materials.values():
+        create("IfcRelAssociatesMaterial", RelatedObjects=products, RelatingMaterial=material)
+
+    model.write(path)
+    return path
@@ -0,0 +1,38 @@
+# test_illuminance.py - הרכיב המוחזר במפת הלוקס של /usages/{id}/illuminance
+#
+# בדיקות נכונות בלבד (לא מדידה) - רצות גם עם --benchmark-disable.
+import numpy as np
+import pytest
+
+from BuildGraph import BuildGraph
+from IlluminanceGrid import IlluminanceGrid
+from benchmarks.synthetic import CEILING_LIGHT, ROOM_HEIGHT, ROOM_LENGTH, ROOM_WIDTH
+
+
+def mirror_room(material: str) -> list:
+    """חדר עם קיר אחד מהחומר הנתון ושאר הקירות מטים"""
+    walls = [
+        {"ElementType": "קיר", "X": 0.0, "Y": 0.0, "Z": 0.0, "Width": ROOM_WIDTH, "Length": 0.15,
+         "Height": ROOM_HEIGHT, "Material": material},
+        {"ElementType": "קיר", "X": 0.0, "Y": ROOM_LENGTH, "Z": 0.0, "Width": ROOM_WIDTH, "Length": 0.15,
+         "Height": ROOM_HEIGHT, "Material": "לא ידוע"},
+    ]
+    return [{"RecommendedLux": 300}, {"RoomType": "living"}, {"RoomHeight": ROOM_HEIGHT},
+            {"RoomArea": ROOM_WIDTH * ROOM_LENGTH}] + walls
+
+
+def reflected_total(material: str) -> float:
+    grid = IlluminanceGrid(BuildGraph().build_graph_with_stored_lights(mirror_room(material), [CEILING_LIGHT]))
+    points = np.array([[ROOM_WIDTH / 2, 1.0, 0.75], [1.0, ROOM_LENGTH / 2, 0.75]])
+    light = grid.lights[0]
+    light_pos = np.array([light.point.x, light.point.y, light.point.z])
+    return float(grid.reflected_illumination(light, light_pos, points).sum())
+
+
+@pytest.mark.parametrize("material", ["Mirror", "Metal"])
+def test_reflective_room_has_reflected_light(material):
+    assert reflected_total(material) > 0, f"{material}: no reflected light on the work plane"
+
+
+def test_matte_room_has_no_reflected_light():
+    assert reflected_total("לא ידוע") == 0
@@ -0,0 +1,47 @@
+# test_score_layouts.py - ציון תצורה בשכבה מעל גרף בסיס שווה לציון של האופטימיזציה על הגרף המלא
+#
+# בדיקות נכונות בלבד (לא מדידה) - רצות גם עם --benchmark-disable.
+import pytest
+
+from Algorithm.ShadowOptimizer import ShadowOptimizer
+from Algorithm.algorithm import score_layouts
+from BuildGraph import BuildGraph
+from benchmarks.conftest import ROOM_PARAMS, rooms_for
+from benchmarks.synthetic import generate_elements
+from models import GraphOverlay
+
+ELEMENT_COUNT = 25
+CONFIGS = ["config_single_safe", "config_dual_safe", "config_triangle_safe", "config_square_safe"]
+
+
+@pytest.fixture(scope="module")
+def elements():
+    return generate_elements(rooms_for(ELEMENT_COUNT), ELEMENT_COUNT, **ROOM_PARAMS)
+
+
+@pytest.fixture(scope="module")
+def full_optimizer(elements):
+    return ShadowOptimizer(BuildGraph().build_graph_from_data(elements, optimize=False))
+
+
+def center_layout(optimizer: ShadowOptimizer, config: str) -> list:
+    room_area, ceiling_height = optimizer.extract_room_info_from_graph()
+    center = optimizer.get_center_lights()[0].point
+    return getattr(optimizer, config)(center, ceiling_height, room_area, optimizer.get_furniture_obstacles())["lights"]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_overlay_scores_match_full_graph(elements, full_optimizer, config):
+    centers = center_layout(full_optimizer, config)
+    base, _ = BuildGraph().build_layers(elements)
+
+    assert score_layouts(base, [centers]) == [full_optimizer.score_lights(centers)]
+
+
+def test_overlay_precompute_does_not_change_base(elements):
+    """חישוב מוקדם בשכבה לא משנה את משטחי ההחזרה שהשכבה הבאה אוספת"""
+    base, lights = BuildGraph().build_layers(elements)
+    before = len(ShadowOptimizer(GraphOverlay(base, lights), precompute=False).reflection_surfaces)
+    ShadowOptimizer(GraphOverlay(base, lights))
+
+    assert len(ShadowOptimizer(GraphOverlay(base, lights), precompute=False).reflection_surfaces) == before
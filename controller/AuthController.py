@@ -3,10 +3,14 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, validator
 from typing import Optional
 from datetime import datetime, timedelta
-import bcrypt
+import logging
 import jwt as pyjwt
 from MODEL.database import Database
 from MODEL.User import User
+from PasswordHasher import password_hasher
+from AuthCache import auth_cache
+
+logger = logging.getLogger(__name__)
 
 # הגדרת קבועים
 SECRET_KEY = "LightPlaningSecretKey2024"
@@ -53,64 +57,58 @@ class Token(BaseModel):
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-def get_password_hash(password: str) -> str:
-    """יוצר גיבוב מוצפן לסיסמה"""
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-    # הדפסת מידע על הסיסמה המוצפנת לצורך דיבאג
-    hashed_str = hashed_password.decode('utf-8')
-    print(f"סיסמה מוצפנת שנוצרה: {hashed_str}")
-    print(f"אורך הסיסמה המוצפנת: {len(hashed_str)}")
-    print(f"פורמט תקין? {hashed_str.startswith('$2')}")
-    return hashed_str
+async def get_password_hash(password: str) -> str:
+    """יוצר גיבוב מוצפן לסיסמה (ב-pool של bcrypt, מחוץ ללולאת האירועים)"""
+    return await password_hasher.hash(password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """מאמת סיסמה מול הגיבוב השמור - עם טיפול בשגיאות"""
-    try:
-        # מידע דיבאג
-        print(f"סיסמה רגילה: {plain_password}")
-        print(f"סיסמה מוצפנת לבדיקה: {hashed_password}")
-        print(f"אורך סיסמה מוצפנת: {len(hashed_password)}")
-
-        # בדיקה אם הסיסמה בפורמט תקין של bcrypt
-        if hashed_password.startswith('$2'):
-            # נסה להשתמש בbcrypt לאימות
-            return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
-        else:
-            # אם הסיסמה לא מוצפנת, בצע השוואה פשוטה (לתקופת מעבר זמנית בלבד!)
-            print("אזהרה: סיסמה לא מוצפנת במסד הנתונים!")
-            return plain_password == hashed_password
-    except Exception as e:
-        print(f"שגיאה באימות סיסמה: {str(e)}")
-        # לצורך דיבאג - ניתן לנסות השוואה פשוטה גם במקרה של שגיאה
-        return plain_password == hashed_password
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """מאמת סיסמה מול הגיבוב השמור"""
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """יוצר טוקן גישה JWT"""
     to_encode = data.copy()
+    # sub חייב להיות מחרוזת (RFC 7519) - PyJWT דוחה טוקנים עם sub מספרי
+    if "sub" in to_encode:
+        to_encode["sub"] = str(to_encode["sub"])
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded_jwt = pyjwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Database = Depends(lambda: Database())):
-    """מקבל את המשתמש הנוכחי מהטוקן"""
+def decode_access_token(token: str) -> dict:
+    """claims של טוקן מאומת (מהמטמון אם כבר אומת לאחרונה); זורק PyJWTError אם אינו תקין"""
+    claims = auth_cache.get_claims(token)
+    if claims is None:
+        claims = pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        auth_cache.set_claims(token, claims)
+    return claims
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    """מקבל את המשתמש הנוכחי מהטוקן; חיבור למסד נפתח רק כשהמשתמש אינו במטמון"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="פרטי אימות לא תקינים",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except pyjwt.PyJWTError:
+        payload = decode_access_token(token)
+        user_id = int(payload.get("sub"))
+    except (pyjwt.PyJWTError, TypeError, ValueError):
         raise credentials_exception
 
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        user = User(Database()).get_by_id(user_id)
+        if user is None:
+            raise credentials_exception
+        auth_cache.set_user(user_id, user)
+    return user
+
 # נקודות קצה
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserRegister, db: Database = Depends(lambda: Database())):
@@ -127,42 +125,24 @@ async def register(user_data: UserRegister, db: Database = Depends(lambda: Datab
 
     # יצירת משתמש חדש עם סיסמה מוצפנת
     try:
-        # הצפנת הסיסמה
-        hashed_password = get_password_hash(user_data.password)
-
-        # בדיקה שההצפנה פעלה כראוי
-        if not hashed_password.startswith('$2'):
-            print("שגיאה: הסיסמה לא הוצפנה כראוי!")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="שגיאה בהצפנת הסיסמה"
-            )
-
-        # בדיקה שניתן לאמת את הסיסמה (המוצפנת)
-        verify_test = verify_password(user_data.password, hashed_password)
-        print(f"בדיקת אימות סיסמה לאחר הצפנה: {verify_test}")
-
-        if not verify_test:
-            print("שגיאה: לא ניתן לאמת את הסיסמה לאחר הצפנה!")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="שגיאה באימות הסיסמה לאחר הצפנה"
-            )
+        # הצפנת הסיסמה (bcrypt מייצר תמיד גיבוב תקין - אין צורך באימות חוזר)
+        hashed_password = await get_password_hash(user_data.password)
 
         # שמירת המשתמש עם הסיסמה המוצפנת
-        print(f"יוצר משתמש עם אימייל {user_data.email} וסיסמה מוצפנת")
         new_user_id = user_dal.create(user_data.email, hashed_password)
 
         if not new_user_id:
-            print("שגיאה: לא הוחזר מזהה משתמש!")
+            logger.error("לא הוחזר מזהה משתמש ביצירת %s", user_data.email)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="אירעה שגיאה ביצירת המשתמש"
             )
 
-        print(f"משתמש נוצר בהצלחה עם מזהה {new_user_id[0]}")
+        logger.info("משתמש נוצר בהצלחה עם מזהה %s", new_user_id[0])
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"שגיאה כללית ביצירת משתמש: {str(e)}")
+        logger.error("שגיאה כללית ביצירת משתמש: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"אירעה שגיאה ביצירת המשתמש: {str(e)}"
@@ -192,16 +172,18 @@ async def login(user_data: UserLogin, db: Database = Depends(lambda: Database())
     # אימות סיסמה עם טיפול בשגיאות
     stored_password = user[2]  # לפי המבנה של get_by_email, הסיסמה היא האיבר השלישי
 
-    print(f"בודק התחברות למשתמש {user_data.username}")
-
-    print(f"סוג הסיסמה השמורה: {type(stored_password)}")
-
-    if not verify_password(user_data.password, stored_password):
+    if not await verify_password(user_data.password, stored_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="שם משתמש או סיסמה שגויים"
         )
 
+    # גיבוב מחדש כשהעלות השתנתה (או סיסמה ישנה לא מוצפנת) - הסיסמה הגלויה זמינה רק כאן
+    if password_hasher.needs_rehash(stored_password):
+        user_dal.update(user[0], password=await get_password_hash(user_data.password))
+        auth_cache.invalidate_user(user[0])
+        logger.info("סיסמת משתמש %s גובבה מחדש בעלות %s", user[0], password_hasher.rounds)
+
     # יצירת טוקן גישה
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
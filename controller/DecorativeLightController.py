@@ -1,9 +1,17 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from typing import List
 import shutil
 import tempfile
 import os
 
+from ImageDecoding import decode_image
+from controller.UploadController import plan_decorative_lighting_batch
+
+# מספר תמונות מקסימלי לחדר בבקשה אחת (כל התמונות עוברות ב-batch אחד של YOLO)
+MAX_IMAGES_PER_ROOM = int(os.environ.get("MAX_IMAGES_PER_ROOM", "12"))
+
 router = APIRouter(
     tags=["image-upload"]
 )
@@ -40,3 +48,36 @@ async def upload_image(
         })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/analyze-room-images/")
+async def analyze_room_images(
+        images: List[UploadFile] = File(...),
+        room_type: str = Form(...)
+):
+    """
+    ניתוח כמה תמונות של אותו חדר לתאורת נוי.
+
+    - **images**: תמונות החדר (JPG, JPEG, PNG)
+    - **room_type**: סוג החדר (למשל: kitchen, bedroom, office)
+
+    הזיהויים מכל התמונות מאוחדים (הביטחון הגבוה ביותר לכל סוג אובייקט) וההמלצות נבנות מהאיחוד.
+    """
+    if len(images) > MAX_IMAGES_PER_ROOM:
+        raise HTTPException(status_code=400, detail=f"Too many images. At most {MAX_IMAGES_PER_ROOM} per room.")
+
+    allowed_extensions = [".jpg", ".jpeg", ".png"]
+    frames = []
+    for image in images:
+        ext = os.path.splitext(image.filename)[1].lower()
+        if ext not in allowed_extensions:
+            raise HTTPException(status_code=400, detail=f"Invalid image type: {image.filename}. Only JPG, JPEG, PNG allowed.")
+        try:
+            frames.append(await run_in_threadpool(decode_image, await image.read()))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid image {image.filename}: {str(e)}")
+
+    result = await plan_decorative_lighting_batch(frames, room_type)
+    if result["method"] == "error":
+        raise HTTPException(status_code=500, detail=result["suggestions"][0])
+    return JSONResponse(content=result)
@@ -1,9 +1,15 @@
 # LightController.py
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+import csv
+import io
+import json
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 from MODEL.database import Database
 from MODEL.Light import Light
+from ReadCache import etag_matches, invalidate_usage, read_cache, usage_lights_key
 
 router = APIRouter(
     prefix="/lights",
@@ -37,14 +43,50 @@ class LightResponse(BaseModel):
     power: Optional[float] = None
 
 
+LIGHT_FIELDS = ("light_id", "usage_id", "x", "y", "z", "power")
+# גודל עמוד ב-GET /lights/ (keyset pagination)
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+
+def _ndjson_lines(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(LIGHT_FIELDS, row))) + "\n" for row in rows)
+
+
+def _csv_lines(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(LIGHT_FIELDS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
 # נקודות קצה
 @router.get("/", response_model=List[LightResponse])
-def get_all_lights(db: Database = Depends(lambda: Database())):
+def get_all_lights(
+        response: Response,
+        usage_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        after_id: Optional[int] = None,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        db: Database = Depends(lambda: Database())
+):
     """
-    קבלת כל המנורות
+    קבלת המנורות, עם מסננים, בעמודים לפי light_id.
+    כשיש עמוד נוסף, הכותרת X-Next-After-Id מכילה את ה-after_id לבקשה הבאה.
     """
     light_dal = Light(db)
-    lights = light_dal.get_all() if hasattr(light_dal, 'get_all') else []
+    lights = light_dal.get_page(usage_id, user_id, date_from, date_to, after_id, limit)
+    if len(lights) == limit:
+        response.headers["X-Next-After-Id"] = str(lights[-1][0])
 
     result = []
     for light in lights:
@@ -60,6 +102,28 @@ def get_all_lights(db: Database = Depends(lambda: Database())):
     return result
 
 
+@router.get("/export")
+def export_lights(
+        format: Literal["ndjson", "csv"] = "ndjson",
+        usage_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        db: Database = Depends(lambda: Database())
+):
+    """
+    ייצוא המנורות (עם אותם מסננים) כ-NDJSON או CSV בהזרמה - השורות נקראות מהמסד בחלקים
+    ונשלחות ללקוח מיד, כך שהזיכרון קבוע בלי קשר לגודל הטבלה.
+    """
+    chunks = Light(db).stream(usage_id, user_id, date_from, date_to)
+    if format == "csv":
+        body, media_type = _csv_lines(chunks), "text/csv"
+    else:
+        body, media_type = _ndjson_lines(chunks), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="lights.{format}"'})
+
+
 @router.get("/{light_id}", response_model=LightResponse)
 def get_light(light_id: int, db: Database = Depends(lambda: Database())):
     """
@@ -82,24 +146,19 @@ def get_light(light_id: int, db: Database = Depends(lambda: Database())):
 
 
 @router.get("/usage/{usage_id}", response_model=List[LightResponse])
-def get_lights_by_usage(usage_id: int, db: Database = Depends(lambda: Database())):
+def get_lights_by_usage(usage_id: int, request: Request, response: Response):
     """
-    קבלת מנורות לפי מזהה שימוש
+    קבלת מנורות לפי מזהה שימוש - מהמטמון כשאפשר (חיבור למסד נפתח רק בהחטאה),
+    עם ETag: If-None-Match תואם מחזיר 304 בלי גוף
     """
-    light_dal = Light(db)
-    lights = light_dal.get_by_usage_id(usage_id)
-
-    result = []
-    for light in lights:
-        result.append({
-            "light_id": light[0],
-            "usage_id": light[1],
-            "x": light[2],
-            "y": light[3],
-            "z": light[4],
-            "power": light[5]
-        })
-
+    def load():
+        lights = Light(Database()).get_by_usage_id(usage_id)
+        return [dict(zip(LIGHT_FIELDS, light)) for light in lights]
+
+    result, etag = read_cache.get_or_load(usage_lights_key(usage_id), load)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return result
 
 
@@ -121,6 +180,8 @@ def create_light(light: LightCreate, db: Database = Depends(lambda: Database()))
     if not new_light_id:
         raise HTTPException(status_code=500, detail="שגיאה ביצירת מנורה")
 
+    invalidate_usage(light.usage_id)
+
     return {
         "light_id": new_light_id[0],
         "usage_id": light.usage_id,
@@ -155,6 +216,8 @@ def update_light(light_id: int, light: LightUpdate, db: Database = Depends(lambd
         raise HTTPException(status_code=500, detail="שגיאה בעדכון מנורה")
 
     updated_light = light_dal.get_by_id(light_id)
+    invalidate_usage(existing_light[1])
+    invalidate_usage(updated_light[1])
 
     return {
         "light_id": updated_light[0],
@@ -181,6 +244,8 @@ def delete_light(light_id: int, db: Database = Depends(lambda: Database())):
     if not success:
         raise HTTPException(status_code=500, detail="שגיאה במחיקת מנורה")
 
+    invalidate_usage(existing_light[1])
+
     return None
 
 
@@ -191,13 +256,14 @@ def delete_lights_by_usage(usage_id: int, db: Database = Depends(lambda: Databas
     """
     light_dal = Light(db)
 
-    # בדיקה אם יש מנורות לשימוש זה
-    lights = light_dal.get_by_usage_id(usage_id)
-    if not lights:
+    # מחיקת כל המנורות בפקודה אחת
+    try:
+        deleted = light_dal.delete_by_usage_id(usage_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה במחיקת מנורות: {str(e)}")
+    if not deleted:
         return None
 
-    # מחיקת כל המנורות
-    for light in lights:
-        light_dal.delete(light[0])
+    invalidate_usage(usage_id)
 
     return None
\ No newline at end of file
@@ -1,9 +1,17 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from fileProcessor import fileProcessor
-import tempfile
-import os
+from ModelRegistry import model_registry, ROOM_CLASSIFIER_MAX_BATCH, ROOM_CLASSIFIER_MAX_WAIT_MS
+from InferenceBatcher import InferenceBatcher
+from RoomClassifier import ROOM_TYPES, preprocess
+from ImageDecoding import decode_image
+from ImageAnalysisCache import image_analysis_cache
+from AdmissionController import (AdmissionRejected, admission_controller, count_ifc_elements, estimate_cost,
+                                 ADMISSION_MAX_UPLOAD_BYTES)
+from controller.AuthController import get_current_user
 from pathlib import Path
+from typing import Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,48 +22,30 @@ router = APIRouter(
 
 processor = fileProcessor()
 
-# אתחול המודלים
-decorative_model = None
-room_classifier = None
 
+def predict_room_batch(batch):
+    """מעבר אחד של מסווג החדרים על batch של תמונות 64x64 מנורמלות"""
+    return model_registry.get("room_classifier").predict_on_batch(batch)
 
-def initialize_models():
-    """אתחול המודלים"""
-    global decorative_model, room_classifier
 
-    # מודל תאורת נוי
-    try:
-        from DecorativeLightingModel import DecorativeLightingModel
-        decorative_model = DecorativeLightingModel()
-        logger.info(" מודל תאורת נוי נטען")
-    except Exception as e:
-        logger.warning(f"⚠ מודל תאורת נוי לא נטען: {str(e)}")
-        decorative_model = None
-
-    # מודל סיווג חדרים
-    try:
-        import tensorflow as tf
-        model_path = r"C:\Users\user\Desktop\פרויקט גמר\fastApiProject\machineLarning\room_classification\room_classifier.h5"
-        room_classifier = tf.keras.models.load_model(model_path)
-        logger.info(f" מודל סיווג חדרים נטען")
-        model_loaded = True
-
-    except Exception as e:
-        logger.error(f" שגיאה בטעינת מודל סיווג: {str(e)}")
-        room_classifier = None
-
-# אתחול המודלים בעת טעינת הקובץ
-initialize_models()
+# בקשות סיווג מקבילות מאוגדות ל-batch אחד
+room_classifier_batcher = InferenceBatcher("room_classifier", predict_room_batch,
+                                           ROOM_CLASSIFIER_MAX_BATCH, ROOM_CLASSIFIER_MAX_WAIT_MS)
 
 @router.post("/upload-ifc-with-image/")
 async def upload_ifc_with_image(
+        request: Request,
         ifc_file: UploadFile = File(...),
         image_file: UploadFile = File(...),
-        user_id: str = Form(...)
+        user_id: Optional[str] = Form(None),
+        current_user=Depends(get_current_user)
 ):
     """
-    העלאת קובץ IFC ותמונה
+    העלאת קובץ IFC ותמונה למשתמש המחובר; user_id בטופס נשמר לתאימות וחייב להתאים לטוקן
     """
+    authenticated_id = str(current_user[0])
+    if user_id is not None and user_id != authenticated_id:
+        raise HTTPException(status_code=403, detail="אין הרשאה להעלות עבור משתמש אחר")
     logger.info(f"התחלת תהליך העלאה משולב: IFC={ifc_file.filename}, Image={image_file.filename}")
 
     # בדיקת קבצים
@@ -69,27 +59,44 @@ async def upload_ifc_with_image(
     if image_ext not in allowed_image_types:
         raise HTTPException(status_code=400, detail="סוג תמונה לא תקין. מותר JPG, PNG")
 
-    # שמירת תמונה זמנית
-    temp_image_path = None
+    # בדיקת גודל לפני קריאת הקובץ: גודל החלק בטופס, או Content-Length של כל הבקשה
+    file_size = ifc_file.size
+    if file_size is None:
+        file_size = int(request.headers.get("content-length") or 0)
+    if file_size and file_size > ADMISSION_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="הקובץ גדול מדי לעיבוד")
+
+    # הערכת עלות לפי גודל הקובץ ומספר האלמנטים, לפני כל עיבוד כבד - קריאה במקטעים בלי לטעון את כל הקובץ
+    element_count = await run_in_threadpool(count_ifc_elements, ifc_file.file)
+    await ifc_file.seek(0)
+    cost = estimate_cost(file_size or 0, element_count)
+
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=image_ext) as temp_image:
-            image_data = await image_file.read()
-            temp_image.write(image_data)
-            temp_image_path = temp_image.name
+        async with admission_controller.slot(authenticated_id, cost):
+            return await _process_upload(ifc_file, image_file, authenticated_id)
+    except AdmissionRejected as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.status_code == 429 else None
+        detail = "הקובץ גדול מדי לעיבוד" if e.status_code == 413 else "השרת עמוס - נסו שוב מאוחר יותר"
+        raise HTTPException(status_code=e.status_code, detail=detail, headers=headers)
+
 
-        logger.info(f"תמונה נשמרה זמנית: {temp_image_path}")
+async def _process_upload(ifc_file: UploadFile, image_file: UploadFile, user_id: str):
+    image_data = await image_file.read()
+    try:
+        #  זיהוי סוג חדר ותכנון תאורת נוי מהתמונה (או מהמטמון)
+        analysis = await analyze_room_image(image_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"תמונה לא תקינה: {str(e)}")
 
-        #  זיהוי סוג חדר מהתמונה
-        room_type = await classify_room_from_image(temp_image_path)
+    try:
+        room_type = analysis["room_type"]
+        decorative_suggestions = analysis["decorative_lighting"]
         logger.info(f"סוג חדר זוהה: {room_type}")
 
         #  תכנון תאורה רגילה עם IFC + סוג חדר
         lighting_result = await processor.process_and_save_file(ifc_file, user_id, room_type)
         usage_id = lighting_result["usage_id"]
 
-        #  תכנון תאורת נוי עם תמונה + סוג חדר
-        decorative_suggestions = await plan_decorative_lighting(temp_image_path, room_type)
-
         result = {
             "usage_id": usage_id,
             "room_type_detected": room_type,
@@ -108,68 +115,94 @@ async def upload_ifc_with_image(
         logger.error(f"שגיאה בתהליך משולב: {str(e)}")
         raise HTTPException(status_code=500, detail=f"שגיאהבעיבוד: {str(e)}")
 
-    finally:
-        # ניקוי קובץ תמונה זמני
-        if temp_image_path and os.path.exists(temp_image_path):
-            try:
-                os.remove(temp_image_path)
-                logger.info("קובץ תמונה זמני נמחק")
-            except:
-                pass
 
-
-async def classify_room_from_image(image_path: str) -> str:
-    """זיהוי סוג חדר מתמונה"""
+async def analyze_room_image(image_data: bytes) -> dict:
+    """
+    סיווג החדר ותכנון תאורת הנוי לתמונה. תמונה שכבר נותחה עם אותם מודלים מוחזרת מהמטמון
+    בלי פענוח ובלי הרצת המודלים. זורק ValueError אם הבייטים אינם תמונה.
+    """
+    model_version = model_registry.model_version()
+    cached = image_analysis_cache.get(image_data, model_version)
+    if cached is not None:
+        return cached
+
+    # פענוח התמונה פעם אחת מהזיכרון - הפריים משותף למסווג ול-YOLO, בלי קובץ זמני
+    frame = await run_in_threadpool(decode_image, image_data)
+    cached = image_analysis_cache.get_similar(frame, model_version)
+    if cached is not None:
+        return cached
+
+    room_type, classified = await classify_room_from_image(frame)
+    decorative_suggestions = await plan_decorative_lighting(frame, room_type)
+    analysis = {"room_type": room_type, "decorative_lighting": decorative_suggestions}
+
+    # נשמר רק ניתוח ששני המודלים הריצו בפועל - ברירת מחדל אחרי שגיאה או מודל חסר אינה תוצאה של התמונה.
+    # מפתח הגרסה נקרא מחדש אחרי הניתוח: בזמן החימום הגרסה שנקראה למעלה היא עוד "none"
+    if classified and decorative_suggestions.get("method") == "yolo_analysis" and model_registry.is_ready():
+        image_analysis_cache.set(image_data, model_registry.model_version(), analysis, frame)
+    return analysis
+
+
+async def classify_room_from_image(frame) -> Tuple[str, bool]:
+    """זיהוי סוג חדר מפריים RGB מפוענח; מחזיר (סוג חדר, האם המסווג סיווג בפועל) - False כשהוחזרה ברירת מחדל"""
     try:
+        # טעינה בקריאה הראשונה אם החימום ברקע עוד לא סיים - מחוץ ל-event loop
+        room_classifier = await run_in_threadpool(model_registry.get, "room_classifier")
         if room_classifier is None:
             logger.warning("מודל סיווג לא זמין - משתמש בברירת מחדל")
-            return "bedroom"
+            return "bedroom", False
 
         import numpy as np
-        from tensorflow.keras.preprocessing import image
 
-        # טעינת תמונה ועיבוד
-        img = image.load_img(image_path, target_size=(64, 64))
-        img_array = image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
-        img_array /= 255.0
+        img_array = preprocess(frame)
 
-        # חיזוי
-        predictions = room_classifier.predict(img_array)
-        predicted_class = np.argmax(predictions[0])
-        confidence = np.max(predictions[0])
+        # חיזוי - מאוגד עם בקשות מקבילות
+        predictions = await room_classifier_batcher.predict(img_array)
+        predicted_class = np.argmax(predictions)
+        confidence = np.max(predictions)
 
         # מיפוי תוצאות
-        room_types = ["bathroom", "bedroom", "dining", "gaming", "kitchen", "laundry", "living", "office", "terrace", "yard"]
-
-        if predicted_class < len(room_types):
-            detected_room = room_types[predicted_class]
+        if predicted_class < len(ROOM_TYPES):
+            detected_room = ROOM_TYPES[predicted_class]
             logger.info(f"זוהה חדר: {detected_room} עם ביטחון: {confidence:.2f}")
-            return detected_room
+            return detected_room, True
         else:
             logger.warning("מחלקה לא מוכרת - ברירת מחדל")
-            return "bedroom"
+            return "bedroom", False
 
     except Exception as e:
         logger.error(f"שגיאה בסיווג חדר: {str(e)}")
-        return "bedroom"  # ברירת מחדל
+        return "bedroom", False  # ברירת מחדל
+
+
+BASIC_DECORATIVE_SUGGESTIONS = {
+    "bedroom": ["מנורת לילה ליד המיטה", "תאורה ליד מראה"],
+    "kitchen": ["תאורה מתחת לארונות", "תאורה מעל האי"],
+    "living": ["תאורה ליד ספות", "תאורת הטיה לטלוויזיה"],
+    "bathroom": ["תאורה ליד מראה", "תאורת אווירה"],
+    "office": ["מנורת שולחן", "תאורת הטיה למסך"],
+    "dining": ["נברשת מעל השולחן", "תאורת נוי"]
+}
 
 
-async def plan_decorative_lighting(image_path: str, room_type: str) -> dict:
-    """תכנון תאורת נוי"""
+async def plan_decorative_lighting(frame, room_type: str) -> dict:
+    """תכנון תאורת נוי מפריים RGB מפוענח"""
+    return await _plan_decorative(lambda model: model.analyze_image(frame, room_type), room_type)
+
+
+async def plan_decorative_lighting_batch(frames, room_type: str) -> dict:
+    """תכנון תאורת נוי מכמה תמונות של אותו חדר - מעבר YOLO אחד על כולן"""
+    result = await _plan_decorative(lambda model: model.analyze_images(frames, room_type), room_type)
+    result["image_count"] = len(frames)
+    return result
+
+
+async def _plan_decorative(analyze, room_type: str) -> dict:
     try:
+        decorative_model = await run_in_threadpool(model_registry.get, "decorative")
         if decorative_model is None:
             logger.warning("מודל תאורת נוי לא זמין - משתמש בהמלצות בסיסיות")
-            basic_suggestions = {
-                "bedroom": ["מנורת לילה ליד המיטה", "תאורה ליד מראה"],
-                "kitchen": ["תאורה מתחת לארונות", "תאורה מעל האי"],
-                "living": ["תאורה ליד ספות", "תאורת הטיה לטלוויזיה"],
-                "bathroom": ["תאורה ליד מראה", "תאורת אווירה"],
-                "office": ["מנורת שולחן", "תאורת הטיה למסך"],
-                "dining": ["נברשת מעל השולחן", "תאורת נוי"]
-            }
-
-            suggestions = basic_suggestions.get(room_type.lower(), ["תאורת אווירה כללית"])
+            suggestions = BASIC_DECORATIVE_SUGGESTIONS.get(room_type.lower(), ["תאורת אווירה כללית"])
 
             return {
                 "suggestions": suggestions,
@@ -179,7 +212,7 @@ async def plan_decorative_lighting(image_path: str, room_type: str) -> dict:
             }
 
         # ניתוח עם המודל
-        detected_objects, suggestions = decorative_model.analyze_image(image_path, room_type)
+        detected_objects, suggestions = await run_in_threadpool(analyze, decorative_model)
 
         return {
             "suggestions": suggestions,
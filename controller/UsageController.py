@@ -1,10 +1,15 @@
 # UsageController.py
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from MODEL.database import Database
 from MODEL.Usage import Usage
+from PlanRenderer import PlanRenderer, plan_renderer
+from IlluminanceGrid import IlluminanceService, illuminance_service
+from JsonCompression import IDENTITY, accepts_encoding, iter_decompress
+from ReadCache import etag_matches, invalidate_usage, read_cache, usage_key
 
 router = APIRouter(
     prefix="/usages",
@@ -42,23 +47,29 @@ def get_all_usages(db: Database = Depends(lambda: Database())):
 
 
 @router.get("/{usage_id}", response_model=UsageResponse)
-def get_usage(usage_id: int, db: Database = Depends(lambda: Database())):
+def get_usage(usage_id: int, request: Request, response: Response):
     """
-    קבלת שימוש לפי ID
+    קבלת שימוש לפי ID - מהמטמון כשאפשר, עם ETag (304 אם If-None-Match תואם)
     """
-    usage_dal = Usage(db)
-    usage = usage_dal.get_by_id(usage_id)
+    def load():
+        usage = Usage(Database()).get_by_id(usage_id)
+        if not usage:
+            return None
+        return {
+            "usage_id": usage[0],
+            "user_id": usage[1],
+            "usage_date": usage[2],
+            "floor_plan": None,  # לא מחזירים את הקובץ המלא
+            "json_file": None  # לא מחזירים את ה-JSON המלא
+        }
 
-    if not usage:
+    result, etag = read_cache.get_or_load(usage_key(usage_id), load)
+    if result is None:
         raise HTTPException(status_code=404, detail="שימוש לא נמצא")
-
-    return {
-        "usage_id": usage[0],
-        "user_id": usage[1],
-        "usage_date": usage[2],
-        "floor_plan": None,  # לא מחזירים את הקובץ המלא
-        "json_file": None  # לא מחזירים את ה-JSON המלא
-    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return result
 
 
 @router.get("/user/{user_id}", response_model=List[UsageResponse])
@@ -83,17 +94,71 @@ def get_usages_by_user(user_id: int, db: Database = Depends(lambda: Database()))
 
 
 @router.get("/{usage_id}/json")
-def get_usage_json(usage_id: int, db: Database = Depends(lambda: Database())):
+def get_usage_json(usage_id: int, request: Request, db: Database = Depends(lambda: Database())):
     """
-    קבלת תוכן ה-JSON של שימוש
+    קבלת תוכן ה-JSON של שימוש.
+    לקוח שמקבל את הקידוד השמור (Accept-Encoding) מקבל את הבייטים הדחוסים כמו שהם;
+    אחרים מקבלים את ה-JSON פרוס בהזרמה, בלי לבנות את כל המחרוזת בזיכרון.
     """
-    usage_dal = Usage(db)
-    usage = usage_dal.get_by_id(usage_id)
+    stored = Usage(db).get_json(usage_id)
+    if not stored:
+        raise HTTPException(status_code=404, detail="JSON לא נמצא")
+
+    data, encoding, length = stored
+    headers = {"X-Uncompressed-Length": str(length)}
+    if encoding == IDENTITY:
+        return Response(data, media_type="application/json", headers=headers)
+
+    headers["Vary"] = "Accept-Encoding"
+    if accepts_encoding(request.headers.get("accept-encoding", ""), encoding):
+        headers["Content-Encoding"] = encoding
+        return Response(data, media_type="application/json", headers=headers)
+    return StreamingResponse(iter_decompress(data, encoding), media_type="application/json", headers=headers)
 
-    if not usage or len(usage) <= 4 or not usage[4]:
+
+@router.get("/{usage_id}/plan")
+def get_usage_plan(usage_id: int, fmt: str = Query("png", alias="format"),
+                   db: Database = Depends(lambda: Database())):
+    """
+    תמונת תכנית התאורה (PNG או SVG) - מרונדרת לפי דרישה ונשמרת במטמון
+    """
+    if fmt not in PlanRenderer.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="פורמט לא נתמך. מותר png, svg")
+
+    image = plan_renderer.render_usage(usage_id, db, fmt)
+    if image is None:
         raise HTTPException(status_code=404, detail="JSON לא נמצא")
 
-    return usage[4]  # מחזירים את ה-JSON
+    return Response(content=image, media_type=PlanRenderer.MEDIA_TYPES[fmt])
+
+
+@router.get("/{usage_id}/illuminance")
+def get_usage_illuminance(usage_id: int,
+                          resolution: float = Query(0.1, ge=IlluminanceService.MIN_RESOLUTION, le=5.0),
+                          height: float = Query(0.75, ge=0.0, le=5.0),
+                          fmt: str = Query("json", alias="format"),
+                          db: Database = Depends(lambda: Database())):
+    """
+    מפת עוצמת תאורה (לוקס) על מישור העבודה, עם מינימום/ממוצע/מקסימום ויחס אחידות
+    """
+    if fmt not in ("json", "npz"):
+        raise HTTPException(status_code=400, detail="פורמט לא נתמך. מותר json, npz")
+
+    try:
+        result = illuminance_service.get_grid(usage_id, db, resolution, height)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="JSON לא נמצא")
+
+    if fmt == "npz":
+        summary = result["summary"]
+        headers = {f"X-Lux-{name.capitalize()}": f"{value:.3f}" for name, value in summary.items()}
+        return Response(content=IlluminanceService.encode_npz(result), media_type="application/octet-stream",
+                        headers=headers)
+
+    return IlluminanceService.encode_json(result)
 
 
 @router.get("/{usage_id}/floor-plan")
@@ -101,8 +166,6 @@ def get_usage_floor_plan(usage_id: int, db: Database = Depends(lambda: Database(
     """
     קבלת קובץ תוכנית הקומה
     """
-    from fastapi.responses import Response
-
     usage_dal = Usage(db)
     usage = usage_dal.get_by_id(usage_id)
 
@@ -138,8 +201,10 @@ async def create_usage(
     if not new_usage:
         raise HTTPException(status_code=500, detail="שגיאה ביצירת שימוש")
 
+    invalidate_usage(new_usage["usage_id"])
+
     return {
-        "usage_id": new_usage[0],
+        "usage_id": new_usage["usage_id"],
         "user_id": user_id,
         "usage_date": datetime.now(),
         "floor_plan": None,  # לא מחזירים את הקובץ המלא
@@ -178,6 +243,8 @@ async def update_usage(
     if not success:
         raise HTTPException(status_code=500, detail="שגיאה בעדכון שימוש")
 
+    invalidate_usage(usage_id)
+
     updated_usage = usage_dal.get_by_id(usage_id)
 
     return {
@@ -200,8 +267,14 @@ def delete_usage(usage_id: int, db: Database = Depends(lambda: Database())):
     if not existing_usage:
         raise HTTPException(status_code=404, detail="שימוש לא נמצא")
 
-    success = usage_dal.delete(usage_id)
+    # השימוש והמנורות שלו נמחקים יחד בטרנזקציה אחת
+    try:
+        success, _ = usage_dal.delete_cascade(usage_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"שגיאה במחיקת שימוש: {str(e)}")
     if not success:
         raise HTTPException(status_code=500, detail="שגיאה במחיקת שימוש")
 
+    invalidate_usage(usage_id)
+
     return None
\ No newline at end of file
@@ -4,6 +4,8 @@ from typing import List
 from pydantic import BaseModel
 from MODEL.database import Database
 from MODEL.User import User
+from MODEL.Usage import Usage
+from AuthCache import auth_cache
 
 router = APIRouter(
     prefix="/users",
@@ -96,6 +98,7 @@ def update_user(user_id: int, user: UserUpdate, db: Database = Depends(lambda: D
 
     # עדכון המשתמש
     success = user_dal.update(user_id, user.email, user.password)
+    auth_cache.invalidate_user(user_id)
     if not success:
         raise HTTPException(status_code=500, detail="שגיאה בעדכון משתמש")
 
@@ -116,8 +119,13 @@ def delete_user(user_id: int, db: Database = Depends(lambda: Database())):
     if not existing_user:
         raise HTTPException(status_code=404, detail="משתמש לא נמצא")
 
+    # השימושים לא נמחקים עם המשתמש (ON DELETE RESTRICT) - מוחקים אותם קודם במפורש
+    if Usage(db).get_ids_by_user_id(user_id):
+        raise HTTPException(status_code=409, detail="למשתמש יש שימושים - יש למחוק אותם לפני מחיקת המשתמש")
+
     # מחיקת המשתמש
     success = user_dal.delete(user_id)
+    auth_cache.invalidate_user(user_id)
     if not success:
         raise HTTPException(status_code=500, detail="שגיאה במחיקת משתמש")
 
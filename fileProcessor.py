@@ -1,11 +1,12 @@
 import os
 import tempfile
 import logging
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Tuple
-import aiofiles
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 import IFCProcessor
 from MODEL.database import Database
@@ -13,22 +14,18 @@ from MODEL.Usage import Usage
 from MODEL.Light import Light
 from models import Graph, LightVertex
 from BuildGraph import BuildGraph
+from Metrics import LIGHTS, STAGE_SECONDS, timed
+from ReadCache import invalidate_usage
 
 # הגדרת לוגר
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
 
 class fileProcessor:
-    def __init__(self):
-        try:
-            self.db = Database()
-            self.usage_dal = Usage(self.db)
-            self.light_dal = Light(self.db)
-            logger.debug("fileProcessor initialized with database connection")
-        except Exception as e:
-            logger.error("Failed to initialize database connection: %s", str(e))
-            raise
+    """
+    העיבוד הכבד (קריאת IFC, בניית גרף, אופטימיזציה ושמירה) רץ ב-thread pool ולא על לולאת האירועים.
+    כל עבודה פותחת חיבור משלה למסד - חיבור MySQL אינו בטוח לשימוש מכמה threads במקביל.
+    """
 
     async def validate_file(self, file: UploadFile) -> Tuple[bool, str]:
         logger.debug("Validating file: %s", file.filename if file else None)
@@ -52,18 +49,24 @@ class fileProcessor:
             raise HTTPException(status_code=400, detail="מזהה משתמש לא תקף. חייב להיות מספר שלם.")
 
         user_id = int(user_id)
-        temp_file_path = None
-        json_path = None
 
         # בדיקת סוג הקובץ
         file_extension = Path(file.filename).suffix.lower()
+        file_data = await file.read()
+
+        return await run_in_threadpool(self.process_file_data, file_data, file_extension, user_id, room_type)
+
+    def process_file_data(self, file_data: bytes, file_extension: str, user_id: int, room_type: str):
+        """החלק הסינכרוני של process_and_save_file - רץ ב-thread"""
+        temp_file_path = None
+        json_path = None
+        db = None
 
         # שמירת קובץ זמני עם הסיומת המתאימה
         with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            file_data = await file.read()
             temp_file.write(file_data)
             temp_file_path = temp_file.name
-            logger.debug(f"Saved {file_extension} file to: {temp_file_path}")
+            logger.debug("Saved %s file to: %s", file_extension, temp_file_path)
 
         try:
             # עיבוד הקובץ ל-JSON
@@ -78,27 +81,25 @@ class fileProcessor:
                 logger.error("json_path is not a string: %s", type(json_path))
                 raise ValueError("Processor must return a string path")
 
-            async with aiofiles.open(json_path, 'r', encoding='utf-8') as f:
-                json_content = await f.read()
+            with open(json_path, 'r', encoding='utf-8') as f:
+                json_content = f.read()
                 logger.debug("Read JSON content length: %s", len(json_content))
                 logger.debug("JSON file first 100 characters: %s", json_content[:100] if json_content else "Empty")
 
-            # בדיקת חיבור תקין למסד הנתונים
-            if not self.db.connection or not self.db.connection.is_connected():
-                logger.error("Database connection lost. Reconnecting...")
-                self.db = Database()
-                self.usage_dal = Usage(self.db)
-                self.light_dal = Light(self.db)
+            db = Database()
+            usage_dal = Usage(db)
+            light_dal = Light(db)
 
             # שמירה במסד דרך Usage
             logger.debug("About to call usage_dal.create with user_id=%s", user_id)
             try:
-                usage_data = self.usage_dal.create(
-                    user_id=user_id,
-                    usage_date=datetime.now(),
-                    floor_plan=file_data,
-                    json_file=json_content
-                )
+                with timed("save_usage"):
+                    usage_data = usage_dal.create(
+                        user_id=user_id,
+                        usage_date=datetime.now(),
+                        floor_plan=file_data,
+                        json_file=json_content
+                    )
                 logger.debug("Result from usage_dal.create: %s", usage_data)
                 logger.debug("Type of usage_data: %s", type(usage_data))
                 if isinstance(usage_data, tuple):
@@ -156,7 +157,8 @@ class fileProcessor:
             logger.debug("Building graph from JSON path: %s", json_path)
             builder = BuildGraph(room_lighting_config.get(room_type.lower(), {}))
             try:
-                graph = builder.build_graph_from_json(json_path)
+                with timed("build_graph_from_json"):
+                    graph = builder.build_graph_from_json(json_path)
                 logger.debug("Graph built successfully with %d vertices",
                              len(graph.vertices) if hasattr(graph, 'vertices') and graph.vertices else 0)
             except Exception as e:
@@ -166,6 +168,7 @@ class fileProcessor:
 
             # יצירת אובייקטי Light
             light_count = 0
+            save_lights_started = time.perf_counter()
             if hasattr(graph, 'vertices') and graph.vertices:
                 vertices_to_check = []
 
@@ -179,29 +182,29 @@ class fileProcessor:
                 for vertex in vertices_to_check:
                     if isinstance(vertex, LightVertex):
                         try:
-                            logger.debug("Creating light at position (%f, %f, %f) with power %f",
-                                         vertex.point.x, vertex.point.y, vertex.point.z, vertex.lux)
-                            light_result = self.light_dal.create(
+                            light_dal.create(
                                 usage_id=usage_id,
                                 x=vertex.point.x,
                                 y=vertex.point.y,
                                 z=vertex.point.z,
                                 power=vertex.lux
                             )
-                            logger.debug("Light created with result: %s", light_result)
                             light_count += 1
                         except Exception as e:
                             logger.error("Error creating light: %s", str(e), exc_info=True)
 
-            logger.debug("Created %d lights", light_count)
+            STAGE_SECONDS.observe(time.perf_counter() - save_lights_started, "save_lights")
+            invalidate_usage(usage_id)
+            LIGHTS.inc(light_count)
+            logger.debug("Created %d lights for usage %s", light_count, usage_id)
             return {"usage_id": usage_id, "message": f"File processed successfully, created {light_count} lights"}
 
         except Exception as e:
             logger.error("Error processing file: %s", str(e), exc_info=True)
             # נסה לסגור את החיבור לבסיס הנתונים אם הוא פתוח
             try:
-                if hasattr(self, 'db') and self.db and hasattr(self.db, 'connection') and self.db.connection:
-                    self.db.connection.commit()
+                if db and db.connection:
+                    db.connection.commit()
             except Exception as commit_error:
                 logger.error("Error during connection commit: %s", str(commit_error))
             raise HTTPException(status_code=500, detail=f"שגיאה בעיבוד הקובץ: {str(e)}")
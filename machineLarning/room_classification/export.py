@@ -0,0 +1,109 @@
+# export.py - המרת מסווג החדרים ל-TFLite / ONNX ובדיקת התאמה מול מודל ה-Keras
+#
+# שימוש:
+#   python -m machineLarning.room_classification.export --format tflite
+#   python -m machineLarning.room_classification.export --format onnx --data-dir path/to/data
+#   python -m machineLarning.room_classification.export --check-only --format tflite
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from RoomClassifier import INPUT_SIZE, default_model_path, load_room_classifier, preprocess
+
+
+def export_tflite(keras_model, output_path: str, quantize: bool = False):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize:
+        # קוונטיזציה דינמית של המשקולות ל-int8 (הקלט והפלט נשארים float32)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+
+def export_onnx(keras_model, output_path: str, opset: int = 13):
+    import tensorflow as tf
+    import tf2onnx
+
+    # ממד ה-batch דינמי כדי שה-InferenceBatcher יוכל לשלוח כל גודל
+    spec = (tf.TensorSpec((None, *INPUT_SIZE, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=opset, output_path=output_path)
+
+
+def load_samples(data_dir: str = None, limit: int = 256, seed: int = 0) -> np.ndarray:
+    """תמונות אמיתיות מתיקיית הנתונים (אותו עיבוד כמו בשרת) או קלט אקראי אם אין"""
+    if data_dir and os.path.isdir(data_dir):
+        from PIL import Image
+
+        samples = []
+        for root, _, files in sorted(os.walk(data_dir)):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() not in (".jpg", ".jpeg", ".png"):
+                    continue
+                with Image.open(os.path.join(root, name)) as img:
+                    samples.append(preprocess(np.asarray(img.convert("RGB"))))
+                if len(samples) >= limit:
+                    return np.stack(samples)
+        if samples:
+            return np.stack(samples)
+
+    rng = np.random.default_rng(seed)
+    return rng.random((limit, *INPUT_SIZE, 3), dtype=np.float32)
+
+
+def check_parity(reference, candidate, samples: np.ndarray, batch_size: int = 32) -> dict:
+    """השוואת הסתברויות ו-top-1 בין שני מנועים על אותן דגימות"""
+    reference_out, candidate_out = [], []
+    for start in range(0, len(samples), batch_size):
+        batch = samples[start:start + batch_size]
+        reference_out.append(reference.predict_on_batch(batch))
+        candidate_out.append(candidate.predict_on_batch(batch))
+    reference_out = np.concatenate(reference_out)
+    candidate_out = np.concatenate(candidate_out)
+
+    return {
+        "samples": int(len(samples)),
+        "top1_agreement": float(np.mean(reference_out.argmax(axis=1) == candidate_out.argmax(axis=1))),
+        "max_abs_diff": float(np.max(np.abs(reference_out - candidate_out))),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export the room classifier to TFLite/ONNX and check parity")
+    parser.add_argument("--model", default=default_model_path("keras"), help="Keras .h5 model")
+    parser.add_argument("--format", choices=("tflite", "onnx"), default="tflite")
+    parser.add_argument("--output", help="Output path (default: next to the Keras model)")
+    parser.add_argument("--quantize", action="store_true", help="TFLite dynamic-range quantization")
+    parser.add_argument("--data-dir", default=os.environ.get("ROOM_DATA_DIR"),
+                        help="Images for the parity check (random inputs if missing)")
+    parser.add_argument("--samples", type=int, default=256)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    parser.add_argument("--check-only", action="store_true", help="Skip the export, only compare")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.model)[0] + "." + args.format
+    reference = load_room_classifier("keras", args.model)
+
+    if not args.check_only:
+        if args.format == "tflite":
+            export_tflite(reference.model, output, args.quantize)
+        else:
+            export_onnx(reference.model, output)
+        print(f"נשמר: {output} ({os.path.getsize(output) / 1024:.1f} KB)")
+
+    candidate = load_room_classifier(args.format, output)
+    result = check_parity(reference, candidate, load_samples(args.data_dir, args.samples))
+    print(f"התאמה: top-1 {result['top1_agreement']:.2%} על {result['samples']} דגימות, "
+          f"הפרש מקסימלי {result['max_abs_diff']:.2e}")
+
+    if result["top1_agreement"] < args.min_agreement:
+        print(f"ההתאמה נמוכה מ-{args.min_agreement:.2%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
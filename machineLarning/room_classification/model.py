@@ -1,104 +1,204 @@
-import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-import matplotlib.pyplot as plt
+# model.py - אימון מסווג החדרים עם צינור tf.data
+#
+# שימוש:
+#   python -m machineLarning.room_classification.model --data-dir path/to/data
+#   ROOM_DATA_DIR=path/to/data python -m machineLarning.room_classification.model --epochs 100
+#
+# תיקיית הנתונים: תת-תיקייה לכל סוג חדר (כמו ב-flow_from_directory).
+# התמונות מפוענחות ומוקטנות ל-64x64 פעם אחת ונשמרות במטמון על הדיסק (--cache-dir),
+# כך שמהאפוק השני והלאה האימון לא נוגע ב-JPEG בכלל.
+import argparse
+import hashlib
 import os
+import sys
+
+import tensorflow as tf
 
-data_dir = 'C:\\Users\\user\\Desktop\\פרויקט גמר\\fastApiProject\\machineLarning\\data'
-
-print("תיקיות זמינות:", os.listdir(data_dir))
-
-# עיבוד מקדים של התמונות
-train_datagen = ImageDataGenerator(
-    rescale=1./255,  # נרמול ערכי הפיקסלים
-    rotation_range=10,
-    width_shift_range=0.1,
-    height_shift_range=0.1,
-    horizontal_flip=True,
-    validation_split=0.2  # 20% מהנתונים לוולידציה
-)
-
-# טעינת נתוני האימון
-train_generator = train_datagen.flow_from_directory(
-    data_dir,
-    target_size=(64, 64),  # גודל תמונה קטן יותר לחיסכון בחישוב
-    batch_size=16,
-    class_mode='categorical',
-    subset='training'
-)
-
-# טעינת נתוני הוולידציה
-validation_generator = train_datagen.flow_from_directory(
-    data_dir,
-    target_size=(150, 150),
-    batch_size=16,
-    class_mode='categorical',
-    subset='validation'
-)
-
-# הצגת המיפוי של התוויות
-print("מיפוי תוויות:", train_generator.class_indices)
-
-# בניית מודל CNN פשוט
-model = tf.keras.Sequential([
-    tf.keras.layers.Conv2D(16, (3, 3), activation='relu', input_shape=(64, 64, 3)),
-    tf.keras.layers.MaxPooling2D(2, 2),
-    tf.keras.layers.Conv2D(32, (3, 3), activation='relu'),
-    tf.keras.layers.MaxPooling2D(2, 2),
-    tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
-    tf.keras.layers.MaxPooling2D(2, 2),
-    tf.keras.layers.Flatten(),
-    tf.keras.layers.Dense(128, activation='relu'),
-    tf.keras.layers.Dropout(0.3),
-    tf.keras.layers.Dense(64, activation='relu'),
-    tf.keras.layers.Dropout(0.3),
-    tf.keras.layers.Dense(train_generator.num_classes, activation='softmax')
-])
-
-# קומפילציה של המודל
-model.compile(
-    optimizer='adam',
-    loss='categorical_crossentropy',
-    metrics=['accuracy']
-)
-
-# סיכום המודל
-model.summary()
-
-# אימון המודל
-history = model.fit(
-    train_generator,
-    epochs=250,
-    validation_data=validation_generator
-)
-
-# הערכת המודל
-val_loss, val_accuracy = model.evaluate(validation_generator)
-print(f"Validation Loss: {val_loss:.4f}")
-print(f"Validation Accuracy: {val_accuracy:.4f}")
-
-# ויזואליזציה של תוצאות האימון
-plt.figure(figsize=(12, 4))
-
-# גרף דיוק
-plt.subplot(1, 2, 1)
-plt.plot(history.history['accuracy'], label='Training Accuracy')
-plt.plot(history.history['val_accuracy'], label='Validation Accuracy')
-plt.title('Model Accuracy')
-plt.xlabel('Epoch')
-plt.ylabel('Accuracy')
-plt.legend()
-
-# גרף הפסד
-plt.subplot(1, 2, 2)
-plt.plot(history.history['loss'], label='Training Loss')
-plt.plot(history.history['val_loss'], label='Validation Loss')
-plt.title('Model Loss')
-plt.xlabel('Epoch')
-plt.ylabel('Loss')
-plt.legend()
-
-plt.show()
-
-# שמירת המודל
-model.save('room_classifier.h5')
-print("המודל נשמר כ-'room_classifier.h5'")
\ No newline at end of file
+from RoomClassifier import INPUT_SIZE, default_model_path
+
+AUTOTUNE = tf.data.AUTOTUNE
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def list_images(data_dir: str):
+    """נתיבי תמונות ותוויות; מחלקות בסדר אלפביתי, כמו flow_from_directory ו-ROOM_TYPES"""
+    class_names = sorted(name for name in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, name)))
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(data_dir, class_name)
+        for name in sorted(os.listdir(class_dir)):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(class_dir, name))
+                labels.append(label)
+    return paths, labels, class_names
+
+
+def split_files(paths, labels, validation_split: float = 0.2, seed: int = 123):
+    """חלוקה קבועה (לפי seed) לאימון ולוולידציה"""
+    order = tf.random.experimental.stateless_shuffle(tf.range(len(paths)), seed=[seed, 0]).numpy()
+    val_count = int(len(paths) * validation_split)
+    val_idx, train_idx = order[:val_count], order[val_count:]
+    pick = lambda idx: ([paths[i] for i in idx], [labels[i] for i in idx])
+    return pick(train_idx), pick(val_idx)
+
+
+def files_fingerprint(paths, labels) -> str:
+    """טביעה של רשימת הקבצים (נתיבים ממוינים עם התוויות, ומספרם) - תמונה שנוספה, נמחקה או הועברה משנה אותה"""
+    digest = hashlib.sha1()
+    for path, label in sorted(zip(paths, labels)):
+        digest.update(f"{path}\t{label}\n".encode("utf-8"))
+    return f"{len(paths)}-{digest.hexdigest()[:12]}"
+
+
+def decode_and_resize(path, label):
+    """פענוח והקטנה ל-64x64 בשיטת nearest - אותו עיבוד כמו RoomClassifier.preprocess בשרת"""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, INPUT_SIZE, method="nearest")
+    # uint8 במטמון - רבע מהנפח של float32
+    return tf.cast(image, tf.uint8), label
+
+
+def build_augmentation(seed: int = None) -> tf.keras.Sequential:
+    """אותן הגדלות כמו ב-ImageDataGenerator הקודם, כשכבות שרצות על batch שלם"""
+    return tf.keras.Sequential([
+        tf.keras.layers.RandomFlip("horizontal", seed=seed),
+        tf.keras.layers.RandomRotation(10 / 360, seed=seed),
+        tf.keras.layers.RandomTranslation(0.1, 0.1, seed=seed),
+    ], name="augmentation")
+
+
+def make_dataset(paths, labels, num_classes: int, batch_size: int, cache_file: str = None,
+                 training: bool = False, seed: int = 123) -> tf.data.Dataset:
+    dataset = tf.data.Dataset.from_tensor_slices((paths, labels))
+    dataset = dataset.map(decode_and_resize, num_parallel_calls=AUTOTUNE, deterministic=not training)
+    # "" - מטמון בזיכרון; נתיב - קובץ מקומי שנשמר בין הרצות
+    dataset = dataset.cache(cache_file or "")
+    if training:
+        dataset = dataset.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+
+    augmentation = build_augmentation(seed) if training else None
+
+    def to_model_input(images, batch_labels):
+        images = tf.cast(images, tf.float32) / 255.0
+        if augmentation is not None:
+            images = augmentation(images, training=True)
+        return images, tf.one_hot(batch_labels, num_classes)
+
+    dataset = dataset.map(to_model_input, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE)
+
+
+def build_model(num_classes: int) -> tf.keras.Model:
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(*INPUT_SIZE, 3)),
+        tf.keras.layers.Conv2D(16, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Conv2D(32, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(128, activation='relu'),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(64, activation='relu'),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def plot_history(history, output_path: str = None):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 4))
+
+    # גרף דיוק
+    plt.subplot(1, 2, 1)
+    plt.plot(history.history['accuracy'], label='Training Accuracy')
+    plt.plot(history.history['val_accuracy'], label='Validation Accuracy')
+    plt.title('Model Accuracy')
+    plt.xlabel('Epoch')
+    plt.ylabel('Accuracy')
+    plt.legend()
+
+    # גרף הפסד
+    plt.subplot(1, 2, 2)
+    plt.plot(history.history['loss'], label='Training Loss')
+    plt.plot(history.history['val_loss'], label='Validation Loss')
+    plt.title('Model Loss')
+    plt.xlabel('Epoch')
+    plt.ylabel('Loss')
+    plt.legend()
+
+    if output_path:
+        plt.savefig(output_path)
+    else:
+        plt.show()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Train the room classifier")
+    parser.add_argument("--data-dir", default=os.environ.get("ROOM_DATA_DIR"),
+                        help="One sub-directory per room type (env ROOM_DATA_DIR)")
+    parser.add_argument("--output", default=default_model_path("keras"), help="Keras .h5 output")
+    parser.add_argument("--cache-dir", default=os.environ.get("ROOM_DATA_CACHE_DIR"),
+                        help="Where to cache decoded 64x64 images (in memory if omitted)")
+    parser.add_argument("--epochs", type=int, default=250)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--patience", type=int, default=20, help="Early-stopping patience (epochs)")
+    parser.add_argument("--validation-split", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=123)
+    parser.add_argument("--plot", nargs="?", const="", default=None,
+                        help="Show the training curves, or save them to the given path")
+    args = parser.parse_args(argv)
+
+    if not args.data_dir or not os.path.isdir(args.data_dir):
+        print("יש לציין תיקיית נתונים קיימת (--data-dir או ROOM_DATA_DIR)", file=sys.stderr)
+        return 2
+
+    paths, labels, class_names = list_images(args.data_dir)
+    print("מיפוי תוויות:", {name: i for i, name in enumerate(class_names)})
+    (train_paths, train_labels), (val_paths, val_labels) = split_files(
+        paths, labels, args.validation_split, args.seed)
+    print(f"אימון: {len(train_paths)} תמונות, וולידציה: {len(val_paths)} תמונות")
+
+    train_cache = val_cache = None
+    if args.cache_dir:
+        os.makedirs(args.cache_dir, exist_ok=True)
+        # שם הקובץ תלוי בחלוקה, בגודל ובקבצים עצמם, כדי שמטמון ישן לא ישמש לחלוקה או לנתונים אחרים
+        tag = (f"{INPUT_SIZE[0]}x{INPUT_SIZE[1]}-split{args.validation_split}-seed{args.seed}"
+               f"-files{files_fingerprint(paths, labels)}")
+        train_cache = os.path.join(args.cache_dir, f"train-{tag}")
+        val_cache = os.path.join(args.cache_dir, f"val-{tag}")
+
+    num_classes = len(class_names)
+    train_ds = make_dataset(train_paths, train_labels, num_classes, args.batch_size, train_cache,
+                            training=True, seed=args.seed)
+    val_ds = make_dataset(val_paths, val_labels, num_classes, args.batch_size, val_cache)
+
+    model = build_model(num_classes)
+    model.summary()
+
+    callbacks = [
+        tf.keras.callbacks.EarlyStopping(monitor="val_loss", patience=args.patience, restore_best_weights=True),
+        tf.keras.callbacks.ModelCheckpoint(args.output, monitor="val_loss", save_best_only=True),
+    ]
+    history = model.fit(train_ds, epochs=args.epochs, validation_data=val_ds, callbacks=callbacks)
+
+    # הערכת המודל (המשקולות הטובות ביותר לאחר early stopping)
+    val_loss, val_accuracy = model.evaluate(val_ds)
+    print(f"Validation Loss: {val_loss:.4f}")
+    print(f"Validation Accuracy: {val_accuracy:.4f}")
+
+    model.save(args.output)
+    print(f"המודל נשמר כ-'{args.output}'")
+
+    if args.plot is not None:
+        plot_history(history, args.plot or None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
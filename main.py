@@ -1,6 +1,21 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 import logging
+import os
+
+from LoggingConfig import configure_logging
+
+# הגדרת הלוגים לפני טעינת שאר המודולים
+configure_logging()
+
+import Metrics
+from ModelRegistry import model_registry, ML_WARMUP
+from PasswordHasher import password_hasher
+from MODEL.schema import migrate
 
 from controller.AuthController import router as auth_router
 from controller.UserController import router as user_router
@@ -9,13 +24,27 @@ from controller.UsageController import router as usage_router
 from controller.LightController import router as light_router
 from controller.DecorativeLightController import router as decorative_router
 
-logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+SCHEMA_AUTO_MIGRATE = os.environ.get("SCHEMA_AUTO_MIGRATE", "1").lower() not in ("0", "false", "no")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # טבלאות, אינדקסים ומפתחות זרים - פעם אחת לפני קבלת בקשות
+    if SCHEMA_AUTO_MIGRATE:
+        await run_in_threadpool(migrate)
+    # המודלים נטענים ברקע - השרת זמין מיד, /ready מדווח מתי הם מוכנים
+    if ML_WARMUP:
+        model_registry.warm_up_async()
+    yield
+    password_hasher.shutdown()
+
+
 app = FastAPI(
     title="Smart Lighting Design API",
     description="מערכת תכנון תאורה חכמה עם זיהוי סוג חדר ותאורת נוי",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS
@@ -50,6 +79,21 @@ def read_root():
 def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/ready")
+def readiness_check():
+    """מוכנות לתעבורה - כל מודלי ה-ML הפעילים נטענו (בניגוד ל-/health שבודק רק שהתהליך חי)"""
+    ready = model_registry.is_ready()
+    status = "ready" if ready else ("failed" if model_registry.failed() else "loading")
+    content = {"status": status, "models": model_registry.status()}
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """מדדי זמנים ומונים של שלבי העיבוד בפורמט Prometheus (METRICS_ENABLED=0 מכבה)"""
+    if not Metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(Metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Smart Lighting Design API v1.0...")
@@ -1,3 +1,5 @@
+from collections.abc import Sequence
+from itertools import chain
 from typing import List
 import json
 import math
@@ -40,20 +42,237 @@ class Edge:
         self.length = length
 
 class Graph:
+    """
+    גרף עם מזהי צמתים יציבים: המזהה הוא המיקום ב-vertices ואינו משתנה לעולם.
+    מחיקה משאירה None במקום (tombstone) כדי שהקשתות הקיימות ימשיכו להצביע נכון;
+    compact() מצופף את הרשימות כשצריך.
+    """
+
     def __init__(self):
         self.vertices = []
         self.edges = []
         self.center = None
+        # אינדקס סמיכות: מזהה צומת -> {קשת: מזהה השכן} לפי סדר הוספת הקשתות
+        self._adjacency = {}
+        # צומת -> המזהה שלו (המופע הראשון, כמו list.index)
+        self._vertex_index = {}
+        # קשת -> מיקומה ב-edges
+        self._edge_index = {}
+        self._removed_vertices = 0
+        self._removed_edges = 0
 
     def add_vertex(self, vertex: Vertex) -> int:
         self.vertices.append(vertex)
-        return len(self.vertices) - 1
+        index = len(self.vertices) - 1
+        self._vertex_index.setdefault(vertex, index)
+        return index
+
+    def add_vertices(self, vertices) -> List[int]:
+        """הוספת כמה צמתים, מחזיר את המזהים שלהם"""
+        return [self.add_vertex(vertex) for vertex in vertices]
 
     def add_edge(self, edge: Edge):
         self.edges.append(edge)
+        self._edge_index[edge] = len(self.edges) - 1
+        self._index_edge(edge)
+
+    def _index_edge(self, edge: Edge):
+        self._adjacency.setdefault(edge.start, {})[edge] = edge.end
+        if edge.end != edge.start:
+            self._adjacency.setdefault(edge.end, {})[edge] = edge.start
+
+    def replace_vertex(self, vertex_id: int, vertex: Vertex):
+        """החלפת צומת במקומו ב-O(1) - הקשתות שלו נשמרות"""
+        old = self.vertices[vertex_id]
+        if old is None:
+            raise KeyError(f"Vertex {vertex_id} was removed")
+        if self._vertex_index.get(old) == vertex_id:
+            del self._vertex_index[old]
+        self.vertices[vertex_id] = vertex
+        self._vertex_index.setdefault(vertex, vertex_id)
+
+    def remove_vertex(self, vertex_id: int):
+        """מחיקת צומת וכל הקשתות שלו; המזהים של שאר הצמתים לא משתנים"""
+        vertex = self.vertices[vertex_id]
+        if vertex is None:
+            return
+        for edge in list(self._adjacency.get(vertex_id, {})):
+            self.remove_edge(edge)
+        self._adjacency.pop(vertex_id, None)
+        if self._vertex_index.get(vertex) == vertex_id:
+            del self._vertex_index[vertex]
+        self.vertices[vertex_id] = None
+        self._removed_vertices += 1
+
+    def remove_vertices(self, vertex_ids):
+        for vertex_id in vertex_ids:
+            self.remove_vertex(vertex_id)
+
+    def remove_edge(self, edge: Edge):
+        position = self._edge_index.pop(edge, None)
+        if position is None:
+            return
+        self.edges[position] = None
+        self._removed_edges += 1
+        for endpoint in (edge.start, edge.end):
+            neighbors = self._adjacency.get(endpoint)
+            if neighbors:
+                neighbors.pop(edge, None)
+
+    def index_of(self, vertex: Vertex) -> int:
+        """המזהה של הצומת ב-O(1), או None אם אינו בגרף"""
+        return self._vertex_index.get(vertex)
+
+    def incident_edges(self, index: int):
+        """הקשתות שנוגעות בצומת, כזוגות (מזהה השכן, קשת)"""
+        return [(neighbor, edge) for edge, neighbor in self._adjacency.get(index, {}).items()]
+
+    def iter_vertices(self):
+        """זוגות (מזהה, צומת) של הצמתים החיים בלבד"""
+        return ((vertex_id, vertex) for vertex_id, vertex in enumerate(self.vertices) if vertex is not None)
+
+    def live_vertices(self) -> List[Vertex]:
+        return [vertex for vertex in self.vertices if vertex is not None]
+
+    def iter_edges(self):
+        return (edge for edge in self.edges if edge is not None)
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.vertices) - self._removed_vertices
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edges) - self._removed_edges
+
+    def compact(self) -> dict:
+        """הסרת ה-tombstones ומספור מחדש; מחזיר מיפוי מזהה ישן -> מזהה חדש"""
+        id_map = {}
+        vertices = []
+        for vertex_id, vertex in self.iter_vertices():
+            id_map[vertex_id] = len(vertices)
+            vertices.append(vertex)
+        edges = [edge for edge in self.iter_edges() if edge.start in id_map and edge.end in id_map]
+        for edge in edges:
+            edge.start = id_map[edge.start]
+            edge.end = id_map[edge.end]
+        self.vertices = vertices
+        self.edges = edges
+        self.rebuild_index()
+        return id_map
+
+    def rebuild_index(self):
+        """בנייה מחדש של האינדקסים אחרי שינוי ישיר של vertices/edges"""
+        self._vertex_index = {}
+        for vertex_id, vertex in self.iter_vertices():
+            self._vertex_index.setdefault(vertex, vertex_id)
+        self._adjacency = {}
+        self._edge_index = {}
+        for position, edge in enumerate(self.edges):
+            if edge is not None:
+                self._edge_index[edge] = position
+                self._index_edge(edge)
+        self._removed_vertices = sum(1 for vertex in self.vertices if vertex is None)
+        self._removed_edges = len(self.edges) - len(self._edge_index)
 
     def set_center(self, point: Point3D):
         self.center = point
 
     def __repr__(self):
-        return f"Graph(vertices={len(self.vertices)}, edges={len(self.edges)})"
\ No newline at end of file
+        return f"Graph(vertices={self.vertex_count}, edges={self.edge_count})"
+
+
+class _LayeredVertices(Sequence):
+    """תצוגה של צמתי הבסיס ואחריהם צמתי השכבה - בלי להעתיק את רשימת הבסיס"""
+
+    def __init__(self, base: list, layer: list):
+        self._base = base
+        self._layer = layer
+
+    def __len__(self):
+        return len(self._base) + len(self._layer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < len(self._base):
+            return self._base[index]
+        return self._layer[index - len(self._base)]
+
+    def __iter__(self):
+        return chain(self._base, self._layer)
+
+
+class GraphOverlay:
+    """
+    תצורת מנורות מעל גרף בסיס משותף (מכשולים, קשתות, צמתי השפעה).
+    הבסיס לא משתנה - כל שינוי (הוספה/החלפה של מנורות) נשמר בשכבה בלבד,
+    כך שאפשר לדרג הרבה תצורות במקביל על אותו בסיס.
+    """
+
+    def __init__(self, base: Graph, lights=()):
+        self.base = base
+        self.lights = []
+        self._base_size = len(base.vertices)
+        self._light_index = {}
+        self.vertices = _LayeredVertices(base.vertices, self.lights)
+        # תאורה בפועל לכל צומת - בשכבה ולא על הצמתים המשותפים
+        self.actual_lux = {}
+        self.add_vertices(lights)
+
+    @property
+    def edges(self) -> list:
+        return self.base.edges
+
+    @property
+    def center(self) -> Point3D:
+        return self.base.center
+
+    def add_vertex(self, vertex: Vertex) -> int:
+        self.lights.append(vertex)
+        index = self._base_size + len(self.lights) - 1
+        self._light_index.setdefault(vertex, index)
+        return index
+
+    def add_vertices(self, vertices) -> List[int]:
+        return [self.add_vertex(vertex) for vertex in vertices]
+
+    def replace_vertex(self, vertex_id: int, vertex: Vertex):
+        """החלפת צומת של השכבה; צמתי הבסיס לקריאה בלבד"""
+        if vertex_id < self._base_size:
+            raise ValueError(f"Vertex {vertex_id} belongs to the shared base graph")
+        old = self.lights[vertex_id - self._base_size]
+        if self._light_index.get(old) == vertex_id:
+            del self._light_index[old]
+        self.lights[vertex_id - self._base_size] = vertex
+        self._light_index.setdefault(vertex, vertex_id)
+
+    def index_of(self, vertex: Vertex) -> int:
+        index = self.base.index_of(vertex)
+        return index if index is not None else self._light_index.get(vertex)
+
+    def incident_edges(self, index: int):
+        # למנורות השכבה אין קשתות
+        return self.base.incident_edges(index) if index is not None and index < self._base_size else []
+
+    def iter_vertices(self):
+        return ((vertex_id, vertex) for vertex_id, vertex in enumerate(self.vertices) if vertex is not None)
+
+    def live_vertices(self) -> List[Vertex]:
+        return self.base.live_vertices() + self.lights
+
+    def iter_edges(self):
+        return self.base.iter_edges()
+
+    @property
+    def vertex_count(self) -> int:
+        return self.base.vertex_count + len(self.lights)
+
+    @property
+    def edge_count(self) -> int:
+        return self.base.edge_count
+
+    def __repr__(self):
+        return f"GraphOverlay(base={self.base!r}, lights={len(self.lights)})"